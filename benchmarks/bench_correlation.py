@@ -0,0 +1,94 @@
+"""
+Benchmarks the process-instance correlation (correlation.ProcessInstances) on synthetic
+lifetimes with reused pids and --rows events, in one pass and in blocks (as in --stream).
+
+Every pid is reused --reuse times over a day, and events fall inside, between and after its
+lifetimes. The assignment is checked against pandas.merge_asof by pid followed by the end_time
+test on a sample of the events.
+
+    python benchmarks/bench_correlation.py --rows 10000000 --processes 100000
+"""
+import sys
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from correlation import ProcessInstances
+
+START = pd.Timestamp("2025-03-01 00:00:00")
+DAY_S = 86_400
+
+def make_processes(count: int, reuse: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pids = np.repeat(rng.choice(np.arange(100, 100 + 10 * count), count // reuse, replace=False), reuse)
+    # Each reuse of a pid gets its own slot of the day, so lifetimes of one pid do not overlap
+    slot = DAY_S // reuse
+    starts = np.tile(np.arange(reuse) * slot, len(pids) // reuse) + rng.integers(0, slot // 2, len(pids))
+    lengths = rng.integers(1, slot // 2, len(pids))
+    ends = pd.Series(START + pd.to_timedelta(starts + lengths, unit="s"))
+    ends[rng.random(len(pids)) < 0.05] = pd.NaT
+    return pd.DataFrame({
+        "process_id": pids,
+        "start_time": START + pd.to_timedelta(starts, unit="s"),
+        "end_time": ends,
+    })
+
+def make_events(processes: pd.DataFrame, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    pids = processes["process_id"].to_numpy()[rng.integers(0, len(processes), rows)]
+    seconds = np.sort(rng.integers(0, DAY_S, rows))
+    return pd.DataFrame({"timestamp": START + pd.to_timedelta(seconds, unit="s"), "process_id": pids})
+
+# Instance start of each event with merge_asof, NaT where the event is outside the lifetime.
+def merge_asof_starts(processes: pd.DataFrame, events: pd.DataFrame) -> np.ndarray:
+    lifetimes = processes.assign(instance_start=processes["start_time"]).sort_values("start_time")
+    merged = pd.merge_asof(events.reset_index(), lifetimes, left_on="timestamp", right_on="start_time",
+                           by="process_id", direction="backward").set_index("index").sort_index()
+    inside = merged["end_time"].isna() | (merged["timestamp"] <= merged["end_time"])
+    return merged["instance_start"].where(inside & merged["instance_start"].notna()).to_numpy("datetime64[ns]")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process-instance correlation")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--processes", type=int, default=100_000)
+    parser.add_argument("--reuse", type=int, default=4, help="Lifetimes per pid")
+    parser.add_argument("--block_rows", type=int, default=500_000)
+    parser.add_argument("--check_rows", type=int, default=1_000_000, help="Events compared with merge_asof")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    processes = make_processes(args.processes, args.reuse, args.seed)
+    events = make_events(processes, args.rows, args.seed)
+
+    start = time.perf_counter()
+    instances = ProcessInstances(processes)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    positions = instances.assign(events["process_id"], events["timestamp"])
+    keys = instances.instance_keys(positions)
+    one_pass = time.perf_counter() - start
+    start = time.perf_counter()
+    blocks = [instances.assign(events["process_id"].iloc[i:i + args.block_rows], events["timestamp"].iloc[i:i + args.block_rows])
+              for i in range(0, len(events), args.block_rows)]
+    blockwise = time.perf_counter() - start
+    same_blocks = np.array_equal(np.concatenate(blocks), positions)
+
+    sample = events.iloc[:args.check_rows]
+    start = time.perf_counter()
+    expected = merge_asof_starts(processes, sample)
+    merge_asof_s = time.perf_counter() - start
+    got = np.where(positions[:len(sample)] >= 0, instances.starts[positions[:len(sample)]], np.iinfo(np.int64).min)
+    same_asof = np.array_equal(got.view("datetime64[ns]"), expected, equal_nan=True)
+
+    print(f"{len(processes):,} lifetimes ({len(instances.keys):,} pids): index built in {build:.3f}s")
+    print(f"{len(events):,} events: one pass {one_pass:.2f}s ({len(events) / one_pass / 1e6:.2f}M events/s, "
+          f"{(positions >= 0).mean():.1%} assigned, {len(keys.categories):,} instances), "
+          f"{args.block_rows:,}-row blocks {blockwise:.2f}s, same: {same_blocks}")
+    print(f"merge_asof on {len(sample):,} events: {merge_asof_s:.2f}s, same assignment: {same_asof}")
+
+if __name__ == "__main__":
+    main()
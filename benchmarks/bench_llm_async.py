@@ -0,0 +1,64 @@
+"""
+Benchmarks llm_async.summarize_async against a fake chat chain with fixed latency.
+
+The fake chain sleeps `--latency` seconds per request (regardless of how many events the
+request carries) and fails a `--failure-rate` fraction of requests, so the numbers show how
+concurrency, batching and retries change throughput without calling a real model.
+
+    python benchmarks/bench_llm_async.py --events 2000 --concurrency 1 8 32 128 --batch-size 1 10
+"""
+import sys
+import os
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from llm_async import summarize_async
+
+class FakeChain:
+    def __init__(self, latency: float, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    async def ainvoke(self, inputs):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self.random.random() < self.failure_rate:
+            raise RuntimeError("rate limited")
+        if "events" in inputs:
+            lines = inputs["events"].splitlines()
+            text = "\n".join(line.split("]", 1)[0] + "] summary of event" for line in lines)
+            return {"events": inputs["events"], "text": text}
+        return {"event": inputs["event"], "text": "summary of event"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark async LLM summarization")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake request")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second limit")
+    args = parser.parse_args()
+
+    events = [f"Executable: C:/Windows/System32/app{i % 50}.exe | User: admin" for i in range(args.events)]
+    print(f"{'concurrency':>12} {'batch':>6} {'requests':>9} {'seconds':>8} {'events/s':>10} {'errors':>7}")
+    for batch_size in args.batch_size:
+        for concurrency in args.concurrency:
+            chain = FakeChain(args.latency, args.failure_rate)
+            start = time.perf_counter()
+            results = asyncio.run(summarize_async(events, chain, chain, concurrency=concurrency, rate=args.rate,
+                                                  batch_size=batch_size, retries=3, backoff=0.01))
+            elapsed = time.perf_counter() - start
+            errors = sum(isinstance(r, str) and r.startswith("[LLM ERROR]") for r in results)
+            assert all(isinstance(r, str) or r["event"] == e for r, e in zip(results, events)), "order lost"
+            print(f"{concurrency:>12} {batch_size:>6} {chain.requests:>9} {elapsed:>8.2f} "
+                  f"{len(events) / elapsed:>10.0f} {errors:>7}")
+
+if __name__ == "__main__":
+    main()
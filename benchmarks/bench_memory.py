@@ -0,0 +1,97 @@
+"""
+Measures the memory of the cleaned and unified frames with and without the compact dtypes of
+src/compact.py (categoricals, packed IPv4, int32 pids, dictionary-encoded event_details) on logs
+from scripts/generate_logs.py.
+
+For each size it reports the deep memory_usage bytes per event of the cleaned frames and of
+the unified stream (with a string per event_type / event_details value when not compact), the
+time to convert and unify, and checks that both variants write the same CSV.
+
+    python benchmarks/bench_memory.py --rows 100000 1000000
+"""
+import sys
+import io
+import time
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from cleaning import load_events
+from compact import IPV4_COLUMNS, compact_frame, ipv4_text
+from integration import unify_event_stream
+from generate_logs import generate_logs
+
+SOURCES = ["process", "network", "file", "registry"]
+
+# A compact frame with packed addresses rendered back to text, to compare its CSV output.
+def expand_frame(df):
+    packed = [col for col in IPV4_COLUMNS if col in df and df[col].dtype == np.uint32]
+    return df.assign(**{col: ipv4_text(df[col].to_numpy()) for col in packed})
+
+def frame_bytes(df) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+def measure(cleaned: dict, compact: bool) -> dict:
+    start = time.perf_counter()
+    frames = {source: compact_frame(df, source) if compact else df for source, df in cleaned.items()}
+    compact_s = time.perf_counter() - start
+    start = time.perf_counter()
+    unified = unify_event_stream(*(frames[source] for source in SOURCES))
+    unify_s = time.perf_counter() - start
+    if not compact:
+        # Without compact dtypes every event carries its own type and details strings
+        unified = unified.astype({"event_type": "str", "event_details": "str"})
+    return {
+        "frames": frames,
+        "unified": unified,
+        "cleaned_bytes": sum(frame_bytes(df) for df in frames.values()),
+        "unified_bytes": frame_bytes(unified),
+        "compact_s": compact_s,
+        "unify_s": unify_s,
+    }
+
+def benchmark(rows: int, seed: int, span: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_logs(Path(tmp), rows, seed=seed, span=span)
+        cleaned = {source: load_events(Path(tmp) / f"{source}_events.csv", source) for source in SOURCES}
+    events = sum(len(df) for df in cleaned.values())
+    plain, compact = measure(cleaned, False), measure(cleaned, True)
+    same_cleaned = all(expand_frame(compact["frames"][source]).to_csv(index=False)
+                       == plain["frames"][source].to_csv(index=False) for source in SOURCES)
+    same_unified = compact["unified"].to_csv(index=False) == plain["unified"].to_csv(index=False)
+    return {"rows": rows, "events": events, "plain": plain, "compact": compact,
+            "same_output": same_cleaned and same_unified}
+
+def print_result(result: dict):
+    events = max(result["events"], 1)
+    plain, compact = result["plain"], result["compact"]
+    print(f"{result['rows']:,} rows ({result['events']:,} cleaned events), "
+          f"outputs {'identical' if result['same_output'] else 'DIFFER'}:")
+    print(f"  {'frame':<10} {'plain B/event':>14} {'compact B/event':>16} {'ratio':>7}")
+    for name in ["cleaned", "unified"]:
+        before, after = plain[f"{name}_bytes"] / events, compact[f"{name}_bytes"] / events
+        print(f"  {name:<10} {before:>14.1f} {after:>16.1f} {before / after:>6.1f}x")
+    print(f"  compact_frame {compact['compact_s']:.3f}s, unify {plain['unify_s']:.3f}s plain / "
+          f"{compact['unify_s']:.3f}s compact")
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per event with and without compact dtypes")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--span", default="1D", help="Time covered by the generated events")
+    args = parser.parse_args()
+    for rows in args.rows:
+        result = benchmark(rows, args.seed, args.span)
+        print_result(result)
+        if not result["same_output"]:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
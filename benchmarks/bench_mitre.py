@@ -0,0 +1,95 @@
+"""
+Benchmarks the compiled MITRE matcher (mitre_lookup.match_summaries) against the original
+per-row linear scan (mitre_lookup.match_mitre_dynamic).
+
+Uses data/enterprise-attack.json when present, otherwise a synthetic STIX bundle with
+--techniques attack-patterns. Summaries are generated from a vocabulary mixing technique
+names and filler text; --distinct controls how many different summaries occur (real LLM
+output repeats a lot, and match_summaries matches each distinct summary once). The linear
+scan is only run on --legacy-rows summaries and extrapolated.
+
+    python benchmarks/bench_mitre.py --summaries 1000000
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import pandas as pd
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+import mitre_lookup
+from mitre_lookup import load_attack_techniques, compile_matcher, match_summaries, match_mitre_dynamic
+
+WORDS = ("process registry network file write read modify create delete user admin system "
+         "service scheduled task credential dump powershell script remote login persistence "
+         "execution discovery lateral movement exfiltration command injection").split()
+
+def synthetic_bundle(path: Path, count: int, seed: int = 0):
+    rng = random.Random(seed)
+    objects = []
+    for i in range(count):
+        name = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+        description = "Adversaries may " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+        objects.append({
+            "type": "attack-pattern",
+            "name": name,
+            "description": description,
+            "external_references": [{"source_name": "mitre-attack", "external_id": f"T{1000 + i}"}],
+        })
+    path.write_text(json.dumps({"type": "bundle", "objects": objects}), encoding="utf-8")
+
+def synthetic_summaries(count: int, distinct: int, techniques, seed: int = 0):
+    rng = random.Random(seed)
+    names = [tech["name"] for tech in techniques]
+    pool = []
+    for _ in range(distinct):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(15, 40))]
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words)), rng.choice(names))
+        pool.append("This event indicates " + " ".join(words) + ".")
+    return pd.Series([pool[rng.randrange(distinct)] for _ in range(count)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MITRE matching")
+    parser.add_argument("--summaries", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=50_000)
+    parser.add_argument("--techniques", type=int, default=600, help="Size of the synthetic bundle")
+    parser.add_argument("--legacy-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not mitre_lookup.MITRE_PATH.exists():
+            mitre_lookup.MITRE_PATH = Path(tmp) / "enterprise-attack.json"
+            synthetic_bundle(mitre_lookup.MITRE_PATH, args.techniques)
+        techniques = load_attack_techniques()
+    summaries = synthetic_summaries(args.summaries, args.distinct, techniques)
+    print(f"{len(techniques)} techniques, {len(summaries):,} summaries ({args.distinct:,} distinct)")
+
+    start = time.perf_counter()
+    matcher = compile_matcher(techniques)
+    compile_s = time.perf_counter() - start
+    start = time.perf_counter()
+    compiled = match_summaries(summaries, matcher)
+    compiled_s = time.perf_counter() - start
+
+    sample = summaries.head(args.legacy_rows)
+    start = time.perf_counter()
+    # The compiled matcher leaves deprecated and revoked techniques out
+    current = [tech for tech in techniques if not tech.get("deprecated")]
+    legacy = sample.apply(lambda x: match_mitre_dynamic(x, current))
+    legacy_s = (time.perf_counter() - start) * len(summaries) / len(sample)
+
+    same = legacy["mitre_id"].equals(compiled["mitre_id"].head(len(sample)).astype(legacy["mitre_id"].dtype))
+    print(f"Same primary technique on first {len(sample):,} summaries: {same}")
+    print(f"compile:            {compile_s:8.2f} s")
+    print(f"compiled matcher:   {compiled_s:8.2f} s")
+    print(f"linear scan (est):  {legacy_s:8.2f} s  ({legacy_s / compiled_s:.0f}x slower)")
+    print(f"summaries with >1 match: {(compiled['mitre_matches'].str.count(';') > 0).mean():.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmarks main.run_pipeline end to end on logs from scripts/generate_logs.py, with the stub
+summarizer and no summary cache, at one or more sizes.
+
+Stages are measured by the pipeline's own instrumentation (src/metrics.py): wall and CPU time,
+peak resident memory above the stage's start and rows in/out. Results are written as JSON
+together with the versions, machine and git commit they were measured on; --compare checks a
+run against such a file and exits with status 1 when a stage got slower by more than --tolerance.
+
+    python benchmarks/bench_pipeline.py --rows 100000 1000000 --output pipeline.json
+    python benchmarks/bench_pipeline.py --rows 100000 1000000 --compare pipeline.json
+"""
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+import main as pipeline
+from metrics import instrumented_run
+from generate_logs import generate_logs
+from mitre_lookup import BUNDLE_NAME, find_attack_bundle
+
+# Stages faster than this in the baseline are too noisy to flag
+MIN_COMPARED_SECONDS = 0.05
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> dict:
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def run_once(input_dir: Path, output_dir: Path, workers: int, verbose: bool) -> dict:
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with instrumented_run(enabled=True) as run, output:
+        pipeline.run_pipeline(str(input_dir), str(output_dir), workers=workers,
+                              summarizer="stub", llm_cache=None)
+    report = run.to_dict()
+    stages = {name: {"seconds": entry["wall_s"], "cpu_s": entry["cpu_s"], "calls": entry["calls"],
+                     "peak_rss_mb": entry["peak_rss_delta_mb"], "rows_in": entry["rows_in"],
+                     "rows_out": entry["rows_out"]}
+              for name, entry in report["stages"].items()}
+    total = report["run"]["wall_s"]
+    stages["other"] = {"seconds": round(total - sum(e["seconds"] for e in stages.values()), 4), "calls": 0}
+    return {"total_s": total, "cpu_s": report["run"]["cpu_s"], "peak_rss_mb": report["run"]["peak_rss_mb"],
+            "stages": stages}
+
+def benchmark(rows: int, args, bundle: Path) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "input"
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            written = generate_logs(input_dir, rows, seed=args.seed, span=args.span)
+        generate_s = time.perf_counter() - start
+        shutil.copy(bundle, input_dir / BUNDLE_NAME)
+        result = run_once(input_dir, Path(tmp) / "output", args.workers, args.verbose)
+    return {"rows": rows, "input_rows": written, "generate_s": round(generate_s, 3), **result}
+
+def print_run(run: dict):
+    print(f"{run['rows']:,} rows ({sum(run['input_rows'].values()):,} written, generated in {run['generate_s']:.1f}s): "
+          f"total {run['total_s']:.2f}s, peak {run['peak_rss_mb']:.0f} MB")
+    print(f"  {'stage':<14} {'seconds':>9} {'share':>7} {'cpu s':>9} {'+peak MB':>9} {'rows in':>11} {'rows out':>11}")
+    for stage, entry in run["stages"].items():
+        cpu = f"{entry['cpu_s']:>9.3f}" if "cpu_s" in entry else f"{'':>9}"
+        peak = f"{entry['peak_rss_mb']:>9.0f}" if "peak_rss_mb" in entry else f"{'':>9}"
+        rows = "".join(f" {entry[key]:>11,}" if entry.get(key) is not None else f" {'':>11}"
+                       for key in ["rows_in", "rows_out"])
+        print(f"  {stage:<14} {entry['seconds']:>9.3f} {entry['seconds'] / run['total_s']:>7.1%} {cpu} {peak}{rows}")
+
+# Per-stage time ratios against a baseline file; returns the regressions found.
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    by_rows = {run["rows"]: run for run in baseline["runs"]}
+    for run in results["runs"]:
+        base = by_rows.get(run["rows"])
+        if base is None:
+            print(f"{run['rows']:,} rows: not in the baseline")
+            continue
+        print(f"{run['rows']:,} rows vs baseline ({base_commit(baseline)}):")
+        for stage in ["total", *run["stages"]]:
+            new = run["total_s"] if stage == "total" else run["stages"][stage]["seconds"]
+            old = base["total_s"] if stage == "total" else base["stages"].get(stage, {}).get("seconds")
+            if old is None:
+                continue
+            ratio = new / old if old else float("inf")
+            flag = old >= MIN_COMPARED_SECONDS and ratio > 1 + tolerance
+            print(f"  {stage:<14} {old:>9.3f}s -> {new:>9.3f}s {ratio:>6.2f}x{'  REGRESSION' if flag else ''}")
+            if flag:
+                regressions.append((run["rows"], stage, ratio))
+    return regressions
+
+def base_commit(baseline: dict) -> str:
+    commit = baseline.get("environment", {}).get("commit")
+    return commit[:10] if commit else "unknown commit"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_pipeline stages on generated logs")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--span", default="1D", help="Time covered by the generated events")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--bundle", help="enterprise-attack.json (default: the pipeline's bundle)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown per stage (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's output")
+    args = parser.parse_args()
+
+    bundle = Path(args.bundle) if args.bundle else find_attack_bundle()
+    if not bundle.exists():
+        sys.exit(f"MITRE bundle {bundle} not found; pass --bundle")
+
+    results = {"environment": environment(), "settings": vars(args), "runs": []}
+    for rows in args.rows:
+        results["runs"].append(benchmark(rows, args, bundle))
+        print_run(results["runs"][-1])
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Saved: {args.output}")
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
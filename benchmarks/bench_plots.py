@@ -0,0 +1,92 @@
+"""
+Benchmarks the plots step: visualizations.chart_counts (one aggregation pass) plus render_charts
+(Agg figures, optionally one process per chart) against the original three pyplot functions,
+which each scanned the frame and never closed their figures.
+
+A unified frame of --rows events over one day (timestamp, process_id, event_type) is generated
+in memory (event_type as a categorical, so 50M rows fit in a few GB); the original functions
+run on a copy since plot_event_timeline modified its input.
+
+    python benchmarks/bench_plots.py --rows 50000000
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from visualizations import chart_counts, render_charts
+
+EVENT_TYPES = ["process_start", "network", "file", "registry"]
+
+def make_events(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-03-01T09:00:00", "s")
+    seconds = np.sort(rng.integers(0, 86_400, rows)).astype("timedelta64[s]")
+    return pd.DataFrame({
+        "timestamp": start + seconds,
+        "process_id": rng.integers(100, 1_000_000, rows),
+        "event_type": pd.Categorical.from_codes(rng.integers(0, 4, rows).astype(np.int8), EVENT_TYPES),
+    })
+
+# The original plotting code, kept here as the comparison baseline.
+def legacy_plots(df: pd.DataFrame, output_dir: Path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(8, 5))
+    df["event_type"].value_counts().plot(kind="bar", color="#4A90E2", edgecolor="black")
+    plt.tight_layout()
+    plt.savefig(output_dir / "legacy_event_type_distribution.png")
+
+    timeline_df = df.copy()
+    timeline_df['timestamp'] = pd.to_datetime(timeline_df['timestamp'], errors='coerce')
+    timeline_df = timeline_df.dropna(subset=['timestamp'])
+    timeline_df.set_index('timestamp', inplace=True)
+    timeline = timeline_df.resample('1Min').size()
+    plt.figure(figsize=(10, 4))
+    timeline.plot()
+    plt.tight_layout()
+    plt.savefig(output_dir / "legacy_event_timeline.png")
+
+    plt.figure(figsize=(8, 5))
+    df["process_id"].value_counts().head(10).plot(kind="bar", color="#7B68EE", edgecolor="black")
+    plt.tight_layout()
+    plt.savefig(output_dir / "legacy_top_talkers.png")
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart aggregation and rendering")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = make_events(args.rows, args.seed)
+    print(f"{args.rows:,} events")
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp)
+        counts, aggregate_s = _timed(chart_counts, df)
+        _, render_s = _timed(render_charts, counts, output_dir)
+        _, parallel_s = _timed(render_charts, counts, output_dir, args.workers)
+        print(f"aggregate {aggregate_s:.2f}s, render {render_s:.2f}s serial / {parallel_s:.2f}s "
+              f"with {args.workers} workers, total {aggregate_s + min(render_s, parallel_s):.2f}s")
+        same = all(counts[key].astype("int64").sort_index().equals(df[column].value_counts().sort_index())
+                   for key, column in (("types", "event_type"), ("pids", "process_id")))
+        print(f"counts match value_counts: {same}")
+        if not args.skip_legacy:
+            _, legacy_s = _timed(legacy_plots, df, output_dir)
+            print(f"original plots {legacy_s:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmarks process tree building (process_tree.build_process_tree, CSR arrays) and report
+generation with the per-pid event index (process_tree.build_event_index) against the original
+networkx graph of row dicts and per-node scans of the event frames.
+
+A random process tree of --nodes processes is generated (every process is spawned by an
+earlier one) with about --events-per-node file, network and registry events per process.
+The original code is only run on --legacy-nodes processes (the scan-based report is quadratic)
+and extrapolated; on that size both reports are checked to be byte-identical, also with a
+networkx graph passed through the adapter. A few pids are reused with other parents so the
+graph contains shared children and cycles.
+
+    python benchmarks/bench_process_tree.py --nodes 100000
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import networkx as nx
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from process_tree import build_process_tree, extract_events_for_pid, write_process_tree_markdown_safe, build_event_index
+from bench_unify import EXECUTABLES, USERS, FILE_PATHS, REGISTRY_KEYS, OPERATIONS, _timestamps, _ips
+
+ROOT_PID = 1000
+
+def make_tree(nodes: int, events_per_node: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pids = ROOT_PID + np.arange(nodes)
+    parents = np.empty(nodes, dtype=np.int64)
+    parents[0] = 4
+    parents[1:] = pids[(rng.random(nodes - 1) * np.arange(1, nodes)).astype(np.int64)]
+    process_df = pd.DataFrame({
+        "process_id": pids,
+        "parent_id": parents,
+        "start_time": _timestamps(rng, nodes),
+        "end_time": _timestamps(rng, nodes),
+        "executable_path": rng.choice(EXECUTABLES, nodes),
+        "user": rng.choice(USERS, nodes),
+        "command_line": rng.choice(EXECUTABLES, nodes),
+    })
+    n = int(nodes * events_per_node / 3)
+    file_df = pd.DataFrame({
+        "timestamp": _timestamps(rng, n),
+        "process_id": rng.choice(pids, n),
+        "file_path": rng.choice(FILE_PATHS, n),
+        "operation": rng.choice(OPERATIONS, n),
+    })
+    net_df = pd.DataFrame({
+        "timestamp": _timestamps(rng, n),
+        "process_id": rng.choice(pids, n),
+        "src_ip": _ips(rng, n),
+        "dst_ip": _ips(rng, n),
+        "src_port": rng.integers(1024, 65535, n),
+        "dst_port": rng.choice([80, 443, 53], n),
+        "protocol": rng.choice(np.array(["TCP", "UDP"], dtype=object), n),
+    })
+    value_names = pd.Series(rng.choice(np.array(["Run", "Version", None], dtype=object), n))
+    reg_df = pd.DataFrame({
+        "timestamp": _timestamps(rng, n),
+        "process_id": rng.choice(pids, n),
+        "registry_key": rng.choice(REGISTRY_KEYS, n),
+        "operation": rng.choice(OPERATIONS, n),
+        "value_name": value_names,
+        "value_data": value_names.map({"Run": "C:/evil.exe", "Version": "16.0"}),
+    })
+    reused = rng.choice(nodes, max(1, nodes // 100))
+    extra = process_df.iloc[reused].assign(parent_id=rng.choice(pids, len(reused)))
+    return pd.concat([process_df, extra], ignore_index=True), file_df, net_df, reg_df
+
+# The graph as it was built before: networkx nodes holding full row dicts.
+def legacy_build(process_df):
+    G = nx.DiGraph()
+    for _, row in process_df.iterrows():
+        G.add_node(row['process_id'], **row.to_dict())
+        G.add_edge(row['parent_id'], row['process_id'])
+    return G
+
+# The report writer as it was before the event index: one scan of every frame per node.
+def legacy_write(graph, root_pid, file_df, net_df, reg_df, output_path):
+    visited = set()
+    with open(output_path, "w", encoding="utf-8") as f:
+        def dfs(pid, indent=0):
+            if pid in visited:
+                f.write(f"{'  ' * indent}- process_id: {pid} (cycle detected, already visited)\n")
+                return
+            visited.add(pid)
+            if pid not in graph.nodes:
+                f.write(f"{'  ' * indent}- process_id: {pid} (not found in graph)\n")
+                return
+            node = graph.nodes[pid]
+            indent_str = "  " * indent
+            f.write(f"{indent_str}- process_id: {pid}, parent_id: {node['parent_id']}, executable_path: {node['executable_path']}, user: {node['user']}, start_time: {node['start_time']}\n")
+            for event in extract_events_for_pid(pid, file_df, net_df, reg_df):
+                f.write(f"{indent_str}{event}\n")
+            for child_pid in list(graph.successors(pid)):
+                dfs(child_pid, indent + 1)
+        dfs(root_pid)
+
+def timed(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28}{elapsed:9.2f} s")
+    return result, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process tree reports")
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--events-per-node", type=float, default=6.0)
+    parser.add_argument("--legacy-nodes", type=int, default=2_000)
+    args = parser.parse_args()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * args.nodes))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        small = make_tree(args.legacy_nodes, args.events_per_node)
+        print(f"{args.legacy_nodes:,} nodes:")
+        legacy_graph, legacy_build_s = timed("networkx build", legacy_build, small[0])
+        small_graph, _ = timed("build_process_tree", build_process_tree, small[0])
+        _, legacy_s = timed("per-node scans", legacy_write, legacy_graph, ROOT_PID, *small[1:], out / "legacy.md")
+        timed("event index", write_process_tree_markdown_safe, small_graph, ROOT_PID, *small[1:], out / "indexed.md")
+        write_process_tree_markdown_safe(legacy_graph, ROOT_PID, *small[1:], out / "adapter.md")
+        same = (out / "legacy.md").read_bytes() == (out / "indexed.md").read_bytes() == (out / "adapter.md").read_bytes()
+        print(f"  identical report: {same}")
+
+        process_df, file_df, net_df, reg_df = make_tree(args.nodes, args.events_per_node)
+        print(f"{args.nodes:,} nodes, {len(file_df) + len(net_df) + len(reg_df):,} events:")
+        graph, _ = timed("build_process_tree", build_process_tree, process_df)
+        index, index_s = timed("build_event_index", build_event_index, file_df, net_df, reg_df)
+        _, write_s = timed("write report", write_process_tree_markdown_safe,
+                           graph, ROOT_PID, file_df, net_df, reg_df, out / "big.md", index)
+        scale = (args.nodes / args.legacy_nodes) ** 2
+        print(f"  networkx build (est)        {legacy_build_s * args.nodes / args.legacy_nodes:9.2f} s")
+        print(f"  per-node scans (est)        {legacy_s * scale:9.2f} s  (quadratic extrapolation)")
+        print(f"  report lines: {sum(1 for _ in open(out / 'big.md', encoding='utf-8')):,}")
+
+if __name__ == "__main__":
+    main()
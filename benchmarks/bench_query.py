@@ -0,0 +1,87 @@
+"""
+Benchmarks query.QueryIndex (time-partitioned copy plus timestamp/pid/user/event_type index)
+against what analysts did before: load unified_events_enriched.csv and filter it with masks.
+
+A synthetic unified stream of --rows events over one day is written to a temporary CSV with
+an llm_summary column. The index is built once (timed separately), then each query is timed
+both ways and the results are checked to be identical.
+
+    python benchmarks/bench_query.py --rows 2000000
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+import pandas as pd
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from integration import unify_event_stream
+from query import build_query_index, open_query_index, event_users
+from bench_unify import make_frames
+
+QUERIES = {
+    "1 hour": dict(start="2025-03-01 12:00", end="2025-03-01 13:00"),
+    "1 hour, user": dict(start="2025-03-01 12:00", end="2025-03-01 13:00", users=["admin"]),
+    "3 pids": dict(pids=None),
+    "day, registry + admin": dict(users=["admin"], event_types=["registry"]),
+    "10 min, network": dict(start="2025-03-01 18:00", end="2025-03-01 18:10", event_types=["network"]),
+}
+
+def scan_query(path: Path, start=None, end=None, pids=None, users=None, event_types=None) -> pd.DataFrame:
+    df = pd.read_csv(path, parse_dates=["timestamp"])
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df["timestamp"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["timestamp"] < pd.Timestamp(end)
+    if pids is not None:
+        mask &= df["process_id"].isin(pids)
+    if users is not None:
+        mask &= event_users(df["event_details"]).isin(users)
+    if event_types is not None:
+        mask &= df["event_type"].isin(event_types)
+    return df[mask].reset_index(drop=True)
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the unified stream query index")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--partition", default="1h")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    unified = unify_event_stream(*make_frames(args.rows, args.seed))
+    unified["llm_summary"] = "This event indicates routine activity by " + event_users(unified["event_details"])
+    sample_pids = unified["process_id"].drop_duplicates().iloc[:3].tolist()
+    QUERIES["3 pids"]["pids"] = sample_pids
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "unified_events_enriched.csv"
+        unified.to_csv(path, index=False)
+        del unified
+        print(f"{args.rows:,} events, {path.stat().st_size / 2**20:.0f} MB CSV")
+
+        index, build_s = _timed(build_query_index, path, args.partition)
+        _, open_s = _timed(open_query_index, path)
+        print(f"Index build {build_s:.2f}s ({len(index.meta['parts'])} partitions), open {open_s * 1000:.1f} ms")
+
+        print(f"{'query':<24} {'rows':>10} {'scan (s)':>10} {'index (s)':>10} {'speedup':>9} {'same':>5}")
+        for label, kwargs in QUERIES.items():
+            expected, scan_s = _timed(scan_query, path, **kwargs)
+            result, index_s = _timed(index.query, **kwargs)
+            try:
+                pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+                same = True
+            except AssertionError:
+                same = False
+            print(f"{label:<24} {len(result):>10,} {scan_s:>10.2f} {index_s:>10.3f} {scan_s / index_s:>8.0f}x {str(same):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures cold-start time of the command line entry points.
+
+Each command runs in a fresh interpreter --repeat times and the median wall time is
+reported. "help" is `main.py --help`; "plots" regenerates the three charts from a unified
+events file with the visualizations CLI (no LLM, no MITRE bundle). With --importtime the
+slowest imports of `main.py --help` are listed as well (python -X importtime).
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def _time_command(cmd, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def _slowest_imports(cmd, top: int):
+    result = subprocess.run([sys.executable, "-X", "importtime", *cmd[1:]], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI cold-start time")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--input", default=os.path.join("data", "unified_events.csv"),
+                        help="Unified events file used for the plots-only run")
+    parser.add_argument("--importtime", action="store_true", help="List the slowest imports of main.py --help")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        commands = {
+            "help": [sys.executable, "main.py", "--help"],
+            "plots": [sys.executable, os.path.join("src", "visualizations.py"),
+                      "--input", args.input, "--output_dir", out_dir],
+        }
+        for name, cmd in commands.items():
+            print(f"{name:>6}: {_time_command(cmd, args.repeat):.3f} s (median of {args.repeat})")
+
+    if args.importtime:
+        print("\nSlowest imports for main.py --help (cumulative, ms):")
+        for cumulative_us, module in _slowest_imports(commands["help"], args.top):
+            print(f"{cumulative_us / 1000:>9.1f}  {module}")
+
+if __name__ == "__main__":
+    main()
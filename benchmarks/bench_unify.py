@@ -0,0 +1,171 @@
+"""
+Benchmarks integration.unify_event_stream against the original iterrows() builder.
+
+Synthetic cleaned frames are generated in memory with the same schemas as the
+cleaned_*.csv files and split across the four event types. The row-by-row
+baseline is only timed up to --legacy-max-rows (it needs minutes per million
+rows); above that its time is extrapolated from the measured throughput and
+marked as an estimate.
+
+    python benchmarks/bench_unify.py --rows 1000000 10000000 50000000
+"""
+import sys
+import os
+import io
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from integration import unify_event_stream
+
+USERS = np.array(["SYSTEM", "admin", "johndoe", "janedoe", "user1"], dtype=object)
+EXECUTABLES = np.array([
+    "C:/Windows/System32/explorer.exe",
+    "C:/Windows/System32/svchost.exe",
+    "C:/Program Files/MyBrowser/browser.exe",
+    "C:/Users/Admin/AppData/Local/Temp/system_update.exe",
+], dtype=object)
+FILE_PATHS = np.array([
+    "C:/Users/JohnDoe/Desktop/log.txt",
+    "C:/Program Files/config.ini",
+    "C:/Windows/System32/drivers/etc/hosts",
+], dtype=object)
+REGISTRY_KEYS = np.array([
+    "HKEY_LOCAL_MACHINE\\SOFTWARE/Microsoft/Office/16.0",
+    "HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run",
+], dtype=object)
+OPERATIONS = np.array(["read", "write", "modify", "create", "delete"], dtype=object)
+
+def _timestamps(rng, n):
+    start = np.datetime64("2025-03-01T09:00:00", "s")
+    return pd.Series(start + np.sort(rng.integers(0, 86_400, n)).astype("timedelta64[s]"))
+
+def _ips(rng, n):
+    octets = rng.integers(1, 255, size=(n, 4)).astype(str)
+    return pd.Series(octets[:, 0], dtype=object) + "." + octets[:, 1] + "." + octets[:, 2] + "." + octets[:, 3]
+
+def make_frames(total_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n = total_rows // 4
+    process_df = pd.DataFrame({
+        "process_id": rng.integers(100, 1_000_000, n),
+        "parent_id": rng.integers(100, 1_000_000, n),
+        "start_time": _timestamps(rng, n),
+        "end_time": _timestamps(rng, n),
+        "executable_path": rng.choice(EXECUTABLES, n),
+        "user": rng.choice(USERS, n),
+        "command_line": rng.choice(EXECUTABLES, n),
+    })
+    network_df = pd.DataFrame({
+        "process_id": rng.integers(100, 1_000_000, n),
+        "src_ip": _ips(rng, n),
+        "dst_ip": _ips(rng, n),
+        "src_port": rng.integers(1024, 65535, n),
+        "dst_port": rng.choice([80, 443, 8080, 53], n),
+        "timestamp": _timestamps(rng, n),
+        "user": rng.choice(USERS, n),
+    })
+    file_df = pd.DataFrame({
+        "process_id": rng.integers(100, 1_000_000, n),
+        "file_path": rng.choice(FILE_PATHS, n),
+        "operation": rng.choice(OPERATIONS, n),
+        "timestamp": _timestamps(rng, n),
+        "user": rng.choice(USERS, n),
+    })
+    value_name = pd.Series(rng.choice(np.array(["SystemUpdateService", None], dtype=object), n))
+    registry_df = pd.DataFrame({
+        "process_id": rng.integers(100, 1_000_000, n),
+        "registry_key": rng.choice(REGISTRY_KEYS, n),
+        "operation": rng.choice(OPERATIONS, n),
+        "timestamp": _timestamps(rng, n),
+        "value_name": value_name,
+        "value_data": value_name.where(value_name.isna(), "1"),
+        "user": rng.choice(USERS, n),
+    })
+    return process_df, network_df, file_df, registry_df
+
+# The original implementation, kept here as the comparison baseline.
+def legacy_unify_event_stream(process_df, network_df, file_df, registry_df):
+    unified_records = []
+    for _, row in process_df.iterrows():
+        unified_records.append({
+            "timestamp": row["start_time"],
+            "process_id": row["process_id"],
+            "event_type": "process_start",
+            "event_details": f"Executable: {row['executable_path']} | User: {row['user']}",
+        })
+    for _, row in network_df.iterrows():
+        unified_records.append({
+            "timestamp": row["timestamp"],
+            "process_id": row["process_id"],
+            "event_type": "network",
+            "event_details": f"SrcIP: {row['src_ip']}:{row['src_port']} → DstIP: {row['dst_ip']}:{row['dst_port']} | User: {row['user']}",
+        })
+    for _, row in file_df.iterrows():
+        unified_records.append({
+            "timestamp": row["timestamp"],
+            "process_id": row["process_id"],
+            "event_type": "file",
+            "event_details": f"Operation: {row['operation']} | File: {row['file_path']} | User: {row['user']}",
+        })
+    for _, row in registry_df.iterrows():
+        val_str = f" | Value: {row['value_name']} = {row['value_data']}" if pd.notnull(row['value_name']) else ""
+        unified_records.append({
+            "timestamp": row["timestamp"],
+            "process_id": row["process_id"],
+            "event_type": "registry",
+            "event_details": f"Operation: {row['operation']} | Key: {row['registry_key']}{val_str} | User: {row['user']}",
+        })
+    unified_df = pd.DataFrame(unified_records)
+    unified_df.sort_values(by="timestamp", inplace=True)
+    return unified_df
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue().encode("utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unify_event_stream")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=1_000_000,
+                        help="Largest size at which the iterrows() baseline is actually run")
+    parser.add_argument("--check-rows", type=int, default=100_000,
+                        help="Size at which both outputs are compared byte-for-byte")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frames = make_frames(args.check_rows, args.seed)
+    same = _csv_bytes(legacy_unify_event_stream(*frames)) == _csv_bytes(unify_event_stream(*frames))
+    print(f"Byte-identical CSV at {args.check_rows:,} rows: {same}")
+
+    legacy_rate = None
+    print(f"{'rows':>12} {'legacy (s)':>14} {'vectorized (s)':>15} {'presorted (s)':>14} {'speedup':>9}")
+    for rows in args.rows:
+        frames = make_frames(rows, args.seed)
+        _, vec_s = _timed(unify_event_stream, *frames)
+        _, merge_s = _timed(unify_event_stream, *frames, presorted=True)
+        if rows <= args.legacy_max_rows:
+            _, legacy_s = _timed(legacy_unify_event_stream, *frames)
+            legacy_rate = rows / legacy_s
+            legacy_label = f"{legacy_s:.2f}"
+        elif legacy_rate is not None:
+            legacy_s = rows / legacy_rate
+            legacy_label = f"~{legacy_s:.0f} (est)"
+        else:
+            legacy_s = None
+            legacy_label = "skipped"
+        speedup = f"{legacy_s / vec_s:.0f}x" if legacy_s else "-"
+        print(f"{rows:>12,} {legacy_label:>14} {vec_s:>15.2f} {merge_s:>14.2f} {speedup:>9}")
+        del frames
+
+if __name__ == "__main__":
+    main()
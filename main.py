@@ -3,29 +3,46 @@ import sys
 import os
 import argparse
 from pathlib import Path
-import pandas as pd
 
 # Ensure source modules in /src are discoverable during execution
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
 
-from cleaning import load_process_events, save_cleaned_process_events
-from integration import load_cleaned_data, unify_event_stream, save_unified_stream
-from process_tree import build_process_tree, write_process_tree_markdown_safe
-from errors import write_error_report
-from visualizations import (
-    plot_event_type_distribution,
-    plot_event_timeline,
-    plot_top_talkers
+from cleaning import load_events
+from integration import load_cleaned_data, unify_event_stream
+from process_tree import (
+    build_process_tree,
+    build_event_index,
+    mitre_hit_pids,
+    select_tree_roots,
+    describe_roots,
+    write_process_tree_reports
 )
-from llm_summarizer import summarize_event
-from mitre_lookup import enrich_with_mitre
+from errors import write_error_report
+from storage import STORE_SUFFIXES, save_frame, stored_path
+from visualizations import chart_counts, render_charts
+from detectors import detect_anomalies
+from correlation import ProcessInstances, add_process_instances
+from llm_async import format_summary_stats
+from llm_summarizer import SUMMARIZER_BACKENDS, backend_namespace
+from summary_cache import SummaryCache
+from mitre_lookup import enrich_with_mitre, find_attack_bundle
+from triage import summarize_events, format_triage_stats
+from metrics import PROFILERS, stage, record_counters, instrumented_run
+
+EVENT_SOURCES = ["process", "network", "file", "registry"]
 
-def clean_and_save(df_loader, input_file, output_file):
-    df = df_loader(input_file)
-    df.to_csv(output_file, index=False)
-    return df
+# Writes an intermediate in the selected store, plus a CSV copy for analysts when requested.
+def save_intermediate(df, data_path: Path, name: str, store: str = "csv", export_csv: bool = False):
+    save_frame(df, stored_path(data_path, name, store))
+    if export_csv and store != "csv":
+        df.to_csv(stored_path(data_path, name), index=False)
 
-def run_pipeline(input_dir: str, output_dir: str, test_mode: bool = False):
+def run_pipeline(input_dir: str, output_dir: str, test_mode: bool = False,
+                 stream: bool = False, chunk_size: int = 500_000,
+                 store: str = "csv", export_csv: bool = False, workers: int = 1,
+                 llm_options: dict = None, llm_cache: str = None, llm_cache_size: int = 1_000_000,
+                 summarizer: str = "openai", tree_roots: str = "15150", incremental: bool = False,
+                 triage: dict = None, live: dict = None, fleet: dict = None):
     input_path = Path(input_dir)
     output_path = Path(output_dir)
     data_path = output_path / "data"
@@ -34,80 +51,153 @@ def run_pipeline(input_dir: str, output_dir: str, test_mode: bool = False):
     data_path.mkdir(parents=True, exist_ok=True)
     reports_path.mkdir(parents=True, exist_ok=True)
 
+    if fleet is not None:
+        if store != "csv" or live is not None:
+            raise ValueError("--fleet merges the hosts' CSV outputs; use it without --live and with --store csv")
+        from fleet import run_fleet
+        run_fleet(run_pipeline, input_path, output_path, workers=workers, chunk_size=chunk_size, options={
+            "test_mode": test_mode, "stream": stream, "chunk_size": chunk_size, "store": store,
+            "export_csv": export_csv, "llm_options": llm_options, "llm_cache": llm_cache,
+            "llm_cache_size": llm_cache_size, "summarizer": summarizer, "tree_roots": tree_roots,
+            "incremental": incremental, "triage": triage,
+        }, **fleet)
+        return
+
+    # Persistent summary cache shared by all runs using the same cache file
+    cache = SummaryCache(llm_cache, backend_namespace(summarizer), llm_cache_size) if llm_cache else None
+    llm_options = {**(llm_options or {}), "backend": summarizer}
+    summary_stats = {}
+
+    if live is not None:
+        if store != "csv" or stream or test_mode or incremental:
+            raise ValueError("--live appends to CSV outputs; use it without --stream / --test_mode / --incremental "
+                             "and with --store csv")
+        from daemon import LiveDaemon
+        daemon = LiveDaemon(input_path, data_path, reports_path, chunk_size=chunk_size, tree_roots=tree_roots,
+                            llm_options=llm_options, cache=cache, summary_stats=summary_stats, triage=triage,
+                            settings=live, socket_path=live.get("socket"), fifo_path=live.get("fifo"))
+        daemon.run()
+        _print_summary_stats(summary_stats, triage)
+        _print_outputs(data_path, reports_path)
+        return
+
+    if incremental:
+        if store != "csv" or stream or test_mode:
+            raise ValueError("--incremental appends to CSV outputs; use it without --stream / --test_mode and with --store csv")
+        from incremental import run_incremental_pipeline
+        run_incremental_pipeline(input_path, data_path, reports_path, chunk_size=chunk_size,
+                                 tree_roots=tree_roots, llm_options=llm_options,
+                                 cache=cache, summary_stats=summary_stats, triage=triage)
+        _print_summary_stats(summary_stats, triage)
+        _print_outputs(data_path, reports_path)
+        return
+
+    if stream:
+        if store != "csv":
+            raise ValueError("--stream appends CSV output chunk by chunk; use --store csv")
+        from streaming import run_streaming_pipeline
+        run_streaming_pipeline(input_path, data_path, reports_path, test_mode=test_mode,
+                               chunk_size=chunk_size, llm_options=llm_options,
+                               cache=cache, summary_stats=summary_stats, tree_roots=tree_roots,
+                               triage=triage)
+        _print_summary_stats(summary_stats, triage)
+        _print_outputs(data_path, reports_path)
+        return
+
     print("Cleaning all input datasets...")
+    drop_counts = {}
+    with stage("clean") as record:
+        if workers > 1:
+            from parallel import clean_sources_parallel
+            cleaned = clean_sources_parallel(input_path, workers, drop_counts)
+        else:
+            cleaned = {
+                source: load_events(input_path / f"{source}_events.csv", source, drop_counts.setdefault(source, {}))
+                for source in EVENT_SOURCES
+            }
+        record.rows(sum(counts.get("rows_in", 0) for counts in drop_counts.values()),
+                    sum(len(df) for df in cleaned.values()))
 
-    # Clean and normalize process event logs
-    process_df = load_process_events(input_path / "process_events.csv")
-    process_df.to_csv(data_path / "cleaned_process_events.csv", index=False)
-
-    # Clean and normalize network events
-    network_df = pd.read_csv(input_path / "network_events.csv")
-    network_df.drop_duplicates(inplace=True)
-    network_df.replace("###CORRUPT###", pd.NA, inplace=True)
-    network_df['timestamp'] = pd.to_datetime(network_df['timestamp'], errors='coerce')
-    network_df.dropna(subset=['timestamp', 'dst_ip', 'user'], inplace=True)
-    network_df['src_ip'] = network_df['src_ip'].astype(str).str.strip()
-    network_df['dst_ip'] = network_df['dst_ip'].astype(str).str.strip()
-    network_df['user'] = network_df['user'].astype(str).str.strip()
-    network_df = network_df[(network_df['timestamp'] - network_df['timestamp'].min() <= pd.Timedelta(days=366))]
-    network_df.to_csv(data_path / "cleaned_network_events.csv", index=False)
-
-    # Clean and normalize file events
-    file_df = pd.read_csv(input_path / "file_events.csv")
-    file_df.drop_duplicates(inplace=True)
-    file_df.replace("###CORRUPT###", pd.NA, inplace=True)
-    file_df['timestamp'] = pd.to_datetime(file_df['timestamp'], errors='coerce')
-    file_df.dropna(subset=['timestamp', 'file_path', 'user'], inplace=True)
-    file_df['file_path'] = file_df['file_path'].astype(str).str.strip()
-    file_df['operation'] = file_df['operation'].astype(str).str.strip()
-    file_df['user'] = file_df['user'].astype(str).str.strip()
-    file_df = file_df[(file_df['timestamp'] - file_df['timestamp'].min() <= pd.Timedelta(days=366))]
-    file_df.to_csv(data_path / "cleaned_file_events.csv", index=False)
-
-    # Clean and normalize registry events
-    reg_df = pd.read_csv(input_path / "registry_events.csv")
-    reg_df.drop_duplicates(inplace=True)
-    reg_df.replace("###CORRUPT###", pd.NA, inplace=True)
-    reg_df['timestamp'] = pd.to_datetime(reg_df['timestamp'], errors='coerce')
-    reg_df.dropna(subset=['timestamp', 'registry_key', 'operation', 'user'], inplace=True)
-    reg_df['registry_key'] = reg_df['registry_key'].astype(str).str.strip()
-    reg_df['operation'] = reg_df['operation'].astype(str).str.strip()
-    reg_df['user'] = reg_df['user'].astype(str).str.strip()
-    reg_df.to_csv(data_path / "cleaned_registry_events.csv", index=False)
+    # Save cleaned and normalized process, network, file and registry events
+    with stage("save") as record:
+        for source, df in cleaned.items():
+            save_intermediate(df, data_path, f"cleaned_{source}_events", store, export_csv)
+        record.rows(rows_in=sum(len(df) for df in cleaned.values()))
+    del cleaned
 
+    # Cleaned frames are loaded with compact dtypes (categoricals, packed IPv4, int32 pids, see
+    # compact.py); outputs render them back to the same text
     print("Loading cleaned datasets")
-    process_df, network_df, file_df, registry_df = load_cleaned_data(data_path)
+    with stage("load") as record:
+        process_df, network_df, file_df, registry_df = load_cleaned_data(data_path, store, compact=True)
+        record.rows(rows_out=len(process_df) + len(network_df) + len(file_df) + len(registry_df))
 
     print("Unifying event stream")
-    unified_df = unify_event_stream(process_df, network_df, file_df, registry_df)
+    with stage("unify") as record:
+        unified_df = unify_event_stream(process_df, network_df, file_df, registry_df)
+        record.rows(rows_in=len(process_df) + len(network_df) + len(file_df) + len(registry_df),
+                    rows_out=len(unified_df))
+
+    print("Correlating events with process instances")
+    with stage("correlate") as record:
+        unified_df = add_process_instances(unified_df, ProcessInstances(process_df))
+        record.rows(len(unified_df), len(unified_df))
+
+    print("Running anomaly detectors")
+    with stage("detect") as record:
+        unified_df = detect_anomalies(unified_df)
+        record.rows(len(unified_df), len(unified_df))
 
     if test_mode:
         print("Test mode enabled: limiting rows to 5 for LLM + MITRE enrichment")
         unified_df = unified_df.head(5).copy()
 
-    unified_df.to_csv(data_path / "unified_events.csv", index=False)
+    with stage("save") as record:
+        save_intermediate(unified_df, data_path, "unified_events", store, export_csv)
+        record.rows(rows_in=len(unified_df))
 
     print("Summarizing events with LLM")
-    unified_df["llm_summary"] = unified_df.apply(summarize_event, axis=1)
+    with stage("summarize") as record:
+        unified_df = summarize_events(unified_df, cache, summary_stats, llm_options, triage)
+        record.rows(len(unified_df), len(unified_df))
 
     print("Enriching with MITRE ATT&CK techniques")
-    unified_df = enrich_with_mitre(unified_df)
-    unified_df.to_csv(data_path / "unified_events_enriched.csv", index=False)
+    with stage("mitre") as record:
+        unified_df = enrich_with_mitre(unified_df, bundle_path=find_attack_bundle(input_path))
+        record.rows(len(unified_df), len(unified_df))
+    with stage("save") as record:
+        save_intermediate(unified_df, data_path, "unified_events_enriched", store, export_csv)
+        record.rows(rows_in=len(unified_df))
 
     print("Generating visualizations")
-    plot_event_type_distribution(unified_df, reports_path / "event_type_distribution.png")
-    plot_event_timeline(unified_df, reports_path / "event_timeline.png")
-    plot_top_talkers(unified_df, reports_path / "top_talkers.png")
+    with stage("charts") as record:
+        render_charts(chart_counts(unified_df), reports_path, workers)
+        record.rows(rows_in=len(unified_df))
 
-    print("Building process tree for PID 15150")
-    graph = build_process_tree(process_df)
-    write_process_tree_markdown_safe(graph, 15150, file_df, network_df, registry_df, reports_path / "process_tree.md")
+    root_pids = select_tree_roots(tree_roots, mitre_hit_pids(unified_df))
+    print(f"Building process tree for PID {describe_roots(root_pids)}")
+    with stage("process_tree") as record:
+        graph = build_process_tree(process_df)
+        event_index = build_event_index(file_df, network_df, registry_df, graph)
+        write_process_tree_reports(graph, root_pids, event_index, reports_path / "process_tree.md", workers)
+        record.rows(rows_in=len(process_df) + len(file_df) + len(network_df) + len(registry_df))
 
     print("Writing error documentation")
-    write_error_report(reports_path / "errors.md")
+    with stage("errors"):
+        write_error_report(reports_path / "errors.md", drop_counts)
+
+    _print_summary_stats(summary_stats, triage)
+    _print_outputs(data_path, reports_path, store)
+
+def _print_summary_stats(summary_stats: dict, triage: dict = None):
+    record_counters("summaries", summary_stats)
+    if triage is not None:
+        print(format_triage_stats(summary_stats))
+    print(format_summary_stats(summary_stats))
 
+def _print_outputs(data_path: Path, reports_path: Path, store: str = "csv"):
     print("All steps completed successfully.")
-    print(f"  --> Enriched unified data: {data_path / 'unified_events_enriched.csv'}")
+    print(f"  --> Enriched unified data: {stored_path(data_path, 'unified_events_enriched', store)}")
     print(f"  --> Process tree report:   {reports_path / 'process_tree.md'}")
     print(f"  --> Error documentation:   {reports_path / 'errors.md'}")
 
@@ -116,6 +206,96 @@ if __name__ == "__main__":
     parser.add_argument("--input_dir", required=True, help="Input directory with raw CSVs")
     parser.add_argument("--output_dir", required=True, help="Output directory for processed files and reports")
     parser.add_argument("--test_mode", action="store_true", help="Run in test mode with limited rows")
+    parser.add_argument("--stream", action="store_true", help="Process inputs in fixed-size chunks with bounded memory")
+    parser.add_argument("--chunk_size", type=int, default=500_000, help="Rows per chunk in --stream / --incremental mode")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process rows appended to the inputs since the last --incremental run")
+    parser.add_argument("--store", choices=list(STORE_SUFFIXES), default="csv",
+                        help="Format of intermediate files (parquet/arrow require pyarrow)")
+    parser.add_argument("--export_csv", action="store_true", help="Also write CSV copies when --store is not csv")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Clean sources (and byte-range shards of large sources), render process trees and charts "
+                             "in a pool of N processes")
+    parser.add_argument("--tree_roots", default="15150",
+                        help="Comma-separated root PIDs of the process tree report; 'mitre' adds every PID "
+                             "with a MITRE technique match")
+    parser.add_argument("--summarizer", choices=list(SUMMARIZER_BACKENDS), default="openai",
+                        help="Summarizer backend: OpenAI, offline stub, no-op or keyword rules")
+    parser.add_argument("--llm_concurrency", type=int, help="Concurrent LLM requests (default 1)")
+    parser.add_argument("--llm_rate", type=float, help="Maximum LLM requests per second (default unlimited)")
+    parser.add_argument("--llm_batch_size", type=int, help="Events summarized per LLM request (default 1)")
+    parser.add_argument("--llm_retries", type=int, help="Retries with exponential backoff per failed request (default 3)")
+    parser.add_argument("--llm_cache", default=".cache/llm_summaries.sqlite",
+                        help="SQLite file caching LLM summaries across runs")
+    parser.add_argument("--no_llm_cache", action="store_true", help="Do not read or write the summary cache")
+    parser.add_argument("--llm_cache_size", type=int, default=1_000_000,
+                        help="Maximum cached summaries; least recently used are evicted")
+    parser.add_argument("--triage", action="store_true",
+                        help="Score events with cheap rules and send only the best within the budget to the LLM; "
+                             "the others get template summaries")
+    parser.add_argument("--triage_top_k", type=int, help="Most events sent to the LLM (default unlimited)")
+    parser.add_argument("--triage_per_pid", type=int, help="Most events per process sent to the LLM (default 20)")
+    parser.add_argument("--triage_window", help="Time window of --triage_per_window (default 5min)")
+    parser.add_argument("--triage_per_window", type=int, help="Most events per time window sent to the LLM (default 100)")
+    parser.add_argument("--triage_min_score", type=float, help="Lowest triage score sent to the LLM (default 1.0)")
+    parser.add_argument("--live", action="store_true",
+                        help="Keep running: tail the input CSVs and process appended rows in micro-batches "
+                             "(state shared with --incremental); stop with Ctrl+C")
+    parser.add_argument("--live_socket", help="Also accept '<source>,<CSV row>' lines on this Unix socket")
+    parser.add_argument("--live_fifo", help="Also accept '<source>,<CSV row>' lines on this named pipe")
+    parser.add_argument("--live_batch_bytes", type=int, help="New input bytes that start a micro-batch at once (default 4 MiB)")
+    parser.add_argument("--live_batch_delay", type=float,
+                        help="Longest wait in seconds before smaller micro-batches are processed (default 0.5)")
+    parser.add_argument("--live_checkpoint_interval", type=float, help="Seconds between checkpoints (default 10)")
+    parser.add_argument("--live_report_interval", type=float,
+                        help="Seconds between chart / process tree / error report refreshes (default 60)")
+    parser.add_argument("--live_idle_exit", type=float, help="Stop after this many seconds without new input")
+    parser.add_argument("--fleet", action="store_true",
+                        help="--input_dir holds one directory of raw CSVs per host: process every host on its own "
+                             "in a pool of --workers processes and merge their streams with a host column")
+    parser.add_argument("--fleet_shards", type=int,
+                        help="Hash-partition the hosts into N shards, each run by one worker (default one per host)")
+    parser.add_argument("--fleet_partition", default="1D",
+                        help="Time span of each merged output file in --fleet mode, e.g. 1D or 1h")
+    parser.add_argument("--metrics", help="Write a JSON run report with wall/CPU time, peak memory and rows per stage, "
+                                          "LLM and MITRE latency histograms and summary counters")
+    parser.add_argument("--metrics_prom", help="Write the run report as a Prometheus textfile (node_exporter textfile collector)")
+    parser.add_argument("--profile", help="Write a profile per stage into this directory")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile",
+                        help="Profiler of --profile (pyinstrument must be installed)")
     args = parser.parse_args()
+    llm_options = {
+        "concurrency": args.llm_concurrency,
+        "rate": args.llm_rate,
+        "batch_size": args.llm_batch_size,
+        "retries": args.llm_retries,
+    }
+    triage = {
+        "top_k": args.triage_top_k,
+        "per_pid": args.triage_per_pid,
+        "window": args.triage_window,
+        "per_window": args.triage_per_window,
+        "min_score": args.triage_min_score,
+    } if args.triage else None
+    live = {
+        "socket": args.live_socket,
+        "fifo": args.live_fifo,
+        "batch_bytes": args.live_batch_bytes,
+        "batch_delay": args.live_batch_delay,
+        "checkpoint_interval": args.live_checkpoint_interval,
+        "report_interval": args.live_report_interval,
+        "idle_exit": args.live_idle_exit,
+    } if args.live else None
+    fleet = {
+        "shards": args.fleet_shards,
+        "partition": args.fleet_partition,
+    } if args.fleet else None
 
-    run_pipeline(args.input_dir, args.output_dir, test_mode=args.test_mode)
+    with instrumented_run(report=args.metrics, prometheus=args.metrics_prom,
+                          profile_dir=args.profile, profiler=args.profiler):
+        run_pipeline(args.input_dir, args.output_dir, test_mode=args.test_mode,
+                     stream=args.stream, chunk_size=args.chunk_size,
+                     store=args.store, export_csv=args.export_csv, workers=args.workers,
+                     llm_options=llm_options, llm_cache=None if args.no_llm_cache else args.llm_cache,
+                     llm_cache_size=args.llm_cache_size, summarizer=args.summarizer, tree_roots=args.tree_roots,
+                     incremental=args.incremental, triage=triage, live=live, fleet=fleet)
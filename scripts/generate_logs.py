@@ -0,0 +1,361 @@
+"""
+Generates synthetic raw event logs with the schemas of data/*_events.csv at any size.
+
+process_events.csv, network_events.csv, file_events.csv and registry_events.csv are written in
+chunks of --chunk_rows rows, so memory stays bounded apart from the process table (one entry per
+process event). The files contain the defects the cleaning step handles, at the rates set in
+GENERATOR_SPEC: duplicate rows, ###CORRUPT### markers, missing values, ",unexpected" suffixes,
+timestamps drifted by more than a year, inverted process lifetimes and self-parented processes.
+
+Processes form trees: most are spawned by a recently started process, some by a few long-lived
+hubs (explorer.exe, svchost.exe, ...), which gives wide, mostly shallow trees with occasional deep
+chains. Other events come from processes running at their timestamp. The malicious chain of the
+sample data (process 15150 and its descendants) is included, so the default --tree_roots works.
+
+The same --rows, --seed, --start, --span and --chunk_rows always produce identical files.
+
+    python scripts/generate_logs.py --rows 10000000 --output_dir data/synthetic
+    python scripts/generate_logs.py --rows 1000000 --hosts 8 --output_dir data/fleet
+"""
+import sys
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from cleaning import CORRUPT_MARKER, DRIFT_WINDOW
+
+# Row shares of the sources and defect rates (per generated row).
+# - corrupt_columns: text columns that get a ###CORRUPT### prefix; a corrupt timestamp is
+#   replaced by the bare marker
+# - missing_columns: columns left empty
+# - unexpected_columns: columns that get a ",unexpected" suffix (a quoted field in the CSV)
+GENERATOR_SPEC = {
+    "shares": {"process": 0.1, "network": 0.3, "file": 0.3, "registry": 0.3},
+    "duplicate_rate": 0.01,
+    "corrupt_rate": 0.01,
+    "missing_rate": 0.01,
+    "unexpected_rate": 0.002,
+    "drift_rate": 0.001,
+    "inverted_rate": 0.05,
+    "self_parent_rate": 0.02,
+    # Share of processes spawned by a hub, otherwise by one of the last recent_parents processes
+    "hub_parent_rate": 0.3,
+    "recent_parents": 1000,
+    # Events of other sources come from one of the last recent_processes started processes
+    "recent_processes": 5000,
+    "corrupt_columns": {
+        "process": ["executable_path", "start_time"],
+        "network": ["src_ip", "timestamp"],
+        "file": ["file_path", "timestamp"],
+        "registry": ["registry_key", "timestamp"],
+    },
+    "missing_columns": {"process": [], "network": ["src_ip"], "file": ["operation"], "registry": []},
+    "unexpected_columns": {"process": [], "network": [], "file": ["file_path"], "registry": ["registry_key"]},
+}
+
+COLUMNS = {
+    "process": ["process_id", "parent_id", "start_time", "end_time", "executable_path", "user", "command_line"],
+    "network": ["process_id", "src_ip", "dst_ip", "src_port", "dst_port", "timestamp", "user"],
+    "file": ["process_id", "file_path", "operation", "timestamp", "user"],
+    "registry": ["process_id", "registry_key", "operation", "timestamp", "value_name", "value_data", "user"],
+}
+SOURCES = list(COLUMNS)
+
+USERS = np.array(["admin", "janedoe", "johndoe", "user1"], dtype=object)
+PROGRAM_DIRS = ["C:/Windows/System32", "C:/Windows/SysWOW64", "C:/Program Files", "C:/Program Files (x86)",
+                "C:/Users/JohnDoe/AppData/Local/Programs"]
+PROGRAMS = ["explorer.exe", "svchost.exe", "winword.exe", "excel.exe", "chrome.exe", "msedge.exe",
+            "notepad.exe", "calc.exe", "cmd.exe", "powershell.exe"]
+FILE_DIRS = ["C:/Windows/System32", "C:/Windows/SysWOW64", "C:/Program Files", "C:/Program Files/Common Files",
+             "C:/Users/JohnDoe/Desktop", "C:/Users/JohnDoe/Documents"]
+FILE_NAMES = ["readme.txt", "data.csv", "config.ini", "log.txt", "report.docx", "image.png"]
+FILE_OPERATIONS = (["read", "write", "modify", "delete"], [0.6, 0.3, 0.07, 0.03])
+REGISTRY_KEYS = [f"{hive}\\SOFTWARE/{path}" for hive in ("HKEY_LOCAL_MACHINE", "HKEY_CURRENT_USER")
+                 for path in ("Google/Chrome", "Microsoft/Windows NT/CurrentVersion", "Microsoft/Office/16.0",
+                              "Oracle/Java", "Adobe/Acrobat Reader")]
+RUN_KEY = "HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run"
+RUN_KEY_RATE = 0.001
+REGISTRY_OPERATIONS = ["create", "delete", "modify"]
+DST_PORTS = ([443, 80, 8080, 53, 22, 3389], [0.55, 0.25, 0.1, 0.05, 0.03, 0.02])
+DST_HOSTS = 50_000
+SRC_HOSTS = 256
+
+# Long-lived processes that spawn many children: (pid, executable, user)
+HUBS = [
+    (100, "C:/Windows/System32/explorer.exe", "SYSTEM"),
+    (200, "C:/Program Files/MyBrowser/browser.exe", "admin"),
+    (300, "C:/Windows/System32/svchost.exe", "SYSTEM"),
+    (400, "C:/Windows/System32/services.exe", "SYSTEM"),
+]
+FIRST_PID = 20_000
+
+# Executables and users of the process table: the hubs' first, then every program directory
+# and name combination
+PROGRAM_PATHS = np.array([exe for _, exe, _ in HUBS] + [f"{d}/{p}" for d in PROGRAM_DIRS for p in PROGRAMS],
+                         dtype=object)
+PROCESS_USERS = np.append(USERS, "SYSTEM")
+
+# The malicious chain of the sample data per source, appended without defects; times are
+# seconds after --start.
+_TEMP_EXE = "C:/Users/Admin/AppData/Local/Temp/system_update.exe"
+ATTACK_ROWS = {
+    "process": [
+        [15150, 100, 21, 40, "C:/Users/Admin/Downloads/image_resizer.exe", "admin",
+         f'copy "C:/Users/Admin/Downloads/image_resizer.exe" "{_TEMP_EXE}" && "{_TEMP_EXE}"'],
+        [15151, 15150, 41, 45, _TEMP_EXE, "admin",
+         f'reg add "{RUN_KEY}" /v "SystemUpdateService" /t REG_SZ /d "{_TEMP_EXE}" /f'],
+        [15152, 15151, 46, 60, _TEMP_EXE, "admin", f'"{_TEMP_EXE}"'],
+        [15153, 15152, 71, 90, _TEMP_EXE, "admin", f'"{_TEMP_EXE}" --ZG93bmxvYWQ= --bW9kaWZ5LXN5c3RlbQ=='],
+        [15154, 15153, 61, 70, _TEMP_EXE, "admin",
+         f'"{_TEMP_EXE}" --Y29ubmVjdA== MTkyLjE2OC4xLjEwMA==:ODA4MA=='],
+        [15164, 15154, 200, 210, _TEMP_EXE, "admin", f'"{_TEMP_EXE}" --Y3ljbGUtMQ=='],
+    ],
+    "network": [
+        [15153, "10.0.0.23", "192.168.1.100", 49733, 8080, 75, "admin"],
+    ],
+    "file": [
+        [15150, _TEMP_EXE, "write", 22, "admin"],
+        [15153, "C:/Windows/System32/drivers/etc/hosts", "modify", 92, "admin"],
+    ],
+    "registry": [
+        [15151, RUN_KEY, "create", 42, "SystemUpdateService", _TEMP_EXE, "admin"],
+        [15153, "HKEY_LOCAL_MACHINE\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Policies", "modify", 97,
+         "DisableTaskMgr", "1", "admin"],
+    ],
+}
+_TIME_COLUMNS = {"process": ["start_time", "end_time"], "network": ["timestamp"],
+                        "file": ["timestamp"], "registry": ["timestamp"]}
+
+def _rng(seed: int, *stream) -> np.random.Generator:
+    return np.random.default_rng([seed, *stream])
+
+def _pool(values) -> np.ndarray:
+    return np.array(list(values), dtype=object)
+
+def _ips(rng: np.random.Generator, count: int, first_octet=None) -> np.ndarray:
+    octets = rng.integers(1, 255, size=(count, 4))
+    if first_octet is not None:
+        octets[:, 0] = first_octet
+    return _pool(".".join(map(str, row)) for row in octets)
+
+def _seconds(start: np.datetime64, offsets: np.ndarray) -> np.ndarray:
+    return start + offsets.astype("timedelta64[s]")
+
+# "YYYY-MM-DD HH:MM:SS" strings of datetime64[s] values, formatted by numpy (the "T" separator is
+# overwritten in the fixed-width character buffer).
+def _time_strings(values: np.ndarray) -> np.ndarray:
+    text = np.datetime_as_string(values.astype("datetime64[s]"), unit="s")
+    text.view(np.uint32).reshape(len(text), -1)[:, 10] = ord(" ")
+    return text.astype(object)
+
+def _split(total: int, parts: int) -> list:
+    return [total * (n + 1) // parts - total * n // parts for n in range(parts)]
+
+def make_process_table(count: int, span_s: int, seed: int, spec: dict = None) -> dict:
+    """
+    Process table of the generated log: pid, parent pid, start offset (seconds), lifetime,
+    executable and user codes, ordered by start. The first len(HUBS) entries are the hubs.
+    """
+    spec = GENERATOR_SPEC if spec is None else spec
+    rng = _rng(seed, len(SOURCES))
+    count = max(count, len(HUBS))
+    background = count - len(HUBS)
+    starts = np.concatenate([np.zeros(len(HUBS), dtype=np.int64),
+                             np.sort(rng.integers(0, span_s, background))])
+    pids = np.concatenate([[pid for pid, _, _ in HUBS],
+                           FIRST_PID + 3 * np.arange(background) + rng.integers(0, 3, background)]).astype(np.int64)
+    # Parent positions: a hub, or one of the recent_parents processes started before
+    positions = np.arange(len(HUBS), count)
+    recent = positions - 1 - rng.integers(0, spec["recent_parents"], background)
+    hub = rng.random(background) < spec["hub_parent_rate"]
+    parent_pos = np.where(hub | (recent < 0), rng.integers(0, len(HUBS), background), recent)
+    parents = np.concatenate([[0] + [HUBS[0][0]] * (len(HUBS) - 1), pids[parent_pos]]).astype(np.int64)
+    lifetimes = np.concatenate([np.full(len(HUBS), span_s + 3600),
+                                rng.exponential(1800, background).astype(np.int64) + 1])
+    return {
+        "pid": pids,
+        "parent": parents,
+        "start": starts,
+        "lifetime": lifetimes,
+        "program": np.concatenate([np.arange(len(HUBS)),
+                                   rng.integers(len(HUBS), len(PROGRAM_PATHS), background)]),
+        "user": np.concatenate([[PROCESS_USERS.tolist().index(user) for _, _, user in HUBS],
+                                rng.integers(0, len(USERS), background)]),
+    }
+
+def _process_rows(table: dict, lo: int, hi: int, start: np.datetime64, rng: np.random.Generator,
+                  spec: dict) -> pd.DataFrame:
+    executables = PROGRAM_PATHS[table["program"][lo:hi]]
+    starts = table["start"][lo:hi]
+    ends = starts + table["lifetime"][lo:hi]
+    inverted = rng.random(hi - lo) < spec["inverted_rate"]
+    ends = np.where(inverted, starts - rng.integers(1, 3600, hi - lo), ends)
+    pids = table["pid"][lo:hi]
+    parents = np.where(rng.random(hi - lo) < spec["self_parent_rate"], pids, table["parent"][lo:hi])
+    return pd.DataFrame({
+        "process_id": pids,
+        "parent_id": parents,
+        "start_time": _seconds(start, starts),
+        "end_time": _seconds(start, ends),
+        "executable_path": executables,
+        "user": PROCESS_USERS[table["user"][lo:hi]],
+        "command_line": '"' + executables + '"',
+    })
+
+# Processes emitting events at the given offsets: one of the recent_processes started last.
+def _emitters(table: dict, offsets: np.ndarray, rng: np.random.Generator, spec: dict) -> np.ndarray:
+    started = np.searchsorted(table["start"], offsets, side="right")
+    return np.maximum(started - 1 - rng.integers(0, spec["recent_processes"], len(offsets)), 0)
+
+def _network_rows(emitters, pids, users, offsets, start, rng, pools) -> pd.DataFrame:
+    n = len(offsets)
+    return pd.DataFrame({
+        "process_id": pids,
+        "src_ip": pools["src"][rng.integers(0, len(pools["src"]), n)],
+        "dst_ip": pools["dst"][np.minimum(rng.zipf(1.3, n), len(pools["dst"])) - 1],
+        "src_port": rng.integers(1024, 65536, n),
+        "dst_port": rng.choice(DST_PORTS[0], n, p=DST_PORTS[1]),
+        "timestamp": _seconds(start, offsets),
+        "user": users,
+    })
+
+def _file_rows(emitters, pids, users, offsets, start, rng, pools) -> pd.DataFrame:
+    n = len(offsets)
+    return pd.DataFrame({
+        "process_id": pids,
+        "file_path": pools["files"][rng.integers(0, len(pools["files"]), n)],
+        "operation": rng.choice(FILE_OPERATIONS[0], n, p=FILE_OPERATIONS[1]),
+        "timestamp": _seconds(start, offsets),
+        "user": users,
+    })
+
+def _registry_rows(emitters, pids, users, offsets, start, rng, pools) -> pd.DataFrame:
+    n = len(offsets)
+    keys = pools["keys"][rng.integers(0, len(pools["keys"]), n)]
+    operations = _pool(REGISTRY_OPERATIONS)[rng.integers(0, len(REGISTRY_OPERATIONS), n)]
+    # Autostart entries written by the process for its own executable
+    run = rng.random(n) < RUN_KEY_RATE
+    keys[run] = RUN_KEY
+    operations[run] = "create"
+    value_names = np.full(n, None, dtype=object)
+    value_data = np.full(n, None, dtype=object)
+    value_names[run] = "Updater"
+    value_data[run] = PROGRAM_PATHS[pools["programs"][emitters[run]]]
+    return pd.DataFrame({
+        "process_id": pids,
+        "registry_key": keys,
+        "operation": operations,
+        "timestamp": _seconds(start, offsets),
+        "value_name": value_names,
+        "value_data": value_data,
+        "user": users,
+    })
+
+ROW_BUILDERS = {"network": _network_rows, "file": _file_rows, "registry": _registry_rows}
+
+def _attack_rows(source: str, start: np.datetime64) -> pd.DataFrame:
+    rows = pd.DataFrame(ATTACK_ROWS[source], columns=COLUMNS[source])
+    for column in _TIME_COLUMNS[source]:
+        rows[column] = _seconds(start, rows[column].to_numpy(dtype=np.int64))
+    return rows
+
+# Adds defects to a chunk: corrupt markers, missing values, unexpected suffixes, drifted
+# timestamps and duplicates of earlier rows, then shuffles the chunk.
+def _add_defects(df: pd.DataFrame, source: str, rng: np.random.Generator, spec: dict) -> pd.DataFrame:
+    n = len(df)
+    drifted = rng.random(n) < spec["drift_rate"]
+    for column in _TIME_COLUMNS[source]:
+        df.loc[drifted, column] += DRIFT_WINDOW + pd.Timedelta(days=30)
+    for column in _TIME_COLUMNS[source]:
+        df[column] = _time_strings(df[column].to_numpy())
+    for column in spec["unexpected_columns"][source]:
+        rows = rng.random(n) < spec["unexpected_rate"]
+        df.loc[rows, column] = df.loc[rows, column].astype(str) + ",unexpected"
+    for column in spec["missing_columns"][source]:
+        df.loc[rng.random(n) < spec["missing_rate"], column] = None
+    columns = spec["corrupt_columns"][source]
+    corrupt = np.flatnonzero(rng.random(n) < spec["corrupt_rate"])
+    picks = rng.integers(0, len(columns), len(corrupt))
+    for i, column in enumerate(columns):
+        rows = corrupt[picks == i]
+        if column in ("timestamp", "start_time"):
+            df.iloc[rows, df.columns.get_loc(column)] = CORRUPT_MARKER
+        else:
+            df.iloc[rows, df.columns.get_loc(column)] = CORRUPT_MARKER + df.iloc[rows][column].astype(str)
+    duplicates = rng.integers(0, n, int(n * spec["duplicate_rate"])) if n else np.zeros(0, dtype=np.int64)
+    df = pd.concat([df, df.iloc[duplicates]], ignore_index=True)
+    return df.take(rng.permutation(len(df))).reset_index(drop=True)
+
+def _write(df: pd.DataFrame, path: Path, first: bool):
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+def generate_logs(output_dir: Path, rows: int, seed: int = 0, start: str = "2025-03-01 09:00:00",
+                  span: str = "1D", chunk_rows: int = 1_000_000, spec: dict = None) -> dict:
+    """
+    Writes the four raw event files for about `rows` events in total (plus duplicates) and
+    returns the number of rows written per source.
+    """
+    spec = GENERATOR_SPEC if spec is None else spec
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = np.datetime64(pd.Timestamp(start).to_datetime64(), "s")
+    span_s = int(pd.Timedelta(span).total_seconds())
+    counts = {source: int(rows * spec["shares"][source]) for source in SOURCES}
+    table = make_process_table(counts["process"], span_s, seed, spec)
+    counts["process"] = len(table["pid"])
+    pools_rng = _rng(seed, len(SOURCES) + 1)
+    pools = {
+        "src": _ips(pools_rng, SRC_HOSTS, first_octet=10),
+        "dst": _ips(pools_rng, DST_HOSTS),
+        "files": _pool(f"{d}/{name}" for d in FILE_DIRS for name in FILE_NAMES),
+        "keys": _pool(REGISTRY_KEYS),
+        "programs": table["program"],
+    }
+
+    written = {}
+    for index, source in enumerate(SOURCES):
+        path = output_dir / f"{source}_events.csv"
+        chunks = _split(counts[source], max(1, -(-counts[source] // chunk_rows)))
+        lo = 0
+        written[source] = 0
+        for n, size in enumerate(chunks):
+            rng = _rng(seed, index, n)
+            if source == "process":
+                df = _process_rows(table, lo, lo + size, start, rng, spec)
+            else:
+                # Each chunk covers its share of the time span, so files are roughly time ordered
+                first_s, last_s = span_s * lo // counts[source], span_s * (lo + size) // counts[source]
+                offsets = np.sort(rng.integers(first_s, max(last_s, first_s + 1), size))
+                emitters = _emitters(table, offsets, rng, spec)
+                df = ROW_BUILDERS[source](emitters, table["pid"][emitters], PROCESS_USERS[table["user"][emitters]],
+                                          offsets, start, rng, pools)
+            df = _add_defects(df, source, rng, spec)
+            if n == 0:
+                df = pd.concat([df, _attack_rows(source, start)], ignore_index=True)
+            _write(df[COLUMNS[source]], path, n == 0)
+            written[source] += len(df)
+            lo += size
+        print(f"Wrote {written[source]:,} rows to {path} ({path.stat().st_size / 2**20:.1f} MB)")
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic raw event logs")
+    parser.add_argument("--rows", type=int, required=True, help="Events in total over the four sources")
+    parser.add_argument("--output_dir", required=True, help="Directory for the *_events.csv files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2025-03-01 09:00:00", help="Time of the first event")
+    parser.add_argument("--span", default="1D", help="Time covered by the events, e.g. 1h or 7D")
+    parser.add_argument("--chunk_rows", type=int, default=1_000_000, help="Rows generated and written at a time")
+    parser.add_argument("--hosts", type=int,
+                        help="Write a fleet: N host directories (host-000, ...) of --rows events each, seeds --seed + i")
+    args = parser.parse_args()
+    if args.hosts:
+        for i in range(args.hosts):
+            generate_logs(Path(args.output_dir) / f"host-{i:03d}", args.rows, args.seed + i, args.start, args.span,
+                          args.chunk_rows)
+    else:
+        generate_logs(Path(args.output_dir), args.rows, args.seed, args.start, args.span, args.chunk_rows)
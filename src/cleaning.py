@@ -1,7 +1,186 @@
-
 import pandas as pd
 import numpy as np
 
+DRIFT_WINDOW = pd.Timedelta(days=366)
+CORRUPT_MARKER = "###CORRUPT###"
+
+# Columns parsed as integers after cleaning text-read chunks or shards; everything else stays
+# text so that row hashes used for de-duplication do not depend on per-piece type inference.
+INTEGER_COLUMNS = ["process_id", "parent_id", "src_port", "dst_port"]
+
+def restore_integers(df: pd.DataFrame) -> pd.DataFrame:
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col])
+    return df
+
+def new_cleaning_state(min_time=None) -> dict:
+    """
+    Running state carried across chunks when a source is cleaned in pieces.
+
+    - seen: 64-bit hashes of every row already kept (global de-duplication), as sorted runs
+    - min_time: fixed origin for the time drift filter (earliest valid timestamp of the whole source)
+    - observed_min: earliest valid timestamp seen so far, used to find min_time in a first pass
+    """
+    return {"seen": [], "min_time": min_time, "observed_min": None}
+
+# The hashes of each chunk become a sorted run, and runs are merged while the one before is no
+# larger, so sizes at least double down the list: every hash is merged O(log n) times and looked
+# up in O(log n) runs, rather than every chunk being inserted into one array of all hashes.
+# Lookups take the chunk's hashes in sorted order, which keeps the binary searches cache-local.
+def _in_runs(runs: list, hashes: np.ndarray) -> np.ndarray:
+    found = np.zeros(len(hashes), dtype=bool)
+    for run in runs:
+        pos = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+        found |= run[pos] == hashes
+    return found
+
+def _add_run(runs: list, run: np.ndarray):
+    while runs and len(runs[-1]) <= len(run):
+        # Stable sort of two sorted runs is a merge
+        run = np.sort(np.concatenate([runs.pop(), run]), kind="stable")
+    runs.append(run)
+
+# Drops duplicate rows; with a state, also drops rows already seen in earlier chunks.
+def _drop_duplicates(df: pd.DataFrame, state) -> pd.DataFrame:
+    if state is None or "seen" not in state:
+        return df.drop_duplicates()
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    order = np.argsort(hashes, kind="stable")
+    ordered = hashes[order]
+    # The first of equal hashes in stable order is the row's first occurrence
+    new = np.ones(len(ordered), dtype=bool)
+    new[1:] = ordered[1:] != ordered[:-1]
+    new &= ~_in_runs(state["seen"], ordered)
+    if new.any():
+        _add_run(state["seen"], ordered[new])
+    keep = np.zeros(len(hashes), dtype=bool)
+    keep[order[new]] = True
+    return df[keep]
+
+# Cleaning rules in the order they are applied; each dropped row is counted under the first rule it fails.
+DROP_RULES = ["duplicate", "missing_required", "inverted_time", "time_drift", "self_parent"]
+
+# Per-source cleaning specs:
+# - required: rows missing (or with corrupt / unparseable) values here are dropped
+# - timestamps: parsed with pd.to_datetime(errors="coerce")
+# - strip: converted to text and whitespace-trimmed
+# - categorical: stored as category dtype after stripping
+# - drift_column: events more than drift_window after its earliest valid value are dropped
+# - time_order: (start, end) pair; rows ending before they start are dropped
+# - no_self_parent: drop rows whose process_id equals parent_id
+CLEANING_SPECS = {
+    "process": {
+        "required": ["start_time", "end_time"],
+        "timestamps": ["start_time", "end_time"],
+        "strip": ["executable_path", "user", "command_line"],
+        "categorical": ["user"],
+        "drift_column": "start_time",
+        "drift_window": DRIFT_WINDOW,
+        "time_order": ("start_time", "end_time"),
+        "no_self_parent": True,
+    },
+    "network": {
+        "required": ["timestamp", "dst_ip", "user"],
+        "timestamps": ["timestamp"],
+        "strip": ["src_ip", "dst_ip", "user"],
+        "categorical": ["user"],
+        "drift_column": "timestamp",
+        "drift_window": DRIFT_WINDOW,
+    },
+    "file": {
+        "required": ["timestamp", "file_path", "user"],
+        "timestamps": ["timestamp"],
+        "strip": ["file_path", "operation", "user"],
+        "categorical": ["operation", "user"],
+        "drift_column": "timestamp",
+        "drift_window": DRIFT_WINDOW,
+    },
+    "registry": {
+        "required": ["timestamp", "registry_key", "operation", "user"],
+        "timestamps": ["timestamp"],
+        "strip": ["registry_key", "operation", "user"],
+        "categorical": ["operation", "user"],
+        "drift_column": None,
+    },
+}
+
+def _is_text(col: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(col) or pd.api.types.is_string_dtype(col)
+
+# Replaces exact corrupt markers with NaN in text columns.
+def _without_corrupt(col: pd.Series) -> pd.Series:
+    return col.mask(col == CORRUPT_MARKER) if _is_text(col) else col
+
+# Rows within the drift window of the earliest timestamp among the still-valid rows.
+# With a state, the origin is state["min_time"] when known instead of this frame's minimum.
+def _drift_mask(ts: pd.Series, valid: np.ndarray, window: pd.Timedelta, state) -> np.ndarray:
+    min_time = ts[valid].min()
+    if state is not None:
+        observed = state.get("observed_min")
+        if pd.notna(min_time) and (observed is None or min_time < observed):
+            state["observed_min"] = min_time
+        if state.get("min_time") is not None:
+            min_time = state["min_time"]
+    return (ts - min_time <= window).to_numpy()
+
+def _count(stats, rule: str, n: int):
+    if stats is not None:
+        stats[rule] = stats.get(rule, 0) + int(n)
+
+def clean_events(df: pd.DataFrame, spec: dict, state=None, stats=None) -> pd.DataFrame:
+    """
+    Cleans one event frame according to a CLEANING_SPECS entry.
+
+    Row rules are evaluated as boolean masks over the de-duplicated frame and applied with a
+    single filter; only the surviving rows are then copied into the output columns. Drop counts
+    per rule (plus rows_in / rows_out) are added to the optional stats dict.
+    """
+    rows_in = len(df)
+    df = _drop_duplicates(df, state)
+    _count(stats, "rows_in", rows_in)
+    _count(stats, "duplicate", rows_in - len(df))
+
+    parsed = {col: pd.to_datetime(_without_corrupt(df[col]), errors='coerce') for col in spec["timestamps"]}
+    required = [parsed[col] if col in parsed else _without_corrupt(df[col]) for col in spec["required"]]
+    keep = np.ones(len(df), dtype=bool)
+    for col in required:
+        keep &= col.notna().to_numpy()
+    _count(stats, "missing_required", len(df) - keep.sum())
+
+    if spec.get("time_order"):
+        start, end = spec["time_order"]
+        ordered = keep & (parsed[end] >= parsed[start]).to_numpy()
+        _count(stats, "inverted_time", keep.sum() - ordered.sum())
+        keep = ordered
+
+    if spec.get("drift_column"):
+        in_window = keep & _drift_mask(parsed[spec["drift_column"]], keep, spec["drift_window"], state)
+        _count(stats, "time_drift", keep.sum() - in_window.sum())
+        keep = in_window
+
+    if spec.get("no_self_parent"):
+        # Corrupt pids compare as NaN, which never equals the other pid
+        distinct = keep & (_without_corrupt(df["process_id"]) != _without_corrupt(df["parent_id"])).to_numpy()
+        _count(stats, "self_parent", keep.sum() - distinct.sum())
+        keep = distinct
+
+    columns = {}
+    for col in df.columns:
+        values = parsed[col] if col in parsed else _without_corrupt(df[col])
+        values = values[keep]
+        if col in spec["strip"]:
+            values = values.astype(str).str.strip()
+        if col in spec.get("categorical", []):
+            values = values.astype("category")
+        columns[col] = values
+    cleaned = pd.DataFrame(columns, index=df.index[keep])
+    _count(stats, "rows_out", len(cleaned))
+    return cleaned
+
+def load_events(file_path: str, source: str, stats=None) -> pd.DataFrame:
+    return clean_events(pd.read_csv(file_path), CLEANING_SPECS[source], stats=stats)
+
 """
     Cleans and normalizes the process_events dataset.
 
@@ -10,20 +189,8 @@ import numpy as np
     - Strips extra whitespace from key fields
     - Filters invalid relationships and time drift
     """
-def load_process_events(file_path: str) -> pd.DataFrame:
-    df = pd.read_csv(file_path)
-    df.drop_duplicates(inplace=True)
-    df.replace("###CORRUPT###", np.nan, inplace=True)
-    df['start_time'] = pd.to_datetime(df['start_time'], errors='coerce')
-    df['end_time'] = pd.to_datetime(df['end_time'], errors='coerce')
-    df.dropna(subset=['start_time', 'end_time'], inplace=True)
-    df = df[df['end_time'] >= df['start_time']]
-    min_time = df['start_time'].min()
-    df = df[(df['start_time'] - min_time <= pd.Timedelta(days=366))]
-    for col in ['executable_path', 'user', 'command_line']:
-        df[col] = df[col].astype(str).str.strip()
-    df = df[df['process_id'] != df['parent_id']]
-    return df
+def load_process_events(file_path: str, stats=None) -> pd.DataFrame:
+    return load_events(file_path, "process", stats)
 
 def save_cleaned_process_events(df: pd.DataFrame, output_path: str):
     df.to_csv(output_path, index=False)
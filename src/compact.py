@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+# Compact in-memory dtypes of cleaned event frames, applied by compact_frame:
+# - int32 / uint16: integer columns; left as they are when a value is missing or out of range
+# - ipv4: dotted-quad addresses packed into uint32 (see ipv4_text); a column holding anything
+#   else is stored as a categorical instead
+# - category: repeated strings, dictionary-encoded when at most MAX_CATEGORY_SHARE of the
+#   values are distinct
+COMPACT_SPECS = {
+    "process": {
+        "int32": ["process_id", "parent_id"],
+        "category": ["executable_path", "user", "command_line"],
+    },
+    "network": {
+        "int32": ["process_id"],
+        "uint16": ["src_port", "dst_port"],
+        "ipv4": ["src_ip", "dst_ip"],
+        "category": ["user"],
+    },
+    "file": {
+        "int32": ["process_id"],
+        "category": ["file_path", "operation", "user"],
+    },
+    "registry": {
+        "int32": ["process_id"],
+        "category": ["registry_key", "operation", "value_name", "value_data", "user"],
+    },
+}
+
+MAX_CATEGORY_SHARE = 0.5
+
+# Columns that may hold packed addresses.
+IPV4_COLUMNS = sorted({col for spec in COMPACT_SPECS.values() for col in spec.get("ipv4", [])})
+
+def _narrow(values: pd.Series, dtype) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(values.dtype):
+        return values
+    info = np.iinfo(dtype)
+    array = values.to_numpy()
+    if len(array) and (np.isnan(array).any() if array.dtype.kind == "f" else False):
+        return values
+    if len(array) and (array.min() < info.min or array.max() > info.max or (array != np.floor(array)).any()):
+        return values
+    return values.astype(dtype)
+
+def _category(values: pd.Series) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    if values.nunique(dropna=False) > MAX_CATEGORY_SHARE * len(values):
+        return values
+    return values.astype("category")
+
+_OCTETS = np.array([str(octet) for octet in range(256)], dtype=object)
+
+# Dotted-quad text of uint32 addresses, built once per distinct address.
+def ipv4_text(packed: np.ndarray) -> np.ndarray:
+    codes, addresses = pd.factorize(np.asarray(packed, dtype=np.uint32))
+    octets = [_OCTETS[(addresses >> np.uint32(shift)) & np.uint32(0xFF)] for shift in (24, 16, 8, 0)]
+    return (octets[0] + "." + octets[1] + "." + octets[2] + "." + octets[3])[codes]
+
+# One address as text, packed or not (for report lines built from compact frames).
+def ip_text(value) -> str:
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return ipv4_text(np.array([value]))[0]
+    return value
+
+# Addresses packed into uint32, or None unless every value is a dotted quad that renders back
+# to the same text.
+def pack_ipv4(values: pd.Series):
+    codes, uniques = pd.factorize(values)
+    if (codes < 0).any():
+        return None
+    texts = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+    octets = texts.str.split(".", expand=True)
+    if octets.shape[1] != 4:
+        return None
+    numbers = octets.apply(pd.to_numeric, errors="coerce")
+    if numbers.isna().any().any() or ((numbers < 0) | (numbers > 255)).any().any():
+        return None
+    packed = np.zeros(len(texts), dtype=np.uint32)
+    for i in range(4):
+        packed = (packed << np.uint32(8)) | numbers[i].to_numpy(dtype=np.uint32)
+    if (ipv4_text(packed) != texts.to_numpy(dtype=object)).any():
+        return None
+    return packed[codes]
+
+def compact_frame(df: pd.DataFrame, source: str, specs: dict = None) -> pd.DataFrame:
+    """
+    Converts a cleaned frame of the given source to the COMPACT_SPECS dtypes. Values are
+    unchanged: CSV output of a compact frame matches the original once ipv4_text has turned
+    packed addresses back into text.
+    """
+    spec = (specs or COMPACT_SPECS)[source]
+    columns = {}
+    for col in spec.get("int32", []):
+        if col in df:
+            columns[col] = _narrow(df[col], np.int32)
+    for col in spec.get("uint16", []):
+        if col in df:
+            columns[col] = _narrow(df[col], np.uint16)
+    for col in spec.get("ipv4", []):
+        if col in df:
+            packed = pack_ipv4(df[col])
+            columns[col] = pd.Series(packed, index=df.index) if packed is not None else _category(df[col])
+    for col in spec.get("category", []):
+        if col in df:
+            columns[col] = _category(df[col])
+    return df.assign(**columns)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Cross-source correlation: links every unified event to the process instance it belongs to.
+# PIDs are reused, so process_id alone does not identify a process. An event of pid p at time t
+# belongs to the instance of p that started last at or before t, provided t is not after that
+# instance's end_time (a missing end_time means it was still running). Events before the first
+# start or after the end of their pid's instance get no instance.
+#
+# The key of an instance is "<pid>@<start_time>", e.g. "15150@2025-03-01 09:00:05"; it depends
+# only on the process record, so it is the same in every run and mode.
+INSTANCE_COLUMN = "process_instance"
+
+_NAT = np.iinfo(np.int64).min
+_NO_END = np.iinfo(np.int64).max
+
+def _ns(values) -> np.ndarray:
+    return pd.to_datetime(pd.Series(values)).to_numpy("datetime64[ns]").view(np.int64)
+
+# Pids as int64 and the mask of rows that have one; a missing pid makes the column float
+# (or nullable) after cleaning.
+def _pids(values):
+    values = pd.Series(values)
+    known = values.notna().to_numpy()
+    return values.fillna(0).to_numpy(dtype=np.int64), known
+
+class ProcessInstances:
+    """
+    Sorted interval index of process lifetimes, from cleaned process frames.
+
+    Instances are kept sorted by (process_id, start_time), with the distinct pids and the offset
+    of each pid's instances (CSR). A block of events is assigned with one hash lookup of the pids
+    and a binary search over each event's own pid segment, vectorized over the block, so the cost
+    grows with log(instances per pid). add() extends the index with later process rows, e.g. in
+    incremental and live runs.
+    """
+
+    def __init__(self, process_df: pd.DataFrame = None):
+        self.pids = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.ends = np.zeros(0, dtype=np.int64)
+        self._index()
+        if process_df is not None:
+            self.add(process_df)
+
+    def __len__(self) -> int:
+        return len(self.pids)
+
+    def add(self, process_df: pd.DataFrame):
+        starts = _ns(process_df["start_time"])
+        ends = _ns(process_df["end_time"])
+        pids, known = _pids(process_df["process_id"])
+        # Rows without a pid or a start cannot bound any event
+        known = known & (starts != _NAT)
+        pids = np.concatenate([self.pids, pids[known]])
+        starts = np.concatenate([self.starts, starts[known]])
+        ends = np.concatenate([self.ends, np.where(ends == _NAT, _NO_END, ends)[known]])
+        # Existing instances come first, so equal (pid, start) rows keep their arrival order
+        order = np.lexsort((starts, pids))
+        self.pids, self.starts, self.ends = pids[order], starts[order], ends[order]
+        self._index()
+
+    def _index(self):
+        first = np.flatnonzero(np.r_[True, self.pids[1:] != self.pids[:-1]]) if len(self.pids) else self.pids
+        self.keys = pd.Index(self.pids[first])
+        self.indptr = np.append(first, len(self.pids)).astype(np.int64)
+
+    # Binary search of each event's pid segment. Returns the rows with a known pid and time, the
+    # position of the last instance of their pid starting at or before them (below first when
+    # there is none), the first instance of their pid and their times.
+    def _search(self, codes: np.ndarray, times: np.ndarray):
+        rows = np.flatnonzero((codes >= 0) & (times != _NAT))
+        times, first = times[rows], self.indptr[codes[rows]]
+        # Binary search for the first instance of the pid starting after the event
+        lo, hi = first.copy(), self.indptr[codes[rows] + 1]
+        active = np.flatnonzero(lo < hi)
+        while len(active):
+            mid = (lo[active] + hi[active]) // 2
+            later = self.starts[mid] > times[active]
+            hi[active[later]] = mid[later]
+            lo[active[~later]] = mid[~later] + 1
+            active = active[lo[active] < hi[active]]
+        return rows, lo - 1, first, times
+
+    def _codes(self, pids) -> np.ndarray:
+        pids, known = _pids(pids)
+        return np.where(known, self.keys.get_indexer(pids), -1)
+
+    def assign(self, pids, timestamps) -> np.ndarray:
+        """
+        Position (into the sorted instance arrays) of the instance of each event, -1 for events
+        without a pid, of unknown pids and outside their pid's lifetimes.
+        """
+        codes = self._codes(pids)
+        positions = np.full(len(codes), -1, dtype=np.int64)
+        rows, found, first, times = self._search(codes, _ns(timestamps))
+        valid = found >= first
+        valid[valid] = times[valid] <= self.ends[found[valid]]
+        positions[rows[valid]] = found[valid]
+        return positions
+
+    def nearest(self, pids, timestamps) -> np.ndarray:
+        """
+        Like assign, but every event of a known pid gets an instance: the last one started at
+        or before the event even if it had ended, else (also without a time) the pid's first.
+        Used to place events and child processes in the process trees.
+        """
+        codes = self._codes(pids)
+        positions = np.where(codes >= 0, self.indptr[np.maximum(codes, 0)], -1)
+        rows, found, first, _ = self._search(codes, _ns(timestamps))
+        positions[rows] = np.maximum(found, first)
+        return positions
+
+    # "<pid>@<start_time>" keys of instance positions, rendered once per distinct instance.
+    def instance_keys(self, positions: np.ndarray) -> pd.Categorical:
+        assigned = positions >= 0
+        codes, distinct = pd.factorize(positions[assigned])
+        texts = pd.Series([f"{pid}@{pd.Timestamp(start)}" for pid, start
+                           in zip(self.pids[distinct].tolist(), self.starts[distinct].tolist())], dtype="str")
+        # Instances with the same pid and start share a key
+        key_codes, keys = pd.factorize(texts)
+        all_codes = np.full(len(positions), -1, dtype=np.int64)
+        all_codes[assigned] = key_codes[codes]
+        return pd.Categorical.from_codes(all_codes, categories=keys)
+
+# Adds INSTANCE_COLUMN (right after process_id) to unified events; events without an instance
+# get a missing value.
+def add_process_instances(events: pd.DataFrame, instances: ProcessInstances) -> pd.DataFrame:
+    keys = instances.instance_keys(instances.assign(events["process_id"], events["timestamp"]))
+    events = events.drop(columns=[INSTANCE_COLUMN], errors="ignore")
+    events.insert(events.columns.get_loc("process_id") + 1, INSTANCE_COLUMN, keys)
+    return events
+
+# ProcessInstances of the cleaned process CSV, reading only the lifetime columns.
+def instances_from_csv(path, chunk_size: int = 500_000) -> ProcessInstances:
+    chunks = pd.read_csv(path, usecols=["process_id", "start_time", "end_time"], chunksize=chunk_size)
+    return ProcessInstances(pd.concat(list(chunks), ignore_index=True))
@@ -0,0 +1,487 @@
+import os
+import copy
+import time
+import pickle
+import signal
+import shutil
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import deque
+
+from integration import concat_events
+from errors import write_error_report
+from visualizations import add_chart_counts, render_charts
+from detectors import detect_anomalies
+from correlation import add_process_instances
+from triage import summarize_events_async, expire_windows
+from mitre_lookup import load_attack_techniques, enrich_with_mitre, find_attack_bundle
+from metrics import histogram
+from streaming import SOURCES, _stable_by_timestamp, _append_csv
+from incremental import (
+    SOURCE_RANK,
+    STATE_DIR,
+    UNIFIED_FILES,
+    open_state,
+    finish_rewrites,
+    record_rewrites,
+    rescore_tail,
+    rewrite_tail_into,
+    track_stale_instances,
+    record_hits,
+    update_tree_report,
+    _ingest_source,
+    _header_end,
+    _output_sizes,
+    _save_state,
+)
+
+# Micro-batch triggers, back-pressure and checkpoint cadence of the live daemon:
+# - poll_interval: seconds between checks of the input files for appended bytes
+# - batch_bytes: appended bytes that start a batch at once; larger backlogs are read in batches of this size
+# - batch_delay: longest wait (seconds) after new bytes appear before a smaller batch is started
+# - queue_size: batches buffered between the ingest, LLM and write stages
+# - max_backlog: unread bytes in the input files above which socket / named pipe senders are paused
+# - checkpoint_interval: seconds between checkpoints of offsets, outputs and state
+# - report_interval: seconds between refreshes of charts, process_tree.md and errors.md
+# - idle_exit: stop after this many seconds without new input (None: run until SIGINT / SIGTERM)
+# - triage_lateness: event time behind a batch's latest event after which triage forgets the events
+#   it kept per window; a later event of such a window gets its full per_window room again
+DAEMON_SETTINGS = {
+    "poll_interval": 0.2,
+    "batch_bytes": 4 << 20,
+    "batch_delay": 0.5,
+    "queue_size": 2,
+    "max_backlog": 256 << 20,
+    "checkpoint_interval": 10.0,
+    "report_interval": 60.0,
+    "idle_exit": None,
+    "triage_lateness": "1h",
+}
+
+# Bytes read at a time from a socket connection or named pipe.
+_READ_BYTES = 1 << 16
+
+class _Rebuild(Exception):
+    pass
+
+# Complete lines of buffer + data, and the partial line left over.
+def _split_lines(buffer: bytes, data: bytes):
+    data = buffer + data
+    cut = data.rfind(b"\n") + 1
+    return data[:cut].splitlines(keepends=True), data[cut:]
+
+class Spool:
+    """
+    Appends rows received on a socket or named pipe to the raw CSVs the daemon tails, so they
+    are ingested, checkpointed and replayed exactly like rows the sensors append themselves.
+    Each received line is "<source>,<CSV row>" with source one of streaming.SOURCES; lines
+    naming another source are counted in rejected and dropped.
+    """
+
+    def __init__(self, input_path: Path):
+        self.files = {}
+        for source, (raw_name, _) in SOURCES.items():
+            f = open(input_path / raw_name, "ab")
+            if f.tell() and _last_byte(input_path / raw_name) != b"\n":
+                f.write(b"\n")
+            self.files[source.encode()] = f
+        self.lock = threading.Lock()
+        self.rejected = 0
+        self.closed = False
+
+    def write(self, lines):
+        by_source = {}
+        for line in lines:
+            source, sep, row = line.partition(b",")
+            if not sep or source not in self.files:
+                self.rejected += 1
+                continue
+            by_source.setdefault(source, []).append(row if row.endswith(b"\n") else row + b"\n")
+        with self.lock:
+            if self.closed:
+                return
+            for source, rows in by_source.items():
+                self.files[source].write(b"".join(rows))
+                self.files[source].flush()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            for f in self.files.values():
+                f.close()
+
+def _last_byte(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1)
+
+class LiveDaemon:
+    """
+    Long-running variant of the incremental pipeline (see incremental.py, whose manifest and
+    state it shares). Rows appended to the four input CSVs, or received on a Unix socket or
+    named pipe and spooled into them, are processed in micro-batches by three stages connected
+    by bounded queues:
+
+    - ingest (worker thread): cleans the new rows, builds and scores their unified events and
+      appends them to unified_events.csv
+    - summarize (an asyncio task on the daemon's event loop): LLM summaries, with triage
+    - write (worker thread): MITRE enrichment, unified_events_enriched.csv, chart counts and
+      MITRE hits; charts, process_tree.md and errors.md are refreshed every report_interval
+
+    A full queue blocks the stage in front of it, and a backlog above max_backlog pauses
+    socket / pipe senders. Every checkpoint_interval the ingest stage snapshots its offsets and
+    state; the write stage saves the snapshot once it has written the same batch, so a restart
+    rolls the outputs back to that batch and resumes at the recorded offsets.
+    """
+
+    def __init__(self, input_path: Path, data_path: Path, reports_path: Path, chunk_size: int = 500_000,
+                 tree_roots: str = "15150", llm_options: dict = None, cache=None, summary_stats=None,
+                 triage: dict = None, settings: dict = None, socket_path: str = None, fifo_path: str = None):
+        self.input_path = Path(input_path)
+        self.data_path = Path(data_path)
+        self.reports_path = Path(reports_path)
+        self.chunk_size = chunk_size
+        self.tree_roots = tree_roots
+        self.llm_options = llm_options
+        self.cache = cache
+        self.summary_stats = {} if summary_stats is None else summary_stats
+        self.triage = triage
+        self.settings = {**DAEMON_SETTINGS, **{k: v for k, v in (settings or {}).items() if v is not None}}
+        self.socket_path = socket_path
+        self.fifo_path = fifo_path
+        missing = [raw for raw, _ in SOURCES.values() if not (self.input_path / raw).exists()]
+        if missing:
+            raise FileNotFoundError(f"Live mode tails existing CSVs with a header line; missing: {', '.join(missing)}")
+        self.techniques = load_attack_techniques(find_attack_bundle(self.input_path))
+
+    def _open(self):
+        self.manifest, self.state = open_state(self.input_path, self.data_path, self.triage, "Live mode")
+        self.started = {name: name in self.manifest["outputs"]
+                        for name in ["unified_events.csv", "unified_events_enriched.csv"]}
+        self.touched = set()
+        self.spool = None
+        self.batch_count = 0
+        self.in_flight = 0
+        self.row_count = 0
+        self.rewrites = {}
+        self.latencies = deque(maxlen=1000)
+        self.last_checkpoint = time.monotonic()
+        self.last_report = time.monotonic()
+
+    # Bytes appended to each input and not yet ingested; None when a source was truncated.
+    def pending(self):
+        pending = {}
+        for source, (raw_name, _) in SOURCES.items():
+            entry = self.manifest["sources"].get(source)
+            path = self.input_path / raw_name
+            size = path.stat().st_size
+            start = entry["offset"] if entry else _header_end(path)
+            if size < start:
+                return None
+            pending[source] = size - start
+        return pending
+
+    def backlog(self) -> int:
+        return sum((self.pending() or {}).values())
+
+    # Bytes read from each source in the next batch: the same share of every backlog, so that
+    # time-ordered inputs stay aligned when a backlog is read in several batches.
+    def _limits(self, pending: dict) -> dict:
+        total = sum(pending.values())
+        if total <= self.settings["batch_bytes"]:
+            return {}
+        return {source: -(-size * self.settings["batch_bytes"] // total) for source, size in pending.items()}
+
+    # Ingest stage: one micro-batch from the recorded offsets, as {"events", "touched", "arrived", "snapshot"}.
+    def _ingest_batch(self, arrived: float, checkpoint: bool, limits: dict) -> dict:
+        parts, touched = [], set()
+        for source in SOURCES:
+            entry = self.manifest["sources"].get(source)
+            stats = self.manifest["drop_counts"].setdefault(source, {})
+            result = _ingest_source(source, self.input_path, self.data_path, entry, self.state["cleaning"][source],
+                                    stats, self.chunk_size, limits.get(source) if entry else None,
+                                    instances=self.state["instances"])
+            if result is None:
+                raise _Rebuild(f"new {source} events predate the drift origin")
+            self.manifest["sources"][source], events, source_pids = result
+            parts.extend(events)
+            touched |= source_pids
+
+        events = concat_events(parts) if parts else None
+        if events is not None and len(events):
+            events = add_process_instances(_stable_by_timestamp(events), self.state["instances"])
+            track_stale_instances(self.state, events)
+            ranks = events["event_type"].map(SOURCE_RANK).to_numpy()
+            # Events older than the last one written are appended with the batch, scored on
+            # their own for now; the outputs are sorted and rescored from the first of them on
+            # at the next tidy (see _tidy_outputs)
+            late = 0
+            if self.state["last_key"] is not None:
+                last_time, last_rank = self.state["last_key"]
+                times = events["timestamp"].to_numpy()
+                late = int(((times < last_time) | ((times == last_time) & (ranks < last_rank))).sum())
+            if late:
+                first = events["timestamp"].iloc[0]
+                since = self.state["late_since"]
+                self.state["late_since"] = first if since is None else min(since, first)
+            parts = [detect_anomalies(events.iloc[:late])] if late else []
+            if late < len(events):
+                parts.append(self.state["detector"].detect(events.iloc[late:]))
+            events = pd.concat(parts) if len(parts) > 1 else parts[0]
+            _append_csv(events, self.data_path / "unified_events.csv", not self.started["unified_events.csv"])
+            self.started["unified_events.csv"] = True
+            last_key = (events["timestamp"].iloc[-1], int(ranks[-1]))
+            self.state["last_key"] = last_key if self.state["last_key"] is None else max(self.state["last_key"], last_key)
+        else:
+            events = None
+        return {"events": events, "touched": touched, "arrived": arrived,
+                "snapshot": self._snapshot() if checkpoint else None}
+
+    # Offsets, drop counts, output sizes and cleaning / detector state as of the last ingested batch.
+    def _snapshot(self) -> dict:
+        outputs = _output_sizes(self.data_path)
+        outputs.pop("unified_events_enriched.csv", None)
+        state = {key: self.state[key] for key in ["cleaning", "detector", "instances", "event_times", "stale", "last_key",
+                                                 "late_since"]}
+        return {
+            "manifest": {"sources": copy.deepcopy(self.manifest["sources"]),
+                         "drop_counts": copy.deepcopy(self.manifest["drop_counts"]),
+                         "outputs": outputs},
+            "state": pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL),
+        }
+
+    # Write stage: enrichment and the enriched output of one batch.
+    def _write_batch(self, batch: dict):
+        events = enrich_with_mitre(batch["events"], self.techniques)
+        _append_csv(events, self.data_path / "unified_events_enriched.csv", not self.started["unified_events_enriched.csv"])
+        self.started["unified_events_enriched.csv"] = True
+        add_chart_counts(self.state["counts"], events)
+        record_hits(self.state, events)
+        self.batch_count += 1
+        self.row_count += len(events)
+
+    # Saves a snapshot of the ingest stage with the write stage's state once both reached the same
+    # batch. rewritten maps outputs to the tails about to be rewritten (see record_rewrites).
+    # Returns the saved manifest.
+    def _checkpoint(self, snapshot: dict, rewritten: dict = None) -> dict:
+        state = pickle.loads(snapshot["state"])
+        state.update({key: self.state[key] for key in ["counts", "hits"]})
+        state["triage"] = snapshot.get("triage", self.state["triage"])
+        state["tree_pids"] = self.state.get("tree_pids", [])
+        manifest = {**self.manifest, **snapshot["manifest"]}
+        enriched = self.data_path / "unified_events_enriched.csv"
+        if enriched.exists():
+            manifest["outputs"] = {**manifest["outputs"], enriched.name: enriched.stat().st_size}
+        record_rewrites(manifest, rewritten or {}, self.rewrites)
+        _save_state(self.data_path / STATE_DIR, manifest, state)
+        return manifest
+
+    # Sorts and rescores the unified outputs from the first late row on, and assigns stored events
+    # again once process rows of their pid that start at or before them were ingested (see
+    # track_stale_instances): both outputs are rewritten from the earlier of the two, so they
+    # match an incremental run over the same inputs. Summaries and triage scores of late rows
+    # stay those of their provisional anomaly scores. Only done while no batch is between the
+    # stages, so that the checkpoint recording the rewrite matches both files; as in incremental
+    # runs, the state is saved before the rewritten tails replace the old rows.
+    def _tidy_outputs(self):
+        stale, late_since = self.state["stale"], self.state["late_since"]
+        if self.in_flight or (late_since is None and not len(stale)):
+            return
+        starts = [stale.min()] if len(stale) else []
+        if late_since is not None:
+            starts.append(late_since)
+        since, rescored = min(starts), None
+        if late_since is not None:
+            print(f"Live mode: late events from {late_since} on, rescoring and sorting unified outputs")
+            rescored, self.state["detector"] = rescore_tail(self.data_path / "unified_events.csv", since)
+        if len(stale):
+            print(f"Live mode: stored events of {len(stale)} processes predate later process rows, "
+                  "rewriting unified outputs")
+        rewritten = {name: rewrite_tail_into(self.data_path / name, since, self.state["instances"], stale, rescored)
+                     for name in UNIFIED_FILES}
+        self.state["stale"], self.state["late_since"] = stale.iloc[:0], None
+        finish_rewrites(self.data_path, self._checkpoint(self._snapshot(), rewritten))
+
+    def _refresh_reports(self, force: bool = False):
+        self._tidy_outputs()
+        render_charts(self.state["counts"], self.reports_path)
+        update_tree_report(self.data_path, self.reports_path, self.manifest, self.state, self.tree_roots,
+                           self.touched, self.chunk_size, force)
+        self.touched = set()
+        write_error_report(self.reports_path / "errors.md", self.manifest["drop_counts"])
+        print(self.status())
+
+    def status(self) -> str:
+        text = f"Live: {self.batch_count} batches, {self.row_count} rows"
+        if self.latencies:
+            p50, p99 = np.percentile(list(self.latencies), [50, 99])
+            text += f", latency p50 {p50:.2f}s / p99 {p99:.2f}s (new bytes seen -> enriched row written)"
+        if self.spool is not None and self.spool.rejected:
+            text += f", {self.spool.rejected} received lines rejected (unknown source)"
+        return text
+
+    async def _tail(self):
+        first_seen = None
+        idle_since = time.monotonic()
+        catch_up = True
+        while not self.stop.is_set():
+            by_source = self.pending()
+            if by_source is None:
+                raise _Rebuild("an input was truncated or replaced")
+            pending = sum(by_source.values())
+            now = time.monotonic()
+            if pending and first_seen is None:
+                first_seen = now
+            if catch_up or (pending and (pending >= self.settings["batch_bytes"]
+                                         or now - first_seen >= self.settings["batch_delay"])):
+                checkpoint = now - self.last_checkpoint >= self.settings["checkpoint_interval"]
+                if checkpoint:
+                    self.last_checkpoint = now
+                async with self.files_lock:
+                    batch = await asyncio.to_thread(self._ingest_batch, first_seen or now, checkpoint,
+                                                    self._limits(by_source))
+                    queued = batch["events"] is not None or checkpoint
+                    self.in_flight += queued
+                if queued:
+                    await self.batches.put(batch)
+                first_seen, catch_up = None, False
+                idle_since = time.monotonic()
+                continue
+            idle = self.settings["idle_exit"]
+            if not pending and idle is not None and now - idle_since >= idle:
+                break
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.settings["poll_interval"])
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+        await self.batches.put(None)
+
+    async def _summarize(self):
+        while (batch := await self.batches.get()) is not None:
+            if batch["events"] is not None:
+                batch["events"] = await summarize_events_async(batch["events"], self.cache, self.summary_stats,
+                                                               self.llm_options, self.triage, self.state["triage"])
+                if self.triage is not None:
+                    watermark = batch["events"]["timestamp"].max() - pd.Timedelta(self.settings["triage_lateness"])
+                    expire_windows(self.state["triage"], watermark, self.triage)
+            if batch["snapshot"] is not None:
+                # The triage budget as of this batch, saved with the batch's checkpoint
+                batch["snapshot"]["triage"] = copy.deepcopy(self.state["triage"])
+            await self.enriched.put(batch)
+        await self.enriched.put(None)
+
+    async def _write(self):
+        latency = histogram("live_latency_seconds")
+        while (batch := await self.enriched.get()) is not None:
+            if batch["events"] is not None:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.touched |= batch["touched"]
+                seconds = time.monotonic() - batch["arrived"]
+                self.latencies.append(seconds)
+                if latency is not None:
+                    latency.observe(seconds)
+            if batch["snapshot"] is not None:
+                await asyncio.to_thread(self._checkpoint, batch["snapshot"])
+            self.in_flight -= 1
+            if time.monotonic() - self.last_report >= self.settings["report_interval"]:
+                self.last_report = time.monotonic()
+                async with self.files_lock:
+                    await asyncio.to_thread(self._refresh_reports)
+
+    async def _serve_socket(self):
+        async def handle(reader, writer):
+            buffer = b""
+            try:
+                while True:
+                    while self.backlog() > self.settings["max_backlog"] and not self.stop.is_set():
+                        await asyncio.sleep(self.settings["poll_interval"])
+                    data = await reader.read(_READ_BYTES)
+                    if not data:
+                        break
+                    lines, buffer = _split_lines(buffer, data)
+                    self.spool.write(lines)
+                    self.wake.set()
+            finally:
+                if buffer:
+                    self.spool.write([buffer])
+                    self.wake.set()
+                writer.close()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(handle, path=self.socket_path)
+        print(f"Live mode: listening on {self.socket_path}")
+        async with server:
+            await self.stop.wait()
+
+    # Reads the named pipe in a thread; each writer's data is spooled until it closes the pipe.
+    def _read_fifo(self, loop):
+        while not self.stopped.is_set():
+            fd = os.open(self.fifo_path, os.O_RDONLY)
+            buffer = b""
+            try:
+                while data := os.read(fd, _READ_BYTES):
+                    while self.backlog() > self.settings["max_backlog"] and not self.stopped.is_set():
+                        time.sleep(self.settings["poll_interval"])
+                    lines, buffer = _split_lines(buffer, data)
+                    self.spool.write(lines)
+                    loop.call_soon_threadsafe(self.wake.set)
+            finally:
+                os.close(fd)
+            if buffer:
+                self.spool.write([buffer])
+                loop.call_soon_threadsafe(self.wake.set)
+
+    async def _run(self):
+        self._open()
+        self.stop = asyncio.Event()
+        self.wake = asyncio.Event()
+        self.stopped = threading.Event()
+        self.files_lock = asyncio.Lock()
+        self.batches = asyncio.Queue(self.settings["queue_size"])
+        self.enriched = asyncio.Queue(self.settings["queue_size"])
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop.set)
+
+        self.spool = Spool(self.input_path) if self.socket_path or self.fifo_path else None
+        listeners = []
+        if self.socket_path:
+            listeners.append(asyncio.create_task(self._serve_socket()))
+        if self.fifo_path:
+            if not os.path.exists(self.fifo_path):
+                os.mkfifo(self.fifo_path)
+            print(f"Live mode: reading {self.fifo_path}")
+            threading.Thread(target=self._read_fifo, args=(loop,), daemon=True).start()
+
+        print(f"Live mode: tailing {self.input_path} (Ctrl+C to stop)")
+        stages = [asyncio.create_task(stage) for stage in [self._tail(), self._summarize(), self._write()]]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            self.stop.set()
+            self.stopped.set()
+            for task in stages + listeners:
+                task.cancel()
+            await asyncio.gather(*stages, *listeners, return_exceptions=True)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            if self.spool is not None:
+                self.spool.close()
+
+    def run(self):
+        while True:
+            try:
+                asyncio.run(self._run())
+            except _Rebuild as e:
+                print(f"Live mode: {e}, rebuilding")
+                shutil.rmtree(self.data_path / STATE_DIR, ignore_errors=True)
+                continue
+            break
+        print("Live mode: stopping")
+        self._refresh_reports(force=True)
+        self._checkpoint(self._snapshot())
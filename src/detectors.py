@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+# Sliding-window anomaly detectors over the time-sorted unified event stream (the output of
+# integration.unify_event_stream). Each detector looks at one event type, optionally narrowed by a
+# regular expression on event_details, and measures per process within a time window either
+# - the number of its events ("count"), or
+# - the number of distinct values extracted from event_details ("value", a regular expression with
+#   a group named "value").
+# An event is a hit when the measure, taken over the process's events up to and including its
+# timestamp, reaches the threshold. Events sharing a timestamp all get the measure of the whole
+# group, so the result does not depend on how ties are ordered (batch and --stream order them
+# differently). Hits are written as anomaly_score / anomaly_hits columns, which can rank
+# the events worth sending to the LLM summarizer.
+#
+# This is a vectorized block design, not a per-event sketch: each block is sorted by (process,
+# time) and both window ends are found by binary search, so both measures are exact and cost
+# O(log n) per event. No count-min or HyperLogLog sketch is kept. Between blocks each detector
+# carries its own events of the last window (process, time and value hash), so that state grows
+# with the rate of the detector's events within one window rather than staying constant.
+DETECTOR_SPECS = {
+    # Many connections from one process in a short time
+    "network_burst": {
+        "event_type": "network",
+        "window": "60s",
+        "threshold": 20,
+    },
+    # Connections to many distinct destinations (scanning, beaconing to many hosts)
+    "network_fan_out": {
+        "event_type": "network",
+        # Destination host up to the ":port" suffix (IPv4 or host name)
+        "value": r"DstIP: (?P<value>[^\s|:]+)",
+        "window": "5min",
+        "threshold": 20,
+    },
+    # Repeated writes to Run / RunOnce autostart keys (persistence)
+    "run_key_writes": {
+        "event_type": "registry",
+        "match": r"^Operation: (?:write|modify|create|set)\b.*CurrentVersion[\\/]Run",
+        "window": "10min",
+        "threshold": 3,
+    },
+    # Writes, renames or deletes across many distinct files (ransomware-like encryption)
+    "mass_file_writes": {
+        "event_type": "file",
+        "match": r"^Operation: (?:write|modify|delete|rename)\b",
+        "value": r"\| File: (?P<value>.*?) \| User:",
+        "window": "60s",
+        "threshold": 30,
+    },
+}
+
+ANOMALY_COLUMNS = ["anomaly_score", "anomaly_hits"]
+
+_NS_PER_MS = 10**6
+
+def _window_ms(spec: dict) -> int:
+    return pd.Timedelta(spec["window"]).value // _NS_PER_MS
+
+# Key codes of the events and a function mapping times (up to a window past the last event) to
+# (key, time) composites, which sort by key, then time.
+def _key_times(keys: np.ndarray, times: np.ndarray, window: int):
+    codes = pd.factorize(keys)[0].astype(np.int64)
+    base = times.min()
+    span = int(times.max() - base) + window + 1
+    return codes, lambda at: codes * span + (at - base)
+
+# Counts per event the events of the same key with time in (t - window, t], including those with
+# the same time after it. Both window ends are found by binary search over (key, time) composites.
+def sliding_counts(keys: np.ndarray, times: np.ndarray, window: int) -> np.ndarray:
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64)
+    _, composite = _key_times(keys, times, window)
+    at = composite(times)
+    ordered = np.sort(at)
+    return np.searchsorted(ordered, at, side="right") - np.searchsorted(ordered, at - window, side="right")
+
+# Distinct values (hashes) per event among the events of the same key with time in (t - window, t].
+# Each occurrence of a value is live from its time until the value's next occurrence or until it
+# leaves the window, whichever comes first. The live spans of one value never overlap, so the
+# distinct values at t are the key's spans started by t minus those ended by t: two binary
+# searches, as in sliding_counts.
+def sliding_distinct(keys: np.ndarray, times: np.ndarray, hashes: np.ndarray, window: int) -> np.ndarray:
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64)
+    codes, composite = _key_times(keys, times, window)
+    order = np.lexsort((times, hashes, codes))
+    starts = times[order]
+    ends = starts + window
+    same_value = (codes[order][1:] == codes[order][:-1]) & (hashes[order][1:] == hashes[order][:-1])
+    ends[:-1] = np.where(same_value, np.minimum(starts[1:], ends[:-1]), ends[:-1])
+    unsorted_ends = np.empty_like(ends)
+    unsorted_ends[order] = ends
+    at = composite(times)
+    return (np.searchsorted(np.sort(at), at, side="right")
+            - np.searchsorted(np.sort(composite(unsorted_ends)), at, side="right"))
+
+# Regular expressions over event_details use pyarrow's vectorized kernels when it is installed
+# and pandas' per-row matching otherwise (patterns stay within the syntax both support).
+def _pyarrow_compute():
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError:
+        return None
+    return pyarrow
+
+def regex_contains(texts: pd.Series, pattern: str) -> np.ndarray:
+    pa = _pyarrow_compute()
+    if pa is None:
+        return texts.str.contains(pattern, case=False, regex=True).to_numpy(dtype=bool)
+    matched = pa.compute.match_substring_regex(pa.array(texts, type=pa.string()), pattern, ignore_case=True)
+    return matched.to_numpy(zero_copy_only=False)
+
+def regex_extract(texts: pd.Series, pattern: str) -> np.ndarray:
+    pa = _pyarrow_compute()
+    if pa is None:
+        return texts.str.extract(pattern, expand=False).to_numpy(dtype=object)
+    extracted = pa.compute.struct_field(pa.compute.extract_regex(pa.array(texts, type=pa.string()), pattern), "value")
+    return extracted.to_numpy(zero_copy_only=False)
+
+# Events one detector looks at: their mask in the frame, process ids, times and value hashes
+# (None for counting detectors). Patterns are evaluated once per distinct event_details text.
+def _detector_inputs(events: pd.DataFrame, times: np.ndarray, selected: np.ndarray, spec: dict):
+    selected = selected.copy()
+    hashes = None
+    if spec.get("match") or spec.get("value"):
+        codes, texts = pd.factorize(events["event_details"][selected])
+        texts = pd.Series(np.asarray(texts, dtype=object)).astype(str)
+        keep = regex_contains(texts, spec["match"]) if spec.get("match") else np.ones(len(texts), dtype=bool)
+        if spec.get("value"):
+            extracted = regex_extract(texts, spec["value"])
+            keep &= pd.notna(extracted)
+            text_hashes = pd.util.hash_array(np.where(keep, extracted, "").astype(object), categorize=False)
+        kept = keep[codes]
+        selected[selected] = kept
+        if spec.get("value"):
+            hashes = text_hashes[codes[kept]]
+    return selected, events["process_id"].to_numpy()[selected], times[selected], hashes
+
+def _timestamps_ms(timestamps: pd.Series) -> np.ndarray:
+    return pd.to_datetime(timestamps).to_numpy("datetime64[ms]").view(np.int64)
+
+class AnomalyDetector:
+    """
+    Runs the detectors over consecutive time-sorted blocks of the unified stream. Each detector
+    carries its events of the last window into the next block, so a stream processed block by
+    block gets the same columns as when processed in one piece, provided no timestamp is split
+    across blocks (as merge_sorted_runs guarantees).
+    """
+
+    def __init__(self, specs: dict = None):
+        self.specs = DETECTOR_SPECS if specs is None else specs
+        self.carry = max((_window_ms(spec) for spec in self.specs.values()), default=0)
+        # Detector name -> (process ids, times, value hashes or None) of its events within the
+        # last window
+        self.tails = {}
+
+    def _measure(self, name: str, spec: dict, keys: np.ndarray, times: np.ndarray, hashes, now) -> np.ndarray:
+        carried = len(self.tails[name][0]) if name in self.tails else 0
+        if carried:
+            tail_keys, tail_times, tail_hashes = self.tails[name]
+            keys, times = np.concatenate([tail_keys, keys]), np.concatenate([tail_times, times])
+            hashes = None if hashes is None else np.concatenate([tail_hashes, hashes])
+        window = _window_ms(spec)
+        values = sliding_counts(keys, times, window) if hashes is None else sliding_distinct(keys, times, hashes, window)
+        if now is not None:
+            recent = times > now - window
+            self.tails[name] = (keys[recent], times[recent], None if hashes is None else hashes[recent])
+        return values[carried:]
+
+    def detect(self, block: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the block with ANOMALY_COLUMNS added (replacing existing ones):
+        - anomaly_score: sum of measure / threshold over the detectors the event hits, 0 otherwise
+        - anomaly_hits: "detector:measure" for each hit, joined by ";"
+        """
+        events = block[["timestamp", "process_id", "event_type", "event_details"]]
+        times = _timestamps_ms(events["timestamp"])
+        now = times.max() if len(times) else None
+        type_codes, event_types = pd.factorize(events["event_type"])
+        event_types = pd.Index(event_types)
+        score = np.zeros(len(events))
+        hits = np.full(len(events), "", dtype=object)
+        for name, spec in self.specs.items():
+            selected = type_codes == (event_types.get_loc(spec["event_type"]) if spec["event_type"] in event_types else -2)
+            selected, keys, selected_times, hashes = _detector_inputs(events, times, selected, spec)
+            values = np.zeros(len(events), dtype=np.int64)
+            values[selected] = self._measure(name, spec, keys, selected_times, hashes, now)
+            hit = values >= spec["threshold"]
+            if not hit.any():
+                continue
+            score[hit] += values[hit] / spec["threshold"]
+            labels = np.array([f"{name}:{value}" for value in values[hit]], dtype=object)
+            hits[hit] = np.where(hits[hit] == "", labels, hits[hit] + ";" + labels)
+        # anomaly_hits stays an object column: converting millions of mostly empty strings to
+        # the string dtype would cost more than the detectors
+        return block.assign(anomaly_score=pd.Series(score.round(2), index=block.index),
+                            anomaly_hits=pd.Series(hits, index=block.index, dtype=object))
+
+# Adds ANOMALY_COLUMNS to a time-sorted unified frame.
+def detect_anomalies(df: pd.DataFrame, specs: dict = None) -> pd.DataFrame:
+    return AnomalyDetector(specs).detect(df)
@@ -1,5 +1,38 @@
-def write_error_report(output_path):
-    # Write summary of data quality issues and fixes
+# Column order of the per-rule drop table (see cleaning.DROP_RULES).
+DROP_COLUMNS = [
+    ("rows_in", "Rows in"),
+    ("duplicate", "Duplicate"),
+    ("missing_required", "Missing required"),
+    ("inverted_time", "Inverted time"),
+    ("time_drift", "Time drift"),
+    ("self_parent", "Self-parent"),
+    ("rows_out", "Rows out"),
+]
+
+# Renders per-source drop counts as a markdown table.
+def format_drop_counts(drop_counts) -> str:
+    header = "| Source | " + " | ".join(label for _, label in DROP_COLUMNS) + " |"
+    divider = "|" + "---|" * (len(DROP_COLUMNS) + 1)
+    rows = [
+        f"| {source} | " + " | ".join(str(counts.get(key, 0)) for key, _ in DROP_COLUMNS) + " |"
+        for source, counts in drop_counts.items()
+    ]
+    return "\n".join([
+        "## Rows Dropped per Rule",
+        "",
+        "Each dropped row is counted under the first rule it failed.",
+        "",
+        header,
+        divider,
+        *rows,
+        "",
+        "---",
+        "",
+        "",
+    ])
+
+def write_error_report(output_path, drop_counts=None):
+    # Write summary of data quality issues and fixes, plus the measured drop counts when given
     content = """\
 # Data Quality Issues and Resolutions
 
@@ -36,9 +69,10 @@ This report documents the anomalies encountered during the cleaning and normaliz
 
 ---
 
-## Summary
+{drop_table}## Summary
 
 All datasets were cleaned and normalized using consistent rules. The pipeline handles anomalies gracefully and ensures high-integrity output for analysis.
 """
+    content = content.format(drop_table=format_drop_counts(drop_counts) if drop_counts else "")
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(content)
@@ -0,0 +1,186 @@
+import time
+import shutil
+import hashlib
+import tempfile
+import traceback
+import contextlib
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from streaming import SOURCES, MERGE_FAN_IN, merge_sorted_runs, _reduce_runs, _append_csv
+from visualizations import new_chart_counts, add_chart_counts, render_charts
+from mitre_lookup import find_attack_bundle, load_attack_index
+from metrics import stage
+
+# Fleet mode: the input directory holds one subdirectory of raw CSVs per host. Every host is
+# processed on its own by the regular pipeline (into <output>/hosts/<host>/, with its own
+# cleaned files, process tree and error report), shards of hosts run in a process pool, and
+# the hosts' unified streams are then k-way merged by timestamp into global outputs with a
+# host column, partitioned by time.
+HOST_COLUMN = "host"
+
+# Per-host outputs merged into <output>/data/<name>/<partition>.csv
+FLEET_OUTPUTS = ["unified_events", "unified_events_enriched"]
+
+# Time span of one global output file
+FLEET_PARTITION = "1D"
+
+# Host directories of a fleet directory: subdirectories holding the four raw CSVs.
+def discover_hosts(input_path: Path) -> list:
+    return sorted(d.name for d in Path(input_path).iterdir()
+                  if d.is_dir() and all((d / raw_name).exists() for raw_name, _ in SOURCES.values()))
+
+# Stable hash partition of a host name (SHA-1, so it is the same in every process and run).
+def shard_of(host: str, shards: int) -> int:
+    return int.from_bytes(hashlib.sha1(host.encode("utf-8")).digest()[:8], "big") % shards
+
+# Groups hosts into shards: one per host by default, else `shards` hash partitions
+# (empty ones dropped). The hosts of a shard run one after another in the same worker.
+def plan_shards(hosts, shards: int = None) -> list:
+    if not shards:
+        return [[host] for host in hosts]
+    groups = [[] for _ in range(shards)]
+    for host in hosts:
+        groups[shard_of(host, shards)].append(host)
+    return [group for group in groups if group]
+
+# Worker: runs the pipeline for each host of a shard, logging its output to hosts/<host>/run.log.
+# A failing host is reported and does not stop the others.
+def _run_shard(run_host, input_path: Path, output_path: Path, hosts, options: dict) -> dict:
+    results = {}
+    for host in hosts:
+        host_output = output_path / "hosts" / host
+        host_output.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        error = None
+        with open(host_output / "run.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            try:
+                run_host(str(input_path / host), str(host_output), **options)
+            except Exception as e:
+                print(traceback.format_exc())
+                error = f"{type(e).__name__}: {e}"
+        results[host] = {"seconds": time.perf_counter() - start, "error": error}
+    return results
+
+# File name of each timestamp's partition: the start of its partition, as a date for whole
+# days and with the time otherwise; missing timestamps go to "unknown".
+def partition_names(timestamps: pd.Series, partition: str = FLEET_PARTITION) -> pd.Series:
+    daily = pd.Timedelta(partition) % pd.Timedelta("1D") == pd.Timedelta(0)
+    codes, starts = pd.factorize(timestamps.dt.floor(partition))
+    names = pd.Index(starts.strftime("%Y-%m-%d" if daily else "%Y-%m-%dT%H%M")).append(pd.Index(["unknown"]))
+    return pd.Series(names[codes], index=timestamps.index)
+
+def _has_rows(path: Path) -> bool:
+    return path.exists() and len(pd.read_csv(path, nrows=1)) > 0
+
+def merge_host_outputs(output_path: Path, hosts, name: str, partition: str = FLEET_PARTITION,
+                       block_rows: int = 10_000, counts: dict = None) -> dict:
+    """
+    K-way merges the hosts' <name>.csv (each sorted by timestamp) into
+    <output>/data/<name>/<partition>.csv with a leading host column.
+
+    Events sharing a timestamp are ordered by host, then by their order on the host. Only one
+    block per host is held in memory; more than MERGE_FAN_IN hosts are merged in several passes
+    through temporary runs. Chart counts of the merged rows are added to counts when given.
+    Returns the number of rows written per host.
+    """
+    hosts = [host for host in hosts if _has_rows(output_path / "hosts" / host / "data" / f"{name}.csv")]
+    out_dir = output_path / "data" / name
+    # Partitions of an earlier run would otherwise be appended to
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir(parents=True)
+    rows = dict.fromkeys(hosts, 0)
+    with tempfile.TemporaryDirectory(dir=output_path / "data") as tmp:
+        run_paths = [output_path / "hosts" / host / "data" / f"{name}.csv" for host in hosts]
+        run_paths, tags = _reduce_runs(run_paths, Path(tmp), block_rows, remove_inputs=False,
+                                       tag_column=HOST_COLUMN, tags=hosts)
+        written = set()
+        for block in merge_sorted_runs(run_paths, block_rows, HOST_COLUMN if tags is not None else None, tags):
+            for bucket, part in block.groupby(partition_names(block["timestamp"], partition), sort=False):
+                _append_csv(part, out_dir / f"{bucket}.csv", bucket not in written)
+                written.add(bucket)
+            for host, count in block[HOST_COLUMN].value_counts().items():
+                rows[host] += int(count)
+            if counts is not None:
+                add_chart_counts(counts, block)
+    return rows
+
+def write_fleet_report(path: Path, plan: list, results: dict, rows: dict):
+    lines = ["# Fleet Run", "", f"{len(results)} hosts in {len(plan)} shards.", "",
+             "| Host | Shard | Enriched events | Seconds | Status |",
+             "|------|-------|-----------------|---------|--------|"]
+    for shard, hosts in enumerate(plan):
+        for host in hosts:
+            result = results[host]
+            status = f"failed: {result['error']}" if result["error"] else "ok"
+            lines.append(f"| {host} | {shard} | {rows.get(host, 0):,} | {result['seconds']:.1f} | {status} |")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def run_fleet(run_host, input_path: Path, output_path: Path, options: dict, workers: int = 1,
+              shards: int = None, partition: str = FLEET_PARTITION, chunk_size: int = 500_000):
+    """
+    Runs run_host (main.run_pipeline) for every host directory of input_path and merges the
+    results; options are passed to each host's run.
+
+    Shards run in a pool of `workers` processes, each host with a single worker. The hosts
+    share the summary cache file given in options (SQLite in WAL mode, see summary_cache.py)
+    and the ATT&CK index, which is compiled here once per bundle before the pool starts, so
+    shards only load it. Global charts are drawn from the merged enriched stream and
+    reports/fleet.md lists every host with its shard, events, run time and status.
+    """
+    hosts = discover_hosts(input_path)
+    if not hosts:
+        raise ValueError(f"--fleet found no host directories with {', '.join(raw for raw, _ in SOURCES.values())} "
+                         f"in {input_path}")
+    plan = plan_shards(hosts, shards)
+    workers = max(1, min(workers, len(plan)))
+    print(f"Fleet mode: {len(hosts)} hosts in {len(plan)} shards on {workers} workers")
+
+    for bundle in {find_attack_bundle(input_path / host) for host in hosts}:
+        load_attack_index(bundle)
+
+    options = {**options, "workers": 1}
+    results = {}
+    with stage("hosts"):
+        if workers == 1:
+            for group in plan:
+                results.update(_run_shard(run_host, input_path, output_path, group, options))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_run_shard, run_host, input_path, output_path, group, options)
+                           for group in plan]
+                for future in futures:
+                    results.update(future.result())
+    for host in hosts:
+        result = results[host]
+        status = f"FAILED ({result['error']})" if result["error"] else "ok"
+        print(f"  {host}: {status} in {result['seconds']:.1f}s, log {output_path / 'hosts' / host / 'run.log'}")
+
+    succeeded = [host for host in hosts if not results[host]["error"]]
+    block_rows = max(chunk_size // MERGE_FAN_IN, 1_000)
+    print("Merging host event streams")
+    counts = new_chart_counts()
+    rows = {}
+    for name in FLEET_OUTPUTS:
+        with stage("merge") as record:
+            merged = merge_host_outputs(output_path, succeeded, name, partition, block_rows,
+                                        counts if name == "unified_events_enriched" else None)
+            record.rows(rows_out=sum(merged.values()))
+        if name == "unified_events_enriched":
+            rows = merged
+
+    reports_path = output_path / "reports"
+    print("Generating fleet visualizations")
+    with stage("charts"):
+        render_charts(counts, reports_path)
+    write_fleet_report(reports_path / "fleet.md", plan, results, rows)
+
+    print("Fleet run completed.")
+    for name in FLEET_OUTPUTS:
+        print(f"  --> Merged {name}: {output_path / 'data' / name}/")
+    print(f"  --> Per-host outputs:   {output_path / 'hosts'}/")
+    print(f"  --> Fleet report:       {reports_path / 'fleet.md'}")
+    failed = [host for host in hosts if results[host]["error"]]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(hosts)} hosts failed: {', '.join(failed)}")
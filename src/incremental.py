@@ -0,0 +1,557 @@
+import io
+import json
+import pickle
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from cleaning import CLEANING_SPECS, new_cleaning_state, clean_events, restore_integers
+from integration import EVENT_BUILDERS, concat_events
+from process_tree import select_tree_roots, describe_roots
+from errors import write_error_report
+from visualizations import new_chart_counts, add_chart_counts, render_charts
+from detectors import ANOMALY_COLUMNS, AnomalyDetector
+from correlation import INSTANCE_COLUMN, ProcessInstances, add_process_instances
+from triage import summarize_events, new_triage_state
+from mitre_lookup import load_attack_techniques, enrich_with_mitre, find_attack_bundle
+from metrics import stage, record_counters
+from streaming import (
+    SOURCES,
+    write_tree_report_from_csv,
+    _stable_by_timestamp,
+    _append_csv,
+)
+
+# Bump when the manifest or state layout changes; older state then triggers a full rebuild.
+MANIFEST_VERSION = 8
+
+# Manifest (JSON) and cleaning / report state (pickle) kept in data/.incremental/.
+STATE_DIR = ".incremental"
+
+# Bytes at the start of a source and before its last ingested offset that are hashed to detect
+# rewritten (not appended) inputs.
+TAIL_BYTES = 4096
+
+# Outputs that only ever grow; their sizes are recorded so a run interrupted after appending
+# can be rolled back to the last completed run.
+UNIFIED_FILES = ["unified_events.csv", "unified_events_enriched.csv"]
+
+# Columns of the unified stream the anomaly detectors read.
+DETECTOR_INPUTS = ["timestamp", "process_id", "event_type", "event_details"]
+
+# Unified event types in stream order; ties on timestamp are ordered by source (see unify_event_stream).
+SOURCE_RANK = {"process_start": 0, "network": 1, "file": 2, "registry": 3}
+
+def _range_hash(path: Path, start: int, end: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(end - start)).hexdigest()
+
+def _tail_hash(path: Path, offset: int) -> str:
+    return _range_hash(path, max(0, offset - TAIL_BYTES), offset)
+
+def _head_hash(path: Path, offset: int) -> str:
+    return _range_hash(path, 0, min(offset, TAIL_BYTES))
+
+# Offset just past the last complete line at or after start; a line still being written is left for the next run.
+def _complete_end(path: Path, start: int, size: int) -> int:
+    with open(path, "rb") as f:
+        pos = size
+        while pos > start:
+            block_start = max(start, pos - (1 << 16))
+            f.seek(block_start)
+            newline = f.read(pos - block_start).rfind(b"\n")
+            if newline >= 0:
+                return block_start + newline + 1
+            pos = block_start
+    return start
+
+def _header_end(path: Path) -> int:
+    with open(path, "rb") as f:
+        f.readline()
+        return f.tell()
+
+def _read_new_rows(path: Path, start: int, end: int, chunk_size: int):
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), dtype=str, chunksize=chunk_size)
+
+# Stable order of unified rows by (timestamp, source); rows that tie keep their current order.
+def _event_keys(df: pd.DataFrame) -> np.ndarray:
+    return np.lexsort((df["event_type"].map(SOURCE_RANK).to_numpy(), pd.to_datetime(df["timestamp"]).to_numpy()))
+
+def _load_state(state_dir: Path):
+    try:
+        manifest = json.loads((state_dir / "manifest.json").read_text(encoding="utf-8"))
+        with open(state_dir / "state.pkl", "rb") as f:
+            state = pickle.load(f)
+    except (OSError, ValueError, pickle.UnpicklingError):
+        return None, None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None, None
+    return manifest, state
+
+def _save_state(state_dir: Path, manifest: dict, state: dict):
+    state_dir.mkdir(parents=True, exist_ok=True)
+    with open(state_dir / "state.pkl.tmp", "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    (state_dir / "manifest.json.tmp").write_text(json.dumps(manifest, indent=2, default=str), encoding="utf-8")
+    (state_dir / "state.pkl.tmp").replace(state_dir / "state.pkl")
+    (state_dir / "manifest.json.tmp").replace(state_dir / "manifest.json")
+
+# Records rewritten tails ({output: (file, offset, stored rows)}) in the manifest, to be applied by
+# finish_rewrites once the state is saved, and adds the stored rows and bytes they rewrite to
+# counters, reported as the "rewrites" counters of the run metrics.
+def record_rewrites(manifest: dict, rewrites: dict, counters: dict):
+    for name, (tmp, offset, rows) in rewrites.items():
+        size = tmp.stat().st_size
+        manifest["outputs"][name] = offset + size
+        counters["rows"] = counters.get("rows", 0) + rows
+        counters["bytes"] = counters.get("bytes", 0) + size
+    manifest["rewrites"] = {name: offset for name, (_, offset, _) in rewrites.items()}
+    if rewrites:
+        record_counters("rewrites", counters)
+
+# Replaces the rows of an output from a byte offset on by a rewritten tail (see _merge_into).
+def _apply_rewrite(path: Path, tmp: Path, offset: int):
+    with open(path, "r+b") as f, open(tmp, "rb") as rows:
+        f.truncate(offset)
+        f.seek(offset)
+        shutil.copyfileobj(rows, f)
+    tmp.unlink()
+
+# Applies the tail rewrites recorded in the manifest ({output: offset}) whose rewritten tails are
+# still there, which is also how a run that stopped while applying them is completed, then
+# records that none are left.
+def finish_rewrites(data_path: Path, manifest: dict):
+    if not manifest.get("rewrites"):
+        return
+    for name, offset in manifest["rewrites"].items():
+        tmp = data_path / (name + ".merge")
+        if tmp.exists():
+            _apply_rewrite(data_path / name, tmp, offset)
+    manifest["rewrites"] = {}
+    state_dir = data_path / STATE_DIR
+    (state_dir / "manifest.json.tmp").write_text(json.dumps(manifest, indent=2, default=str), encoding="utf-8")
+    (state_dir / "manifest.json.tmp").replace(state_dir / "manifest.json")
+
+def _output_sizes(data_path: Path) -> dict:
+    names = [cleaned for _, cleaned in SOURCES.values()] + UNIFIED_FILES
+    return {name: (data_path / name).stat().st_size for name in names if (data_path / name).exists()}
+
+# Why the recorded state cannot be continued, or None when the inputs were only appended to.
+def _rebuild_reason(input_path: Path, data_path: Path, manifest: dict, triage: dict = None):
+    if manifest is None:
+        return "no manifest"
+    if manifest.get("triage") != triage:
+        return "triage settings changed"
+    for source, (raw_name, _) in SOURCES.items():
+        entry = manifest["sources"].get(source)
+        path = input_path / raw_name
+        if entry is None or path.stat().st_size < entry["offset"]:
+            return f"{raw_name} was truncated or replaced"
+        if (_tail_hash(path, entry["offset"]) != entry["tail_sha256"]
+                or _head_hash(path, entry["offset"]) != entry.get("head_sha256")):
+            return f"{raw_name} was modified before its last ingested offset"
+    for name, size in manifest["outputs"].items():
+        if not (data_path / name).exists() or (data_path / name).stat().st_size < size:
+            return f"{name} is missing or shorter than recorded"
+    return None
+
+# Cuts outputs back to their recorded sizes, dropping rows appended by an interrupted run.
+def _roll_back_outputs(data_path: Path, manifest: dict):
+    for name, size in manifest["outputs"].items():
+        with open(data_path / name, "r+b") as f:
+            f.truncate(size)
+
+def _new_manifest(triage: dict = None) -> dict:
+    return {"version": MANIFEST_VERSION, "sources": {}, "outputs": {}, "drop_counts": {}, "roots": None,
+            "triage": triage}
+
+# The recorded manifest and state, or new ones when they cannot be continued (printing why).
+# Outputs appended after the recorded state by an interrupted run are rolled back.
+def open_state(input_path: Path, data_path: Path, triage: dict = None, mode: str = "Incremental mode"):
+    state_dir = data_path / STATE_DIR
+    manifest, state = _load_state(state_dir)
+    if manifest is not None:
+        finish_rewrites(data_path, manifest)
+    reason = _rebuild_reason(input_path, data_path, manifest, triage)
+    if reason is not None:
+        print(f"{mode}: full rebuild ({reason})")
+        shutil.rmtree(state_dir, ignore_errors=True)
+        return _new_manifest(triage), _new_state()
+    _roll_back_outputs(data_path, manifest)
+    return manifest, state
+
+# Records the first MITRE hit time of each pid among enriched events.
+def record_hits(state: dict, events: pd.DataFrame):
+    hits = events.loc[events["mitre_id"] != "N/A"]
+    for pid, ts in zip(hits["process_id"].tolist(), hits["timestamp"].tolist()):
+        if pid not in state["hits"] or ts < state["hits"][pid]:
+            state["hits"][pid] = ts
+
+# Rewrites process_tree.md when the roots changed or touched (pids and parent pids of new rows)
+# involves a pid in a tree: its events, or a new child whose parent_id is in the tree.
+def update_tree_report(data_path: Path, reports_path: Path, manifest: dict, state: dict, tree_roots: str,
+                       touched: set, chunk_size: int, force: bool = False):
+    hit_order = sorted(state["hits"], key=lambda pid: state["hits"][pid])
+    root_pids = select_tree_roots(tree_roots, hit_order)
+    tree_pids = set(state.get("tree_pids", ()))
+    if (force or root_pids != manifest["roots"] or touched & (tree_pids | set(root_pids))
+            or not (reports_path / "process_tree.md").exists()):
+        print(f"Building process tree for PID {describe_roots(root_pids)}")
+        state["tree_pids"] = write_tree_report_from_csv(data_path, reports_path, root_pids, chunk_size)
+    else:
+        print("Process trees unchanged")
+    manifest["roots"] = root_pids
+
+def _new_state() -> dict:
+    return {
+        "cleaning": {source: new_cleaning_state() for source in SOURCES},
+        "counts": new_chart_counts(),
+        "detector": AnomalyDetector(),
+        "instances": ProcessInstances(),
+        "event_times": _empty_times(),
+        "stale": _empty_times(),
+        "triage": new_triage_state(),
+        "hits": {},
+        "last_key": None,
+        "late_since": None,
+    }
+
+# Cleans the rows appended to one source since the last run and appends them to its cleaned CSV.
+# Returns the updated manifest entry, the new unified events and the pids (and parent pids) of
+# the new rows, or None when the rows would move the source's drift origin. max_bytes limits
+# how much of the appended data is read (at least one complete line). New process rows are
+# added to instances when given.
+def _ingest_source(source: str, input_path: Path, data_path: Path, entry: dict, cleaning: dict,
+                   stats: dict, chunk_size: int, max_bytes: int = None, instances: ProcessInstances = None):
+    raw_name, cleaned_name = SOURCES[source]
+    path = input_path / raw_name
+    spec = CLEANING_SPECS[source]
+    start = entry["offset"] if entry else _header_end(path)
+    size = path.stat().st_size
+    end = _complete_end(path, start, size if max_bytes is None else min(size, start + max_bytes))
+    if end == start and max_bytes is not None:
+        end = _complete_end(path, start, size)
+
+    if spec.get("drift_column") and end > start:
+        scan = {"observed_min": None}
+        for chunk in _read_new_rows(path, start, end, chunk_size):
+            clean_events(chunk, spec, scan)
+        if scan["observed_min"] is not None:
+            if cleaning["min_time"] is None:
+                cleaning["min_time"] = scan["observed_min"]
+            elif scan["observed_min"] < cleaning["min_time"]:
+                return None
+
+    events = []
+    touched = set()
+    first = entry is None
+    if end > start:
+        for chunk in _read_new_rows(path, start, end, chunk_size):
+            cleaned = restore_integers(clean_events(chunk, spec, cleaning, stats))
+            _append_csv(cleaned, data_path / cleaned_name, first)
+            first = False
+            events.append(EVENT_BUILDERS[source](cleaned))
+            if instances is not None and source == "process":
+                instances.add(cleaned)
+            touched.update(cleaned["process_id"].tolist())
+            if "parent_id" in cleaned.columns:
+                touched.update(cleaned["parent_id"].tolist())
+    if first:
+        pd.read_csv(path, nrows=0).to_csv(data_path / cleaned_name, index=False)
+    entry = {"size": path.stat().st_size, "offset": end,
+             "head_sha256": _head_hash(path, end), "tail_sha256": _tail_hash(path, end)}
+    return entry, events, touched
+
+# Unified rows as the CSV text they are written as, so existing rows are written back unchanged.
+_AS_TEXT = {"dtype": str, "keep_default_na": False}
+
+def _as_text(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)), **_AS_TEXT)
+
+# Per pid, the latest stored event time (state["event_times"]) and the earliest start of process
+# rows that arrived after stored events of the pid from that start on (state["stale"]). Process
+# rows only add instances, so only those stored events can have a different instance in a run
+# over the full inputs; they are assigned again the next time the unified outputs are rewritten.
+# Both are keyed by pid, so they stay bounded by the pids seen rather than the events.
+def _empty_times() -> pd.Series:
+    return pd.Series(dtype="datetime64[ns]", index=pd.Index([], dtype=np.int64))
+
+def _times_by_pid(events: pd.DataFrame, latest: bool) -> pd.Series:
+    pids = pd.to_numeric(events["process_id"], errors="coerce")
+    times = pd.to_datetime(events["timestamp"])
+    known = (pids.notna() & times.notna()).to_numpy()
+    grouped = pd.Series(times[known].to_numpy(), index=pids[known].to_numpy(dtype=np.int64)).groupby(level=0)
+    return grouped.max() if latest else grouped.min()
+
+# Records new (assigned) events: the process starts among them mark stored events of their pid as
+# stale, then the events themselves become stored events.
+def track_stale_instances(state: dict, events: pd.DataFrame):
+    starts = _times_by_pid(events[(events["event_type"] == "process_start").to_numpy()], latest=False)
+    stale = starts[(state["event_times"].reindex(starts.index) >= starts).to_numpy()]
+    if len(stale):
+        state["stale"] = pd.concat([state["stale"], stale]).groupby(level=0).min()
+    state["event_times"] = pd.concat([state["event_times"], _times_by_pid(events, latest=True)]).groupby(level=0).max()
+
+# Assigns INSTANCE_COLUMN of stored unified rows (as CSV text) again for the stale pids, from
+# their stale time on.
+def _fill_instances(stored: pd.DataFrame, instances: ProcessInstances, stale: pd.Series):
+    pids = pd.to_numeric(stored["process_id"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+    since = stale.reindex(pids).to_numpy()
+    rows = np.flatnonzero(pd.to_datetime(stored["timestamp"]).to_numpy() >= since)
+    subset = stored.iloc[rows]
+    keys = instances.instance_keys(instances.assign(pd.to_numeric(subset["process_id"]), subset["timestamp"]))
+    stored.iloc[rows, stored.columns.get_loc(INSTANCE_COLUMN)] = pd.Series(keys).astype(object).fillna("").to_numpy()
+
+# Anomaly columns (as CSV text) of the rows of a unified CSV from since on, in _event_keys order,
+# for a file whose rows from since on may be out of order (late rows appended by live mode). The
+# stored events within the detectors' longest window before since are their context. Returns
+# the columns and the detector continuing the sorted stream.
+def rescore_tail(path: Path, since):
+    detector = AnomalyDetector()
+    begin = pd.Timestamp(since) - pd.Timedelta(detector.carry, unit="ms")
+    stored = _read_tail(path, _tail_offset(path, begin), usecols=DETECTOR_INPUTS, parse_dates=["timestamp"],
+                        dtype={"event_type": str, "event_details": str})
+    stored = stored[(stored["timestamp"] > begin).to_numpy()]
+    scored = detector.detect(stored.take(_event_keys(stored)))
+    columns = _as_text(scored[(scored["timestamp"] >= since).to_numpy()][ANOMALY_COLUMNS])
+    return {name: columns[name].to_numpy() for name in ANOMALY_COLUMNS}, detector
+
+# Rewrites the tail of a unified CSV from since on to a temporary file in _event_keys order (ties
+# keep their file order), with the anomaly columns from rescore_tail when given and the instances
+# of stale pids assigned again. Returns the file, the offset it replaces the rows from and the
+# number of rows rewritten.
+def rewrite_tail_into(path: Path, since, instances: ProcessInstances, stale: pd.Series, rescored: dict = None):
+    offset = _tail_offset(path, since)
+    stored = _read_tail(path, offset)
+    stored = stored.take(_event_keys(stored)).reset_index(drop=True)
+    for name, values in (rescored or {}).items():
+        stored[name] = values
+    if len(stale):
+        _fill_instances(stored, instances, stale)
+    tmp = path.with_name(path.name + ".merge")
+    stored.to_csv(tmp, index=False, header=False)
+    return tmp, offset, len(stored)
+
+TAIL_BLOCK = 1 << 20
+
+# Byte offset in a sorted unified CSV of the first row with a timestamp at or after start (the
+# end of the file when there is none), scanning back from the end in blocks, so finding it costs
+# the size of the tail rather than of the file. A newline starts a row only when an even number
+# of quotes follows it, which skips quoted fields spanning lines (e.g. LLM summaries).
+def _tail_offset(path: Path, start) -> int:
+    start = pd.Timestamp(start)
+    header_end = _header_end(path)
+    with open(path, "rb") as f:
+        pos = tail = f.seek(0, 2)
+        quotes_after = 0
+        while pos > header_end:
+            block_start = max(header_end, pos - TAIL_BLOCK)
+            # From the newline ending the previous row, with room for the timestamp of a row
+            # starting at the end of the block
+            f.seek(block_start - 1)
+            data = np.frombuffer(f.read(pos - block_start + 65), dtype=np.uint8)
+            counted = data[:pos - block_start + 1] == ord('"')
+            quotes_from = np.cumsum(counted[::-1])[::-1] + quotes_after
+            newlines = np.flatnonzero(data[:pos - block_start] == ord("\n"))
+            rows = newlines[(quotes_from[newlines + 1] % 2) == 0] + 1
+            quotes_after = int(quotes_from[1])
+            if len(rows):
+                texts = [bytes(data[row:row + 64]).split(b",", 1)[0].decode() for row in rows]
+                later = np.asarray(pd.to_datetime(texts, format="ISO8601") >= start)
+                if later.any():
+                    tail = block_start - 1 + int(rows[later][0])
+                if not later.all():
+                    return tail
+            pos = block_start
+    return tail
+
+# Rows of a unified CSV (as CSV text unless other read_csv options are given) from a byte offset on.
+def _read_tail(path: Path, offset: int, **options) -> pd.DataFrame:
+    columns = pd.read_csv(path, nrows=0).columns
+    options = options or _AS_TEXT
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if not f.read(1):
+            return pd.read_csv(path, nrows=0, **options)
+        f.seek(offset)
+        return pd.read_csv(f, header=None, names=columns, **options)
+
+# Scores new (sorted) events that predate stored ones in the stream of a unified CSV. The
+# stored events within the detectors' longest window before the first new event are their
+# context, and the stored events from that event's timestamp on are rescored, since the new
+# events fall into their windows. Returns the scored new events, (first new timestamp, anomaly
+# columns as CSV text of the stored rows from it on) and the detector continuing the stream.
+def _rescore_merge(path: Path, new_events: pd.DataFrame):
+    detector = AnomalyDetector()
+    start = new_events["timestamp"].iloc[0]
+    start_offset = _tail_offset(path, start - pd.Timedelta(detector.carry, unit="ms"))
+    stored = _read_tail(path, start_offset, usecols=DETECTOR_INPUTS, parse_dates=["timestamp"],
+                        dtype={"event_type": str, "event_details": str})
+    context = stored[(stored["timestamp"] > start - pd.Timedelta(detector.carry, unit="ms")).to_numpy()]
+    combined = pd.concat([context, new_events[DETECTOR_INPUTS]], ignore_index=True)
+    # Same order as the merged file: by (timestamp, source), stored rows first among equal keys
+    scored = detector.detect(combined.take(_event_keys(combined))).sort_index()
+    new_events = new_events.assign(**{name: scored[name].to_numpy()[len(context):] for name in ANOMALY_COLUMNS})
+    affected = scored.iloc[:len(context)][(context["timestamp"] >= start).to_numpy()]
+    columns = _as_text(affected[ANOMALY_COLUMNS])
+    return new_events, (start, {name: columns[name].to_numpy() for name in ANOMALY_COLUMNS}), detector
+
+# Adds the new (sorted) rows to a sorted unified CSV: appended when they all sort after the
+# existing rows, otherwise the rows from the first new (or stale) timestamp on are merged and
+# rewritten to a temporary file, returned with the offset it replaces them from and the number of
+# stored rows rewritten. rescored (from _rescore_merge) replaces the anomaly columns of the
+# existing rows it covers; with stale pids (see track_stale_instances), their rows are assigned
+# again. Only the tail is read, but a row merged in far back still rewrites everything after it.
+def _merge_into(path: Path, new_rows: pd.DataFrame, append: bool, first: bool, rescored=None,
+                instances: ProcessInstances = None, stale: pd.Series = None):
+    if first or (append and stale is None):
+        _append_csv(new_rows, path, first)
+        return None
+    starts = [] if append else [new_rows["timestamp"].iloc[0]]
+    if stale is not None:
+        starts.append(stale.min())
+    offset = _tail_offset(path, min(starts))
+    stored = _read_tail(path, offset)
+    if rescored is not None:
+        start, columns = rescored
+        affected = (pd.to_datetime(stored["timestamp"]) >= start).to_numpy()
+        for name, values in columns.items():
+            stored.loc[affected, name] = values
+    if stale is not None:
+        _fill_instances(stored, instances, stale)
+    merged = pd.concat([stored, _as_text(new_rows)], ignore_index=True)
+    tmp = path.with_name(path.name + ".merge")
+    merged.take(_event_keys(merged)).to_csv(tmp, index=False, header=False)
+    return tmp, offset, len(stored)
+
+def run_incremental_pipeline(input_path: Path, data_path: Path, reports_path: Path,
+                             chunk_size: int = 500_000, tree_roots: str = "15150",
+                             llm_options: dict = None, cache=None, summary_stats=None,
+                             triage: dict = None):
+    """
+    Processes only the rows appended to the raw sources since the previous incremental run.
+
+    data/.incremental/ holds a manifest with, per source, the byte offset up to which rows were
+    ingested, the file size and a hash of the bytes before that offset, plus the cleaning state
+    (hashes of rows already kept, drift origin), chart counts, MITRE hit pids, the triage budget
+    used so far and drop counts.
+    New complete lines are cleaned with that state and appended to the cleaned CSVs; their
+    unified events are summarized, enriched and appended to unified_events(_enriched).csv, or
+    merged into them when older than the last existing event. Stored events are assigned again
+    when new process rows of their pid start at or before them. Charts are redrawn from the
+    updated counts, and process_tree.md is rewritten only when the roots changed or new rows
+    touch processes in the trees. errors.md reports the cumulative drop counts.
+
+    Outputs match a --stream run over the full inputs. A source that was rewritten rather than
+    appended to, new rows older than a source's drift origin, missing outputs or changed
+    triage settings trigger a full rebuild.
+    """
+    state_dir = data_path / STATE_DIR
+    manifest, state = open_state(input_path, data_path, triage)
+    first_run = not manifest["sources"]
+
+    print("Incremental mode: cleaning appended rows")
+    parts = []
+    touched = set()
+    for source in SOURCES:
+        stats = manifest["drop_counts"].setdefault(source, {})
+        before = dict(stats)
+        with stage("clean") as record:
+            result = _ingest_source(source, input_path, data_path, manifest["sources"].get(source),
+                                    state["cleaning"][source], stats, chunk_size, instances=state["instances"])
+            record.rows(stats.get("rows_in", 0) - before.get("rows_in", 0),
+                        sum(len(events) for events in result[1]) if result else 0)
+        if result is None:
+            print(f"Incremental mode: new {source} events predate the drift origin, rebuilding")
+            shutil.rmtree(state_dir, ignore_errors=True)
+            return run_incremental_pipeline(input_path, data_path, reports_path, chunk_size, tree_roots,
+                                            llm_options, cache, summary_stats, triage)
+        manifest["sources"][source], events, source_pids = result
+        print(f"  {source}: {stats.get('rows_in', 0) - before.get('rows_in', 0)} new rows")
+        parts.extend(events)
+        touched |= source_pids
+
+    new_events = concat_events(parts) if parts else pd.DataFrame()
+    merged_files = {}
+    if len(new_events):
+        new_events = _stable_by_timestamp(new_events)
+        ranks = new_events["event_type"].map(SOURCE_RANK).to_numpy()
+        first_key = (new_events["timestamp"].iloc[0], int(ranks[0]))
+        append = state["last_key"] is None or first_key >= state["last_key"]
+        if not append:
+            print("Incremental mode: new events predate existing ones, merging unified outputs")
+        with stage("correlate") as record:
+            new_events = add_process_instances(new_events, state["instances"])
+            # Stored events written before process rows that start at or before them are
+            # assigned again when the unified outputs are rewritten below
+            track_stale_instances(state, new_events)
+            stale = state["stale"] if len(state["stale"]) else None
+            state["stale"] = _empty_times()
+            if stale is not None:
+                print(f"Incremental mode: stored events of {len(stale)} processes predate new process rows, "
+                      "rewriting unified outputs")
+            record.rows(len(new_events), len(new_events))
+        # The detector's carried window continues a time-ordered stream; events merged in among
+        # older ones are scored with the stored events before them, and the stored events from
+        # the first of them on are rescored
+        rescored = None
+        with stage("detect") as record:
+            if append:
+                new_events = state["detector"].detect(new_events)
+            else:
+                new_events, rescored, state["detector"] = _rescore_merge(data_path / "unified_events.csv",
+                                                                         new_events)
+            record.rows(len(new_events), len(new_events))
+
+        with stage("save") as record:
+            merged_files["unified_events.csv"] = _merge_into(data_path / "unified_events.csv", new_events,
+                                                             append, first_run, rescored, state["instances"], stale)
+            record.rows(rows_in=len(new_events))
+        print("Summarizing and enriching new events")
+        with stage("summarize") as record:
+            new_events = summarize_events(new_events, cache, summary_stats, llm_options, triage, state["triage"])
+            record.rows(len(new_events), len(new_events))
+        with stage("mitre") as record:
+            techniques = load_attack_techniques(find_attack_bundle(input_path))
+            new_events = enrich_with_mitre(new_events, techniques)
+            record.rows(len(new_events), len(new_events))
+        with stage("save") as record:
+            merged_files["unified_events_enriched.csv"] = _merge_into(data_path / "unified_events_enriched.csv",
+                                                                      new_events, append, first_run, rescored,
+                                                                      state["instances"], stale)
+            record.rows(rows_in=len(new_events))
+
+        last_key = (new_events["timestamp"].iloc[-1], int(ranks[-1]))
+        state["last_key"] = last_key if state["last_key"] is None else max(state["last_key"], last_key)
+        add_chart_counts(state["counts"], new_events)
+        record_hits(state, new_events)
+    elif first_run:
+        for name in UNIFIED_FILES:
+            pd.DataFrame(columns=["timestamp", "process_id", INSTANCE_COLUMN, "event_type", "event_details"]).to_csv(
+                data_path / name, index=False)
+
+    if len(new_events) or first_run:
+        print("Generating visualizations")
+        with stage("charts"):
+            render_charts(state["counts"], reports_path)
+
+    with stage("process_tree"):
+        update_tree_report(data_path, reports_path, manifest, state, tree_roots, touched, chunk_size, first_run)
+
+    print("Writing error documentation")
+    with stage("errors"):
+        write_error_report(reports_path / "errors.md", manifest["drop_counts"])
+
+    # Record state first, with the rewritten tails still to apply; if the run stops before they
+    # replace the old rows, the next run applies them before going on
+    manifest["outputs"] = _output_sizes(data_path)
+    record_rewrites(manifest, {name: rewrite for name, rewrite in merged_files.items() if rewrite is not None}, {})
+    _save_state(state_dir, manifest, state)
+    finish_rewrites(data_path, manifest)
@@ -1,54 +1,153 @@
-
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
-# Loads cleaned CSV files for all event types from the specified directory.
-def load_cleaned_data(data_dir: Path):
-    process_df = pd.read_csv(data_dir / "cleaned_process_events.csv", parse_dates=["start_time", "end_time"])
-    network_df = pd.read_csv(data_dir / "cleaned_network_events.csv", parse_dates=["timestamp"])
-    file_df = pd.read_csv(data_dir / "cleaned_file_events.csv", parse_dates=["timestamp"])
-    registry_df = pd.read_csv(data_dir / "cleaned_registry_events.csv", parse_dates=["timestamp"])
+from storage import load_frame, stored_path
+from compact import compact_frame, ipv4_text
+
+UNIFIED_COLUMNS = ["timestamp", "process_id", "event_type", "event_details"]
+
+CLEANED_NAMES = [
+    "cleaned_process_events",
+    "cleaned_network_events",
+    "cleaned_file_events",
+    "cleaned_registry_events",
+]
+
+# Loads cleaned files for all event types from the specified directory.
+# fmt selects the intermediate store ("csv", "parquet" or "arrow", see storage.py); with
+# compact=True the frames use the memory-saving dtypes of compact.py.
+def load_cleaned_data(data_dir: Path, fmt: str = "csv", compact: bool = False):
+    process_df, network_df, file_df, registry_df = (
+        load_frame(stored_path(data_dir, name, fmt)) for name in CLEANED_NAMES
+    )
+    if compact:
+        process_df, network_df, file_df, registry_df = (
+            compact_frame(df, source) for df, source in
+            zip([process_df, network_df, file_df, registry_df], ["process", "network", "file", "registry"])
+        )
     return process_df, network_df, file_df, registry_df
 
+# Renders a column the way an f-string renders each value (missing values become "nan").
+def _text(series: pd.Series) -> pd.Series:
+    return series.astype(str).fillna("nan")
+
+# Codes of the distinct combinations of the given columns, numbered in order of first occurrence.
+def _row_codes(df: pd.DataFrame, columns) -> np.ndarray:
+    codes = np.zeros(len(df), dtype=np.int64)
+    for col in columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            col_codes, n = values.cat.codes.to_numpy().astype(np.int64) + 1, len(values.cat.categories) + 1
+        else:
+            col_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+            n = len(uniques)
+        codes, _ = pd.factorize(codes * n + col_codes)
+    return codes
+
+# event_details of a source frame: render(frame) is evaluated on one row per distinct
+# combination of the columns it reads, and the result is a categorical, so each distinct text
+# is built and stored once however many events share it.
+def _details(df: pd.DataFrame, columns, render) -> pd.Categorical:
+    codes = _row_codes(df, columns)
+    _, first = np.unique(codes, return_index=True)
+    texts = render(df[columns].iloc[first].assign(
+        **{col: ipv4_text(df[col].to_numpy()[first]) for col in columns if df[col].dtype == np.uint32}))
+    text_codes, categories = pd.factorize(texts)
+    return pd.Categorical.from_codes(text_codes[codes], categories=categories)
+
+# Builds the unified frame for a single event type from whole columns at once.
+def _typed_events(timestamps: pd.Series, pids: pd.Series, event_type: str, details) -> pd.DataFrame:
+    return pd.DataFrame({
+        "timestamp": timestamps.to_numpy(),
+        "process_id": pids.to_numpy(),
+        "event_type": pd.Categorical.from_codes(np.zeros(len(timestamps), dtype=np.int8), categories=[event_type]),
+        "event_details": details,
+    })
+
+def _process_details(df: pd.DataFrame) -> pd.Series:
+    return "Executable: " + _text(df["executable_path"]) + " | User: " + _text(df["user"])
+
+def _network_details(df: pd.DataFrame) -> pd.Series:
+    return (
+        "SrcIP: " + _text(df["src_ip"]) + ":" + _text(df["src_port"])
+        + " → DstIP: " + _text(df["dst_ip"]) + ":" + _text(df["dst_port"])
+        + " | User: " + _text(df["user"])
+    )
+
+def _file_details(df: pd.DataFrame) -> pd.Series:
+    return (
+        "Operation: " + _text(df["operation"]) + " | File: " + _text(df["file_path"])
+        + " | User: " + _text(df["user"])
+    )
+
+def _registry_details(df: pd.DataFrame) -> pd.Series:
+    val_str = (" | Value: " + _text(df["value_name"]) + " = " + _text(df["value_data"])).where(df["value_name"].notna(), "")
+    return (
+        "Operation: " + _text(df["operation"]) + " | Key: " + _text(df["registry_key"])
+        + val_str + " | User: " + _text(df["user"])
+    )
+
+def _process_events(df: pd.DataFrame) -> pd.DataFrame:
+    details = _details(df, ["executable_path", "user"], _process_details)
+    return _typed_events(df["start_time"], df["process_id"], "process_start", details)
+
+def _network_events(df: pd.DataFrame) -> pd.DataFrame:
+    details = _details(df, ["src_ip", "src_port", "dst_ip", "dst_port", "user"], _network_details)
+    return _typed_events(df["timestamp"], df["process_id"], "network", details)
+
+def _file_events(df: pd.DataFrame) -> pd.DataFrame:
+    details = _details(df, ["operation", "file_path", "user"], _file_details)
+    return _typed_events(df["timestamp"], df["process_id"], "file", details)
+
+def _registry_events(df: pd.DataFrame) -> pd.DataFrame:
+    details = _details(df, ["operation", "registry_key", "value_name", "value_data", "user"], _registry_details)
+    return _typed_events(df["timestamp"], df["process_id"], "registry", details)
+
+# Per-source builders of unified events, in the order the sources are concatenated.
+EVENT_BUILDERS = {
+    "process": _process_events,
+    "network": _network_events,
+    "file": _file_events,
+    "registry": _registry_events,
+}
+
+# Concatenates unified frames; event_type and event_details stay categorical (with the union
+# of the parts' categories) when they are categorical in every part. Empty parts are skipped,
+# as their categories may not have the dtype of the others'.
+def concat_events(parts) -> pd.DataFrame:
+    parts = list(parts)
+    parts = [part for part in parts if len(part)] or parts[:1]
+    if len(parts) == 1:
+        return parts[0].reset_index(drop=True)
+    categorical = [col for col in ["event_type", "event_details"]
+                   if all(isinstance(part[col].dtype, pd.CategoricalDtype) for part in parts)]
+    unified = pd.concat([part.drop(columns=categorical) for part in parts], ignore_index=True)
+    for col in categorical:
+        # Categories of all parts are deduplicated with one factorize and each part's codes remapped
+        columns = [part[col].array for part in parts]
+        category_codes, categories = pd.factorize(columns[0].categories.append([c.categories for c in columns[1:]]))
+        offsets = np.cumsum([0] + [len(c.categories) for c in columns[:-1]])
+        codes = np.concatenate([np.where(c.codes >= 0, category_codes[offset + c.codes], -1)
+                                for c, offset in zip(columns, offsets)])
+        unified[col] = pd.Categorical.from_codes(codes, categories=categories)
+    return unified[parts[0].columns]
+
 # Combines all event types into a single unified event stream based on process_id and timestamp.
-# Each event includes a type label and descriptive metadata.#
-def unify_event_stream(process_df, network_df, file_df, registry_df):
-    unified_records = []
-
-    for _, row in process_df.iterrows():
-        unified_records.append({
-            "timestamp": row["start_time"],
-            "process_id": row["process_id"],
-            "event_type": "process_start",
-            "event_details": f"Executable: {row['executable_path']} | User: {row['user']}",
-        })
-
-    for _, row in network_df.iterrows():
-        unified_records.append({
-            "timestamp": row["timestamp"],
-            "process_id": row["process_id"],
-            "event_type": "network",
-            "event_details": f"SrcIP: {row['src_ip']}:{row['src_port']} → DstIP: {row['dst_ip']}:{row['dst_port']} | User: {row['user']}",
-        })
-
-    for _, row in file_df.iterrows():
-        unified_records.append({
-            "timestamp": row["timestamp"],
-            "process_id": row["process_id"],
-            "event_type": "file",
-            "event_details": f"Operation: {row['operation']} | File: {row['file_path']} | User: {row['user']}",
-        })
-
-    for _, row in registry_df.iterrows():
-        val_str = f" | Value: {row['value_name']} = {row['value_data']}" if pd.notnull(row['value_name']) else ""
-        unified_records.append({
-            "timestamp": row["timestamp"],
-            "process_id": row["process_id"],
-            "event_type": "registry",
-            "event_details": f"Operation: {row['operation']} | Key: {row['registry_key']}{val_str} | User: {row['user']}",
-        })
-
-    unified_df = pd.DataFrame(unified_records)
+# Each event includes a type label and descriptive metadata. Details are built per distinct
+# combination of their columns per event type and the four frames are concatenated (process,
+# network, file, registry); event_type and event_details are categoricals.
+#
+# By default rows are ordered with the same sort as the original row-by-row builder, so the
+# written CSV is byte-identical to earlier runs. With presorted=True each input must already be
+# sorted by its timestamp column; the concatenation is then four sorted runs, which the stable
+# (timsort) argsort merges in O(n log 4), and ties are broken by event type then input order.
+def unify_event_stream(process_df, network_df, file_df, registry_df, presorted: bool = False):
+    frames = [process_df, network_df, file_df, registry_df]
+    unified_df = concat_events(build(df) for build, df in zip(EVENT_BUILDERS.values(), frames))
+    if presorted:
+        order = np.argsort(unified_df["timestamp"].to_numpy(), kind="stable")
+        return unified_df.take(order)
     unified_df.sort_values(by="timestamp", inplace=True)
     return unified_df
 
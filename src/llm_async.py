@@ -0,0 +1,192 @@
+import re
+import time
+import random
+import asyncio
+import numpy as np
+import pandas as pd
+
+from metrics import histogram
+
+# Default engine settings; they reproduce the one-call-at-a-time behaviour of summarize_event
+# apart from retrying failed calls.
+DEFAULT_LLM_OPTIONS = {
+    "concurrency": 1,
+    "rate": None,
+    "batch_size": 1,
+    "retries": 3,
+    "backoff": 0.5,
+}
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` acquisitions per second on average and bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Numbers events for a batched prompt: "[1] ...", "[2] ...".
+def format_batch(events) -> str:
+    return "\n".join(f"[{n}] {event}" for n, event in enumerate(events, start=1))
+
+_NUMBERED_LINE = re.compile(r"^\s*\[(\d+)\]\s*(.*)$")
+
+# Splits a batched response back into one summary per event, or returns None when the
+# response does not contain exactly the numbers 1..count.
+def parse_batch(text: str, count: int):
+    summaries = {}
+    current = None
+    for line in text.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            current = int(match.group(1))
+            summaries[current] = match.group(2).strip()
+        elif current is not None and line.strip():
+            summaries[current] += " " + line.strip()
+    if sorted(summaries) != list(range(1, count + 1)):
+        return None
+    return [summaries[n] for n in range(1, count + 1)]
+
+def _response_text(response) -> str:
+    return response["text"] if isinstance(response, dict) else str(response)
+
+async def summarize_async(events, chain, batch_chain=None, concurrency: int = 1, rate: float = None,
+                          batch_size: int = 1, retries: int = 3, backoff: float = 0.5):
+    """
+    Summarizes a list of event strings with `concurrency` workers and returns results in input order.
+
+    - chain / batch_chain: objects with an async `ainvoke(inputs)` (LangChain chains, fake chat
+      model chains or a client for a local stub server); chain receives {"event": text},
+      batch_chain receives {"events": numbered texts}
+    - rate: maximum requests per second across all workers (token bucket), None for unlimited
+    - batch_size: events per request when batch_chain is given; a batch whose answer cannot be
+      split per event falls back to one request per event
+    - retries / backoff: failed requests are retried with exponential backoff and jitter
+
+    Single events yield whatever chain returns (the LLMChain output dict), batched events yield
+    the same {"event", "text"} shape, and events whose requests kept failing yield "[LLM ERROR] ...".
+    """
+    results = [None] * len(events)
+    bucket = TokenBucket(rate) if rate else None
+    if batch_chain is None:
+        batch_size = 1
+    # Latency of each request, rate limiting excluded
+    latency = histogram("llm_request_seconds")
+
+    async def call(target, inputs):
+        for attempt in range(retries + 1):
+            if bucket is not None:
+                await bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = await target.ainvoke(inputs)
+            except Exception:
+                if latency is not None:
+                    latency.observe(time.perf_counter() - start)
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+                continue
+            if latency is not None:
+                latency.observe(time.perf_counter() - start)
+            return response
+
+    async def run_single(i):
+        try:
+            results[i] = await call(chain, {"event": events[i]})
+        except Exception as e:
+            results[i] = f"[LLM ERROR] {str(e)}"
+
+    async def run_batch(indices):
+        if len(indices) == 1:
+            await run_single(indices[0])
+            return
+        summaries = None
+        try:
+            response = await call(batch_chain, {"events": format_batch([events[i] for i in indices])})
+            summaries = parse_batch(_response_text(response), len(indices))
+        except Exception:
+            pass
+        if summaries is None:
+            for i in indices:
+                await run_single(i)
+            return
+        for i, summary in zip(indices, summaries):
+            results[i] = {"event": events[i], "text": summary}
+
+    batches = (list(range(start, min(start + batch_size, len(events))))
+               for start in range(0, len(events), batch_size))
+
+    async def worker():
+        for indices in batches:
+            await run_batch(indices)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results
+
+def _is_error(result) -> bool:
+    return isinstance(result, str) and result.startswith("[LLM ERROR]")
+
+def _count(stats, key: str, n: int):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + int(n)
+
+# Summarizes the event_details column of a frame; returns a Series aligned with df.index.
+# Uses the chains of the named llm_summarizer backend unless chain / batch_chain are given.
+# Each distinct event text is summarized once and broadcast to all matching rows; with a
+# SummaryCache, texts already summarized in earlier runs are not sent to the LLM at all.
+# Row, distinct text and cache hit/miss counts are added to the optional stats dict.
+def summarize_frame(df: pd.DataFrame, chain=None, batch_chain=None, cache=None, stats=None,
+                    backend: str = "openai", **options) -> pd.Series:
+    return asyncio.run(summarize_frame_async(df, chain, batch_chain, cache, stats, backend, **options))
+
+# summarize_frame as a coroutine, for callers already running an event loop (see daemon.py).
+async def summarize_frame_async(df: pd.DataFrame, chain=None, batch_chain=None, cache=None, stats=None,
+                                backend: str = "openai", **options) -> pd.Series:
+    settings = {**DEFAULT_LLM_OPTIONS, **{k: v for k, v in options.items() if v is not None}}
+    codes, values = pd.factorize(df["event_details"], use_na_sentinel=False)
+    text_codes, uniques = pd.factorize(pd.Series([str(value) for value in values], dtype=object))
+    codes, uniques = text_codes[codes], list(uniques)
+
+    cached = cache.get_many(uniques) if cache is not None else {}
+    pending = [text for text in uniques if text not in cached]
+    if pending and chain is None:
+        from llm_summarizer import get_backend
+        chain, batch_chain = get_backend(backend)["chain"], get_backend(backend)["batch_chain"]
+    fresh = await summarize_async(pending, chain, batch_chain, **settings) if pending else []
+    if cache is not None:
+        cache.put_many({text: result for text, result in zip(pending, fresh) if not _is_error(result)})
+
+    by_text = {**cached, **dict(zip(pending, fresh))}
+    unique_results = np.empty(len(uniques), dtype=object)
+    unique_results[:] = [by_text[text] for text in uniques]
+    _count(stats, "rows", len(df))
+    _count(stats, "unique", len(uniques))
+    _count(stats, "cache_hits", len(cached))
+    _count(stats, "llm_requests", len(pending))
+    _count(stats, "errors", sum(_is_error(result) for result in fresh))
+    return pd.Series(unique_results[codes], index=df.index, dtype=object)
+
+# One-line report of summarize_frame statistics for the end of a run.
+def format_summary_stats(stats: dict) -> str:
+    distinct = stats.get("unique", 0)
+    hits = stats.get("cache_hits", 0)
+    hit_rate = f"{hits / distinct:.1%}" if distinct else "n/a"
+    return (f"LLM summaries: {stats.get('rows', 0)} rows, {distinct} distinct events, "
+            f"cache hits {hits} / misses {stats.get('llm_requests', 0)} ({hit_rate} hit rate), "
+            f"errors {stats.get('errors', 0)}")
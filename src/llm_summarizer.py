@@ -1,29 +1,103 @@
+from mitre_lookup_first import MITRE_TECHNIQUES
 
-import os
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from dotenv import load_dotenv
+MODEL_NAME = "gpt-3.5-turbo"
 
-# Load .env variables (optional)
-load_dotenv()
+# Bump when the prompts change so cached summaries (see summary_cache.py) are not reused.
+PROMPT_VERSION = "1"
 
-# Initialize LLM (set OPENAI_API_KEY in environment or .env)
-llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.2)
-
-# Define a prompt template for summarizing security event details
-prompt = PromptTemplate.from_template(
+# Prompt template for summarizing security event details
+PROMPT_TEMPLATE = (
     "You are a security analyst. Explain what the following event indicates:\n\n{event}\n\nKeep the summary short and behavior-focused."
 )
 
-summarizer = LLMChain(llm=llm, prompt=prompt)
+# Prompt used when several events are summarized in one request (see llm_async.py).
+BATCH_PROMPT_TEMPLATE = (
+    "You are a security analyst. Explain what each of the following events indicates.\n\n{events}\n\n"
+    "Keep each summary short and behavior-focused. Answer with one line per event, "
+    "starting with the event number in brackets, e.g. [1] ..."
+)
+
+class FunctionChain:
+    """
+    Minimal chain for local backends: wraps a function of the event text and returns the
+    same {"event", "text"} shape as LLMChain, synchronously (invoke) or asynchronously (ainvoke).
+    """
+
+    def __init__(self, summarize):
+        self.summarize = summarize
+
+    def invoke(self, inputs):
+        return {"event": inputs["event"], "text": self.summarize(inputs["event"])}
+
+    async def ainvoke(self, inputs):
+        return self.invoke(inputs)
+
+# Builds the OpenAI chains. LangChain is imported and .env is loaded only here, on first use.
+def _openai_backend():
+    from dotenv import load_dotenv
+    from langchain.chat_models import ChatOpenAI
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
+
+    # Load .env variables (optional)
+    load_dotenv()
+
+    # Initialize LLM (set OPENAI_API_KEY in environment or .env)
+    llm = ChatOpenAI(model_name=MODEL_NAME, temperature=0.2)
+    return {
+        "chain": LLMChain(llm=llm, prompt=PromptTemplate.from_template(PROMPT_TEMPLATE)),
+        "batch_chain": LLMChain(llm=llm, prompt=PromptTemplate.from_template(BATCH_PROMPT_TEMPLATE)),
+    }
+
+# Deterministic offline stand-in for the LLM, useful for tests and dry runs.
+def _stub_summary(event: str) -> str:
+    return f"[stub summary] {event}"
+
+def _noop_summary(event: str) -> str:
+    return ""
+
+# Describes an event by the static MITRE keyword table: every technique whose keywords occur in the text.
+def rule_based_summary(event: str) -> str:
+    text = str(event).lower()
+    hits = []
+    for entry in MITRE_TECHNIQUES:
+        matched = [keyword for keyword in entry["keywords"] if keyword in text]
+        if matched:
+            hits.append(f"{entry['technique']} ({entry['tactic']}; keywords: {', '.join(matched)})")
+    if not hits:
+        return "No suspicious behavior keywords found in this event."
+    return "Possible " + "; ".join(hits) + "."
+
+def _local_backend(summarize):
+    return lambda: {"chain": FunctionChain(summarize), "batch_chain": None}
+
+# Summarizer backends selectable with main.py --summarizer; each factory is called on first use.
+SUMMARIZER_BACKENDS = {
+    "openai": _openai_backend,
+    "stub": _local_backend(_stub_summary),
+    "noop": _local_backend(_noop_summary),
+    "rules": _local_backend(rule_based_summary),
+}
+
+_backends = {}
+
+# Returns {"chain", "batch_chain"} for a backend, constructing it once.
+def get_backend(name: str = "openai") -> dict:
+    if name not in _backends:
+        _backends[name] = SUMMARIZER_BACKENDS[name]()
+    return _backends[name]
+
+# Cache namespace of a backend's summaries (see summary_cache.py), without constructing it.
+def backend_namespace(name: str = "openai") -> str:
+    model = MODEL_NAME if name == "openai" else name
+    return f"{name}:{model}:{PROMPT_VERSION}"
 
-def summarize_event(row):
+def summarize_event(row, backend: str = "openai"):
     """
     Summarize a row from the unified event stream using an LLM.
     Expects a 'event_details' column in the input row.
     """
     try:
-        return summarizer.invoke({"event": row["event_details"]})
+        return get_backend(backend)["chain"].invoke({"event": row["event_details"]})
     except Exception as e:
         return f"[LLM ERROR] {str(e)}"
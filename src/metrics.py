@@ -0,0 +1,361 @@
+import os
+import sys
+import json
+import time
+import bisect
+import resource
+import threading
+import contextlib
+from pathlib import Path
+
+# Run instrumentation: per-stage wall time, CPU time (including worker processes), peak RSS and
+# rows in/out, latency histograms and counters. Nothing is recorded unless a run is active
+# (instrumented_run); stage() then returns a shared no-op context and histogram() returns None,
+# so instrumented code costs a function call and a None check.
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+HISTOGRAM_BUCKETS = {
+    "llm_request_seconds": [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60],
+    "mitre_match_seconds": [1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2],
+    "live_latency_seconds": [0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30, 60],
+}
+DEFAULT_BUCKETS = [0.001, 0.01, 0.1, 1, 10, 100]
+
+# Prefix of the Prometheus metric names
+PROMETHEUS_PREFIX = "security_log_pipeline"
+
+PROFILERS = ["cprofile", "pyinstrument"]
+
+_MB = 2**20
+
+class RssSampler:
+    """
+    Samples the resident set size in a background thread and keeps the maximum since the last
+    reset(). Falls back to getrusage's process-wide peak where /proc/self/statm does not exist.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.available = Path("/proc/self/statm").exists()
+        self.peak = self.current()
+        self.stopped = threading.Event()
+        if self.available:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def current(self) -> int:
+        if not self.available:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * self.page
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    # Peak since the previous reset
+    def reset(self) -> int:
+        current = self.current()
+        peak, self.peak = max(self.peak, current), current
+        return peak
+
+    def stop(self):
+        self.stopped.set()
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Cumulative counts per bound, the last one for +Inf
+    def cumulative(self) -> list:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {str(bound): count for bound, count in zip(self.bounds + ["+Inf"], self.cumulative())},
+        }
+
+class StageRecord:
+    """
+    Totals of one stage over all its calls. Code inside a stage reports its row counts with
+    rows(rows_in, rows_out).
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.rss_start_mb = None
+        self.peak_rss_delta_mb = 0.0
+        self.rows_in = None
+        self.rows_out = None
+
+    def rows(self, rows_in: int = None, rows_out: int = None):
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + int(rows_in)
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + int(rows_out)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "rss_start_mb": round(self.rss_start_mb, 1),
+            "peak_rss_delta_mb": round(self.peak_rss_delta_mb, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+        }
+
+class _NullRecord:
+    def rows(self, rows_in: int = None, rows_out: int = None):
+        pass
+
+class _NullStage:
+    def __enter__(self):
+        return _NULL_RECORD
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_RECORD = _NullRecord()
+_END = object()
+_NULL_STAGE = _NullStage()
+
+def _cpu_seconds() -> float:
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+class _Profiler:
+    """
+    One profiler per stage, enabled only while the stage runs; cProfile writes <stage>.prof
+    (open with pstats or snakeviz), pyinstrument writes <stage>.html and <stage>.txt.
+    """
+
+    def __init__(self, kind: str, output_dir: Path):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler {kind!r}; choose one of {PROFILERS}")
+        if kind == "pyinstrument":
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                raise RuntimeError("--profiler pyinstrument needs the pyinstrument package (pip install pyinstrument)")
+        self.kind = kind
+        self.output_dir = Path(output_dir)
+        self.profiles = {}
+
+    def start(self, name: str):
+        profile = self.profiles.get(name)
+        if profile is None:
+            if self.kind == "cprofile":
+                import cProfile
+                profile = cProfile.Profile()
+            else:
+                from pyinstrument import Profiler
+                profile = Profiler()
+            self.profiles[name] = profile
+        if self.kind == "cprofile":
+            profile.enable()
+        else:
+            profile.start()
+
+    def stop(self, name: str):
+        profile = self.profiles[name]
+        if self.kind == "cprofile":
+            profile.disable()
+        else:
+            profile.stop()
+
+    def write(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for name, profile in self.profiles.items():
+            if self.kind == "cprofile":
+                profile.dump_stats(self.output_dir / f"{name}.prof")
+            else:
+                (self.output_dir / f"{name}.html").write_text(profile.output_html())
+                (self.output_dir / f"{name}.txt").write_text(profile.output_text())
+
+class RunMetrics:
+    def __init__(self, profile_dir: Path = None, profiler: str = "cprofile"):
+        self.started = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = _cpu_seconds()
+        self.sampler = RssSampler()
+        self.run_peak = self.sampler.peak
+        self.stages = {}
+        self.histograms = {}
+        self.counters = {}
+        self.profiler = _Profiler(profiler, profile_dir) if profile_dir else None
+        self.finished = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        record = self.stages.setdefault(name, StageRecord())
+        rss_start = self.sampler.current()
+        self.run_peak = max(self.run_peak, self.sampler.reset())
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        if self.profiler is not None:
+            self.profiler.start(name)
+        try:
+            yield record
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop(name)
+            record.calls += 1
+            record.wall_s += time.perf_counter() - wall
+            record.cpu_s += _cpu_seconds() - cpu
+            peak = self.sampler.reset()
+            self.run_peak = max(self.run_peak, peak)
+            if record.rss_start_mb is None:
+                record.rss_start_mb = rss_start / _MB
+            record.peak_rss_delta_mb = max(record.peak_rss_delta_mb, (peak - rss_start) / _MB)
+
+    def stage_iter(self, name: str, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as record:
+                item = next(iterator, _END)
+                if item is not _END and hasattr(item, "__len__"):
+                    record.rows(rows_out=len(item))
+            if item is _END:
+                return
+            yield item
+
+    def histogram(self, name: str) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(HISTOGRAM_BUCKETS.get(name, DEFAULT_BUCKETS))
+        return self.histograms[name]
+
+    def finish(self):
+        self.run_peak = max(self.run_peak, self.sampler.reset())
+        self.sampler.stop()
+        self.finished = {"wall_s": time.perf_counter() - self.wall_start, "cpu_s": _cpu_seconds() - self.cpu_start}
+        if self.profiler is not None:
+            self.profiler.write()
+
+    def to_dict(self) -> dict:
+        finished = self.finished or {"wall_s": time.perf_counter() - self.wall_start,
+                                     "cpu_s": _cpu_seconds() - self.cpu_start}
+        return {
+            "run": {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+                "argv": sys.argv,
+                "wall_s": round(finished["wall_s"], 4),
+                "cpu_s": round(finished["cpu_s"], 4),
+                "peak_rss_mb": round(self.run_peak / _MB, 1),
+            },
+            "stages": {name: record.to_dict() for name, record in self.stages.items()},
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            "counters": dict(self.counters),
+        }
+
+    def write_json(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2, default=str))
+        print(f"Saved: {path}")
+
+    def write_prometheus(self, path: Path):
+        """
+        Writes the report in the Prometheus text format, for node_exporter's textfile collector.
+        The file is replaced atomically so the collector never reads a partial file.
+        """
+        report = self.to_dict()
+        lines = []
+
+        def gauge(name, help_text, samples):
+            lines.extend([f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}", f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge"])
+            lines.extend(f"{PROMETHEUS_PREFIX}_{name}{labels} {value}" for labels, value in samples)
+
+        stages = report["stages"]
+        gauge("run_wall_seconds", "Wall time of the last run.", [("", report["run"]["wall_s"])])
+        gauge("run_cpu_seconds", "CPU time of the last run, including worker processes.", [("", report["run"]["cpu_s"])])
+        gauge("run_peak_rss_bytes", "Peak resident memory of the last run.", [("", int(report["run"]["peak_rss_mb"] * _MB))])
+        for key, name, help_text, scale in [
+            ("wall_s", "stage_wall_seconds", "Wall time per stage.", 1),
+            ("cpu_s", "stage_cpu_seconds", "CPU time per stage, including worker processes.", 1),
+            ("peak_rss_delta_mb", "stage_peak_rss_delta_bytes", "Peak resident memory above the stage's start.", _MB),
+            ("rows_in", "stage_rows_in", "Rows read per stage.", 1),
+            ("rows_out", "stage_rows_out", "Rows written per stage.", 1),
+        ]:
+            gauge(name, help_text, [(f'{{stage="{stage}"}}', int(entry[key] * scale) if scale != 1 else entry[key])
+                                    for stage, entry in stages.items() if entry[key] is not None])
+        for name, counters in report["counters"].items():
+            gauge(name, f"{name} counters of the last run.",
+                  [(f'{{counter="{key}"}}', value) for key, value in counters.items()])
+        for name, histogram in self.histograms.items():
+            metric = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.extend([f"# HELP {metric} Latency per call.", f"# TYPE {metric} histogram"])
+            for bound, count in zip(histogram.bounds + ["+Inf"], histogram.cumulative()):
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+            lines.extend([f"{metric}_sum {histogram.sum}", f"{metric}_count {histogram.count}"])
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+        print(f"Saved: {path}")
+
+_active = None
+
+# Context of one pipeline stage; yields a record whose rows() adds row counts. A stage entered
+# several times (e.g. once per streamed block) accumulates. Stages must not be nested.
+def stage(name: str):
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+# Iterates over iterable, timing each step (e.g. reading and cleaning the next chunk) as the
+# stage; the length of each item is counted as rows out.
+def stage_iter(name: str, iterable):
+    if _active is None:
+        return iterable
+    return _active.stage_iter(name, iterable)
+
+# The active run's histogram of that name, or None when no run is instrumented.
+def histogram(name: str):
+    return None if _active is None else _active.histogram(name)
+
+# Records a dict of counters (e.g. summary statistics) under a name.
+def record_counters(name: str, counters: dict):
+    if _active is not None:
+        _active.counters[name] = {key: value for key, value in counters.items() if isinstance(value, (int, float))}
+
+@contextlib.contextmanager
+def instrumented_run(report: Path = None, prometheus: Path = None, profile_dir: Path = None,
+                     profiler: str = "cprofile", enabled: bool = None):
+    """
+    Instruments the code run inside it. Enabled when any output is requested (or enabled=True);
+    yields the RunMetrics, or None when disabled. On exit writes the JSON report, the Prometheus
+    textfile and the per-stage profiles that were requested.
+    """
+    global _active
+    if enabled is None:
+        enabled = any(option is not None for option in (report, prometheus, profile_dir))
+    if not enabled:
+        yield None
+        return
+    run = _active = RunMetrics(profile_dir, profiler)
+    try:
+        yield run
+    finally:
+        _active = None
+        run.finish()
+        if report is not None:
+            run.write_json(report)
+        if prometheus is not None:
+            run.write_prometheus(prometheus)
@@ -1,14 +1,69 @@
-
+import re
 import json
+import pickle
+import time
+import hashlib
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
-MITRE_PATH = Path("data/enterprise-attack.json")
+from metrics import histogram
+
+# Default ATT&CK bundle: data/enterprise-attack.json in the repository, wherever the pipeline is run from.
+MITRE_PATH = Path(__file__).resolve().parent.parent / "data" / "enterprise-attack.json"
+BUNDLE_NAME = "enterprise-attack.json"
+
+# Bump when the index layout or matcher changes so existing index files are rebuilt.
+INDEX_VERSION = 2
+
+# Words left out of technique keywords.
+STOPWORDS = {"and", "the", "for", "from", "with", "via", "into", "other", "through"}
+
+# The bundle in the pipeline's input directory (or its parent) if there is one, else the default bundle.
+def find_attack_bundle(input_dir=None) -> Path:
+    if input_dir is not None:
+        # A fleet's host directories share the bundle of the fleet directory
+        for directory in [Path(input_dir), Path(input_dir).parent]:
+            if (directory / BUNDLE_NAME).exists():
+                return directory / BUNDLE_NAME
+    return MITRE_PATH
+
+# Compiled index stored next to its bundle, e.g. enterprise-attack.index.pkl.
+def index_path(bundle_path: Path) -> Path:
+    return bundle_path.with_name(bundle_path.stem + ".index.pkl")
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _tactic_key(tactic: str) -> str:
+    return tactic.lower().replace("-", " ").strip()
+
+def _keywords(*names) -> list:
+    words = re.findall(r"[a-z0-9]+", " ".join(names).lower())
+    return list(dict.fromkeys(word for word in words if len(word) > 2 and word not in STOPWORDS))
+
+def build_attack_index(bundle_path: Path = None) -> dict:
+    """
+    Compiles a STIX bundle into the technique index used for enrichment.
 
-def load_attack_techniques():
-    with open(MITRE_PATH, "r", encoding="utf-8") as f:
+    Techniques keep bundle order and the id / name / description fields read by the matcher,
+    plus their tactics (names resolved from kill_chain_phases via the bundle's x-mitre-tactic
+    objects), platforms, parent technique id for sub-techniques and name keywords. by_id,
+    by_tactic and by_platform map lookups to positions in the technique list, and the compiled
+    matcher (see compile_matcher) is stored so it is not rebuilt on every run.
+    """
+    bundle_path = Path(bundle_path or MITRE_PATH)
+    with open(bundle_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    tactic_names = {obj["x_mitre_shortname"]: obj.get("name", obj["x_mitre_shortname"])
+                    for obj in data["objects"]
+                    if obj.get("type") == "x-mitre-tactic" and "x_mitre_shortname" in obj}
+
     techniques = []
     for obj in data["objects"]:
         if obj.get("type") == "attack-pattern" and "external_references" in obj:
@@ -16,14 +71,108 @@ def load_attack_techniques():
                 (ref["external_id"] for ref in obj["external_references"] if ref.get("source_name") == "mitre-attack"),
                 None
             )
-            name = obj.get("name", "Unknown")
-            description = obj.get("description", "").lower()
+            phases = [phase["phase_name"] for phase in obj.get("kill_chain_phases", [])
+                      if phase.get("kill_chain_name") == "mitre-attack"]
             techniques.append({
                 "id": attack_id,
-                "name": name,
-                "description": description
+                "name": obj.get("name", "Unknown"),
+                "description": obj.get("description", "").lower(),
+                "tactics": [tactic_names.get(phase, phase.replace("-", " ").title()) for phase in phases],
+                "platforms": list(obj.get("x_mitre_platforms", [])),
+                "parent": attack_id.split(".")[0] if attack_id and "." in attack_id else None,
+                "deprecated": bool(obj.get("x_mitre_deprecated") or obj.get("revoked")),
             })
-    return techniques
+
+    by_id, by_tactic, by_platform = {}, {}, {}
+    for position, tech in enumerate(techniques):
+        if tech["id"] is not None:
+            by_id.setdefault(tech["id"], position)
+        for tactic in tech["tactics"]:
+            by_tactic.setdefault(_tactic_key(tactic), []).append(position)
+        for platform in tech["platforms"]:
+            by_platform.setdefault(platform.lower(), []).append(position)
+    for tech in techniques:
+        parent = techniques[by_id[tech["parent"]]]["name"] if tech["parent"] in by_id else ""
+        tech["keywords"] = _keywords(tech["name"], parent)
+
+    matcher = compile_matcher(techniques)
+    return {
+        "version": INDEX_VERSION,
+        "techniques": techniques,
+        "by_id": by_id,
+        "by_tactic": by_tactic,
+        "by_platform": by_platform,
+        "matcher": {**matcher, "regex": None},
+    }
+
+# Loaded indexes by bundle path, so a process reads each index once.
+_loaded = {}
+
+def load_attack_index(bundle_path: Path = None, rebuild: bool = False) -> dict:
+    """
+    Returns the technique index of a bundle, compiling it only when needed.
+
+    The index is pickled next to the bundle together with the bundle's size, mtime and
+    SHA-256. It is reused as is while size and mtime match; after a touch or copy the hash
+    decides, so only a changed bundle is compiled again. If the index file cannot be
+    written (e.g. a read-only data directory) the index is built in memory for this run.
+    """
+    bundle_path = Path(bundle_path or MITRE_PATH)
+    stat = bundle_path.stat()
+    key = str(bundle_path.resolve())
+    cached = _loaded.get(key)
+    if cached is not None and not rebuild and cached["source"]["stat"] == (stat.st_size, stat.st_mtime_ns):
+        return cached
+
+    path = index_path(bundle_path)
+    index = None
+    if path.exists() and not rebuild:
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+        except Exception:
+            index = None
+        if index is not None and index.get("version") != INDEX_VERSION:
+            index = None
+    if index is not None and index["source"]["stat"] != (stat.st_size, stat.st_mtime_ns):
+        if index["source"]["sha256"] == _file_hash(bundle_path):
+            index["source"]["stat"] = (stat.st_size, stat.st_mtime_ns)
+            _write_index(index, path)
+        else:
+            index = None
+    if index is None:
+        index = build_attack_index(bundle_path)
+        index["source"] = {"stat": (stat.st_size, stat.st_mtime_ns), "sha256": _file_hash(bundle_path)}
+        _write_index(index, path)
+    _loaded[key] = index
+    return index
+
+def _write_index(index: dict, path: Path):
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+    except OSError as e:
+        print(f"Could not write ATT&CK index {path}: {e}")
+
+def load_attack_techniques(bundle_path: Path = None):
+    return load_attack_index(bundle_path)["techniques"]
+
+def technique_by_id(index: dict, attack_id: str):
+    position = index["by_id"].get(attack_id)
+    return index["techniques"][position] if position is not None else None
+
+# Tactics can be given by name ("Defense Evasion") or short name ("defense-evasion").
+def techniques_by_tactic(index: dict, tactic: str) -> list:
+    return [index["techniques"][position] for position in index["by_tactic"].get(_tactic_key(tactic), [])]
+
+def techniques_by_platform(index: dict, platform: str) -> list:
+    return [index["techniques"][position] for position in index["by_platform"].get(platform.lower(), [])]
+
+# Tactic names of a technique for the mitre_tactic column.
+def tactic_label(tech) -> str:
+    return ", ".join(tech.get("tactics", [])) or "Unknown"
 
 def match_mitre_dynamic(summary, techniques):
     if not isinstance(summary, str):
@@ -37,7 +186,7 @@ def match_mitre_dynamic(summary, techniques):
             return pd.Series({
                 "mitre_technique": tech["name"],
                 "mitre_id": tech["id"],
-                "mitre_tactic": "TBD"
+                "mitre_tactic": tactic_label(tech)
             })
 
     return pd.Series({
@@ -46,13 +195,191 @@ def match_mitre_dynamic(summary, techniques):
         "mitre_tactic": "N/A"
     })
 
-def enrich_with_mitre(df: pd.DataFrame) -> pd.DataFrame:
+# Text patterns a technique is matched on: its lowercased name and the first 300 characters
+# of its description (the same checks match_mitre_dynamic performs).
+def technique_patterns(tech) -> list:
+    return list(dict.fromkeys([tech["name"].lower(), tech["description"][:300]]))
+
+# Builds a regex matching the longest of `words` that starts at the current position.
+# Words sharing a prefix share a branch, so a match costs O(match length) instead of O(len(words)).
+def _trie_regex(words) -> str:
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        ends_here = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if ends_here else body
+
+    return build(trie)
+
+def compile_matcher(techniques) -> dict:
+    """
+    Compiles all technique patterns and keywords into one regex for single-pass, multi-pattern
+    matching.
+
+    The regex finds, at every position of a summary, the longest pattern starting there; the
+    shorter patterns starting at the same position are exactly that pattern's prefixes, which
+    are precomputed, so every occurrence of every pattern is found in one scan. Empty patterns
+    (techniques without a description) match every summary, as substring checks do. Keywords
+    (see build_attack_index) are scanned with the patterns. Deprecated and revoked techniques
+    are left out, since the bundle lists the techniques that replace them.
+    """
+    pattern_techniques = {}
+    keyword_techniques = {}
+    keyword_counts = np.zeros(len(techniques), dtype=np.int64)
+    keyword_lengths = np.zeros(len(techniques), dtype=np.int64)
+    always = set()
+    for index, tech in enumerate(techniques):
+        if tech["id"] is None or tech.get("deprecated"):
+            continue
+        for pattern in technique_patterns(tech):
+            if pattern:
+                pattern_techniques.setdefault(pattern, []).append(index)
+            else:
+                always.add(index)
+        if tech.get("keywords"):
+            keyword_counts[index] = len(tech["keywords"])
+            keyword_lengths[index] = sum(map(len, tech["keywords"]))
+            for keyword in tech["keywords"]:
+                keyword_techniques.setdefault(keyword, []).append(index)
+    patterns = sorted(set(pattern_techniques) | set(keyword_techniques))
+    prefixes = {pattern: [other for other in patterns[:i] if pattern.startswith(other)]
+                for i, pattern in enumerate(patterns)}
+    pattern = "(?=(" + _trie_regex(patterns) + "))" if patterns else None
+    return {
+        "techniques": techniques,
+        "pattern": pattern,
+        "regex": re.compile(pattern) if pattern else None,
+        "pattern_techniques": pattern_techniques,
+        "keyword_techniques": {keyword: np.array(indices, dtype=np.int64)
+                               for keyword, indices in keyword_techniques.items()},
+        "keyword_counts": keyword_counts,
+        "keyword_lengths": keyword_lengths,
+        "prefixes": prefixes,
+        "always": always,
+    }
+
+# Techniques matched by one (lowercased) summary, as {technique index: score} for those matched
+# by name or description, where the score is the total length of the matched patterns, and the
+# same for those matched only by keywords: all of a technique's keywords occur in the summary,
+# scoring their total length.
+def match_all(summary: str, matcher: dict):
+    found = set()
+    if matcher["regex"] is not None:
+        for match in matcher["regex"].finditer(summary):
+            longest = match.group(1)
+            if longest not in found:
+                found.add(longest)
+                found.update(matcher["prefixes"][longest])
+    scores = dict.fromkeys(matcher["always"], 0)
+    for pattern in found:
+        for index in matcher["pattern_techniques"].get(pattern, ()):
+            scores[index] = scores.get(index, 0) + len(pattern)
+    # Keywords are short and shared by many techniques, so they are counted per technique at once
+    by_keywords = {}
+    hits = [matcher["keyword_techniques"][pattern] for pattern in found if pattern in matcher["keyword_techniques"]]
+    if hits:
+        counts = np.bincount(np.concatenate(hits), minlength=len(matcher["keyword_counts"]))
+        for index in np.flatnonzero(counts == matcher["keyword_counts"]).tolist():
+            if matcher["keyword_counts"][index] and index not in scores:
+                by_keywords[index] = int(matcher["keyword_lengths"][index])
+    return scores, by_keywords
+
+MITRE_COLUMNS = ["mitre_technique", "mitre_id", "mitre_tactic", "mitre_matches"]
+
+# Matches a column of summaries and returns the MITRE columns aligned with its index:
+# mitre_technique / mitre_id / mitre_tactic for the first technique (in bundle order) matched by
+# name or description, as before, and mitre_matches listing every match, keyword matches
+# included, as "ID:score", best score first.
+def match_summaries(summaries: pd.Series, matcher: dict) -> pd.DataFrame:
+    techniques = matcher["techniques"]
+    codes, uniques = pd.factorize(summaries.map(str).str.lower())
+    names, ids, tactics, matches = [], [], [], []
+    # Latency of matching each distinct summary
+    latency = histogram("mitre_match_seconds")
+    for summary in uniques:
+        if latency is None:
+            scores, by_keywords = match_all(summary, matcher)
+        else:
+            start = time.perf_counter()
+            scores, by_keywords = match_all(summary, matcher)
+            latency.observe(time.perf_counter() - start)
+        if scores:
+            first = techniques[min(scores)]
+            names.append(first["name"])
+            ids.append(first["id"])
+            tactics.append(tactic_label(first))
+        else:
+            names.append("Unknown")
+            ids.append("N/A")
+            tactics.append("N/A")
+        ranked = sorted([*scores.items(), *by_keywords.items()], key=lambda item: (-item[1], item[0]))
+        matches.append(";".join(f"{techniques[index]['id']}:{score}" for index, score in ranked))
+    columns = {}
+    for column, values in zip(MITRE_COLUMNS, [names, ids, tactics, matches]):
+        columns[column] = np.asarray(values, dtype=object)[codes] if len(codes) else np.empty(0, dtype=object)
+    return pd.DataFrame(columns, index=summaries.index)
+
+_compiled = (None, None)
+
+# Compiles a technique list once and reuses the matcher for later calls with the same list.
+# Technique lists of a loaded index use the index's stored matcher; only its regex is compiled.
+def _matcher_for(techniques) -> dict:
+    global _compiled
+    if _compiled[0] is not techniques:
+        stored = next((index["matcher"] for index in _loaded.values() if index["techniques"] is techniques), None)
+        if stored is None:
+            matcher = compile_matcher(techniques)
+        else:
+            if stored["regex"] is None and stored["pattern"]:
+                stored["regex"] = re.compile(stored["pattern"])
+            matcher = stored
+        _compiled = (techniques, matcher)
+    return _compiled[1]
+
+def enrich_with_mitre(df: pd.DataFrame, techniques=None, bundle_path: Path = None) -> pd.DataFrame:
     """
     Enriches unified_df with MITRE technique information from enterprise-attack.json
+    Pass preloaded techniques to avoid re-reading the bundle when enriching in chunks.
     """
-    print("Loading MITRE ATT&CK techniques...")
-    techniques = load_attack_techniques()
-    print(f"Loaded {len(techniques)} techniques.")
+    if techniques is None:
+        print("Loading MITRE ATT&CK techniques...")
+        techniques = load_attack_techniques(bundle_path)
+        print(f"Loaded {len(techniques)} techniques.")
 
     print("Matching summaries to MITRE techniques...")
-    return df.join(df["llm_summary"].apply(lambda x: match_mitre_dynamic(x, techniques)))
+    return df.join(match_summaries(df["llm_summary"], _matcher_for(techniques)))
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Compile and query the ATT&CK technique index")
+    parser.add_argument("--bundle", default=str(MITRE_PATH), help="Path to enterprise-attack.json")
+    parser.add_argument("--rebuild", action="store_true", help="Compile the index even if it is up to date")
+    parser.add_argument("--id", help="Show one technique, e.g. T1059.001")
+    parser.add_argument("--tactic", help="List techniques of a tactic, e.g. 'Defense Evasion' or defense-evasion")
+    parser.add_argument("--platform", help="List techniques for a platform, e.g. Windows")
+    args = parser.parse_args()
+
+    index = load_attack_index(Path(args.bundle), rebuild=args.rebuild)
+    print(f"{len(index['techniques'])} techniques, {len(index['by_tactic'])} tactics, "
+          f"{len(index['by_platform'])} platforms ({index_path(Path(args.bundle))})")
+    if args.id:
+        tech = technique_by_id(index, args.id)
+        print(json.dumps({k: v for k, v in tech.items() if k != "description"}, indent=2) if tech else f"{args.id} not found")
+    selected = None
+    if args.tactic:
+        selected = techniques_by_tactic(index, args.tactic)
+    if args.platform:
+        by_platform = techniques_by_platform(index, args.platform)
+        on_platform = {id(tech) for tech in by_platform}
+        selected = by_platform if selected is None else [tech for tech in selected if id(tech) in on_platform]
+    for tech in selected or []:
+        print(f"{tech['id']}\t{tech['name']}\t{tactic_label(tech)}")
@@ -0,0 +1,135 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from cleaning import CLEANING_SPECS, clean_events, restore_integers
+from storage import frame_to_ipc, frame_from_ipc
+
+# source name -> raw file name, in the order the serial pipeline cleans them
+RAW_FILES = {
+    "process": "process_events.csv",
+    "network": "network_events.csv",
+    "file": "file_events.csv",
+    "registry": "registry_events.csv",
+}
+
+# Sources larger than this are split into byte-range shards cleaned by separate workers.
+SHARD_BYTES = 64 * 1024 * 1024
+
+# Splits a CSV into (start, end) byte ranges of roughly shard_bytes, each ending on a line break.
+# Assumes records do not contain embedded newlines.
+def shard_ranges(path: Path, shard_bytes: int = SHARD_BYTES):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()
+        boundaries = [f.tell()]
+        target = boundaries[0] + shard_bytes
+        while target < size:
+            f.seek(target)
+            f.readline()
+            if f.tell() >= size:
+                break
+            boundaries.append(f.tell())
+            target = f.tell() + shard_bytes
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _read_shard(path: Path, start: int, end: int) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), dtype=str)
+
+# Worker: cleans a whole (small) source exactly like the serial path.
+def _clean_whole(source: str, path: Path):
+    stats = {}
+    cleaned = clean_events(pd.read_csv(path), CLEANING_SPECS[source], stats=stats)
+    return frame_to_ipc(cleaned), stats
+
+# Worker, first pass over a shard: row hashes for global de-duplication and the
+# earliest valid timestamp for the drift origin.
+def _scan_shard(source: str, path: Path, start: int, end: int):
+    df = _read_shard(path, start, end)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    state = {"observed_min": None}
+    if CLEANING_SPECS[source].get("drift_column"):
+        clean_events(df, CLEANING_SPECS[source], state)
+    return hashes, state["observed_min"]
+
+# Worker, second pass: drops rows that duplicate earlier shards and cleans with the global drift origin.
+def _clean_shard(source: str, path: Path, start: int, end: int, keep, min_time):
+    df = _read_shard(path, start, end)[keep]
+    stats = {}
+    cleaned = restore_integers(clean_events(df, CLEANING_SPECS[source], {"min_time": min_time}, stats))
+    return frame_to_ipc(cleaned), stats
+
+def _merge_stats(total: dict, stats: dict):
+    for rule, count in stats.items():
+        total[rule] = total.get(rule, 0) + count
+
+def _restore_categoricals(df: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    for col in spec.get("categorical", []):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+def clean_sources_parallel(input_path: Path, workers: int, drop_counts=None, shard_bytes: int = SHARD_BYTES):
+    """
+    Cleans the four raw sources in a process pool and returns {source: cleaned DataFrame}.
+
+    Sources up to shard_bytes are cleaned whole by one worker, exactly as in the serial path.
+    Larger sources are split into line-aligned byte ranges and cleaned in two passes: workers
+    first return row hashes and earliest valid timestamps, the parent resolves duplicates
+    across shards (first occurrence wins) and the global drift origin, and workers then clean
+    their shard with that state. Cleaned frames come back as Arrow IPC buffers and are
+    concatenated in shard order, so the result matches the serial path row for row.
+    """
+    if drop_counts is None:
+        drop_counts = {}
+    for source in RAW_FILES:
+        drop_counts.setdefault(source, {})
+    shards = {source: shard_ranges(input_path / name, shard_bytes) for source, name in RAW_FILES.items()}
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        whole = {source: pool.submit(_clean_whole, source, input_path / RAW_FILES[source])
+                 for source, ranges in shards.items() if len(ranges) == 1}
+        scans = {source: [pool.submit(_scan_shard, source, input_path / RAW_FILES[source], start, end)
+                          for start, end in ranges]
+                 for source, ranges in shards.items() if len(ranges) > 1}
+
+        cleaning = {}
+        for source, futures in scans.items():
+            scanned = [future.result() for future in futures]
+            hashes = pd.Series(np.concatenate([shard_hashes for shard_hashes, _ in scanned]))
+            first = ~hashes.duplicated().to_numpy()
+            mins = [observed for _, observed in scanned if observed is not None]
+            min_time = min(mins) if mins else None
+            stats = drop_counts[source]
+            offset = 0
+            cleaning[source] = []
+            for (start, end), (shard_hashes, _) in zip(shards[source], scanned):
+                keep = first[offset:offset + len(shard_hashes)]
+                offset += len(shard_hashes)
+                duplicates = int(len(keep) - keep.sum())
+                _merge_stats(stats, {"rows_in": duplicates, "duplicate": duplicates})
+                cleaning[source].append(pool.submit(_clean_shard, source, input_path / RAW_FILES[source],
+                                                    start, end, keep, min_time))
+
+        for source in RAW_FILES:
+            if source in whole:
+                buffer, stats = whole[source].result()
+                _merge_stats(drop_counts[source], stats)
+                results[source] = frame_from_ipc(buffer)
+                continue
+            parts = []
+            for future in cleaning[source]:
+                buffer, stats = future.result()
+                _merge_stats(drop_counts[source], stats)
+                parts.append(frame_from_ipc(buffer))
+            df = pd.concat(parts, ignore_index=True)
+            results[source] = _restore_categoricals(df, CLEANING_SPECS[source])
+    return results
@@ -1,45 +1,460 @@
-
+import numpy as np
 import pandas as pd
-import networkx as nx
 
-# Constructs a directed graph from parent-child process relationships.
-def build_process_tree(process_df: pd.DataFrame) -> nx.DiGraph:
-    G = nx.DiGraph()
-    for _, row in process_df.iterrows():
-        G.add_node(row['process_id'], **row.to_dict())
-        G.add_edge(row['parent_id'], row['process_id'])
-    return G
+from compact import ip_text
+from correlation import ProcessInstances
+
+# Positions of the concatenated ranges [start, start + length), e.g. the CSR slices of several nodes.
+def _range_positions(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+def _csr(sources: np.ndarray, targets: np.ndarray, n: int):
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return indptr, targets[order]
+
+class ProcessGraph:
+    """
+    Process tree in compressed sparse row (CSR) form.
+
+    Nodes are the distinct process_id and parent_id values (ids), except that a reused pid (one
+    with process rows of several start times) has a node per process instance, whose id is
+    the instance key "<pid>@<start_time>" (see correlation.py); pids[i] is the pid of node i
+    and instances maps each reused pid to its instance ids in start order. The children of node i are
+    children[indptr[i]:indptr[i + 1]] and its parents parents[parent_indptr[i]:parent_indptr[i + 1]],
+    as node numbers in order of the first row linking them, which is the order networkx
+    returned successors in. Rows are not copied into the graph: rows[i] is the position in
+    frame of the last row of node i, or -1 for pids only seen as a parent.
+
+    graph.nodes[pid], pid in graph and graph.successors(pid) behave like the networkx calls
+    older code used on the graph returned by build_process_tree.
+    """
+
+    def __init__(self, ids, rows: np.ndarray, edge_parents: np.ndarray, edge_children: np.ndarray,
+                 frame: pd.DataFrame, pids=None, lifetimes: ProcessInstances = None):
+        self.index = pd.Index(ids)
+        self.ids = self.index.tolist()
+        self.pids = self.ids if pids is None else list(pids)
+        self.rows = rows
+        self.frame = frame
+        # Lifetimes of the reused pids, to place their events (see event_ids)
+        self.lifetimes = lifetimes
+        self.instances = {}
+        for node_id, pid in zip(self.ids, self.pids):
+            if node_id != pid:
+                self.instances.setdefault(pid, []).append(node_id)
+        # Duplicate edges are dropped, keeping the first
+        n = len(self.ids)
+        _, first = np.unique(edge_parents * n + edge_children, return_index=True)
+        first.sort()
+        edge_parents, edge_children = edge_parents[first], edge_children[first]
+        self.indptr, self.children = _csr(edge_parents, edge_children, n)
+        self.parent_indptr, self.parents = _csr(edge_children, edge_parents, n)
+
+    @classmethod
+    def from_networkx(cls, graph) -> "ProcessGraph":
+        ids = list(graph.nodes)
+        position = {pid: i for i, pid in enumerate(ids)}
+        with_rows = [pid for pid in ids if graph.nodes[pid]]
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        rows[[position[pid] for pid in with_rows]] = np.arange(len(with_rows))
+        edges = np.array([(position[u], position[v]) for u, v in graph.edges()], dtype=np.int64).reshape(-1, 2)
+        return cls(ids, rows, edges[:, 0], edges[:, 1], pd.DataFrame([graph.nodes[pid] for pid in with_rows]))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, pid) -> bool:
+        return self.node(pid) >= 0
+
+    # Node number of a pid, -1 if it is not in the graph.
+    def node(self, pid) -> int:
+        try:
+            loc = self.index.get_loc(pid)
+        except (KeyError, TypeError):
+            return -1
+        return loc if isinstance(loc, (int, np.integer)) else -1
+
+    def node_numbers(self, pids) -> np.ndarray:
+        return self.index.get_indexer(list(pids))
+
+    # Node ids of root pids: a reused pid stands for all its instances, other ids for themselves.
+    def root_ids(self, root_pids) -> list:
+        ids = []
+        for pid in root_pids:
+            ids.extend([pid] if pid in self else self.instances.get(pid, [pid]))
+        return list(dict.fromkeys(ids))
+
+    # Node ids of events (pids and timestamps): the pid, or for a reused pid the instance that
+    # started last at or before the event (see ProcessInstances.nearest).
+    def event_ids(self, pids, timestamps) -> pd.Series:
+        ids = pd.Series(pids, dtype=object).reset_index(drop=True)
+        if self.instances:
+            reused = ids.isin(list(self.instances)).to_numpy()
+            ids[reused] = _instance_ids(self.lifetimes, ids[reused], pd.Series(timestamps)[reused])
+        return ids
+
+    # Pids of node ids, e.g. the processes shown in a report.
+    def pids_of(self, ids) -> set:
+        return {self.pids[node] for node in self.node_numbers(ids) if node >= 0}
+
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    # Attributes of a pid as a dict, read from its row in frame ({} for parent-only pids).
+    def attributes(self, pid) -> dict:
+        row = self.rows[self.node(pid)]
+        return self.frame.iloc[row].to_dict() if row >= 0 else {}
+
+    def child_nodes(self, node: int) -> np.ndarray:
+        return self.children[self.indptr[node]:self.indptr[node + 1]]
+
+    def successors(self, pid) -> list:
+        node = self.node(pid)
+        return [self.ids[child] for child in self.child_nodes(node)] if node >= 0 else []
+
+    def predecessors(self, pid) -> list:
+        node = self.node(pid)
+        if node < 0:
+            return []
+        return [self.ids[parent] for parent in self.parents[self.parent_indptr[node]:self.parent_indptr[node + 1]]]
+
+    # Nodes reachable from the start nodes over at least one edge, breadth first over whole
+    # frontiers; nodes already marked in `blocked` are neither returned nor expanded.
+    def _reach(self, starts, indptr, targets, blocked=None) -> np.ndarray:
+        seen = np.zeros(len(self.ids), dtype=bool) if blocked is None else blocked.copy()
+        frontier = np.asarray(starts, dtype=np.int64)
+        reached = []
+        while len(frontier):
+            nxt = targets[_range_positions(indptr[frontier], indptr[frontier + 1] - indptr[frontier])]
+            nxt = np.unique(nxt[~seen[nxt]])
+            seen[nxt] = True
+            reached.append(nxt)
+            frontier = nxt
+        return np.concatenate(reached) if reached else np.empty(0, dtype=np.int64)
+
+    def descendant_nodes(self, node: int, blocked=None) -> np.ndarray:
+        return self._reach([node], self.indptr, self.children, blocked)
+
+    def descendants(self, pid) -> set:
+        node = self.node(pid)
+        if node < 0:
+            return set()
+        return {self.ids[n] for n in self.descendant_nodes(node) if n != node}
+
+    def ancestors(self, pid) -> set:
+        node = self.node(pid)
+        if node < 0:
+            return set()
+        return {self.ids[n] for n in self._reach([node], self.parent_indptr, self.parents) if n != node}
+
+    # pid and all its descendants, pid first.
+    def subtree(self, pid) -> list:
+        node = self.node(pid)
+        if node < 0:
+            return []
+        return [pid] + [self.ids[n] for n in self.descendant_nodes(node) if n != node]
+
+    # Number of parent_id links from pid up to the first process without a known parent
+    # (following each process's own parent_id; stops at cycles).
+    def depth(self, pid) -> int:
+        node = self.node(pid)
+        seen = set()
+        depth = 0
+        while node >= 0 and node not in seen and self.rows[node] >= 0:
+            seen.add(node)
+            row = self.rows[node]
+            parent = self.frame["parent_id"].iat[row]
+            if self.instances:
+                parent = self.event_ids([parent], [self.frame["start_time"].iat[row]])[0]
+            node = self.node(parent)
+            if node < 0:
+                break
+            depth += 1
+        return depth
+
+class _NodeView:
+    def __init__(self, graph: ProcessGraph):
+        self.graph = graph
+
+    def __contains__(self, pid) -> bool:
+        return pid in self.graph
+
+    def __getitem__(self, pid) -> dict:
+        if pid not in self.graph:
+            raise KeyError(pid)
+        return self.graph.attributes(pid)
+
+    def __iter__(self):
+        return iter(self.graph.ids)
+
+    def __len__(self) -> int:
+        return len(self.graph)
+
+# "<pid>@<start_time>" keys of the instances that ProcessInstances.nearest gives events.
+def _instance_ids(lifetimes: ProcessInstances, pids, timestamps) -> np.ndarray:
+    keys = lifetimes.instance_keys(lifetimes.nearest(pids, timestamps))
+    return pd.Series(keys).astype(object).to_numpy()
+
+# Constructs the process graph from parent-child process relationships.
+# Built from the process_id / parent_id columns without iterating rows. Pids whose rows have
+# several start times are split into process instances; a row's parent is the instance of its
+# parent_id that started last at or before the row's start_time.
+def build_process_tree(process_df: pd.DataFrame) -> ProcessGraph:
+    pids, parents = process_df["process_id"], process_df["parent_id"]
+    starts = pd.to_datetime(process_df["start_time"])
+    lifetimes = None
+    distinct = pd.DataFrame({"pid": pids, "start": starts}).dropna().drop_duplicates()
+    reused_pids = distinct.loc[distinct.duplicated("pid"), "pid"]
+    if len(reused_pids):
+        reused = pids.isin(reused_pids)
+        lifetimes = ProcessInstances(process_df[reused.to_numpy()])
+        pids, parents = pids.astype(object), parents.astype(object)
+        pids[reused] = _instance_ids(lifetimes, pids[reused], starts[reused])
+        reused_parent = parents.isin(lifetimes.keys)
+        parents[reused_parent] = _instance_ids(lifetimes, parents[reused_parent], starts[reused_parent])
+    codes, ids = pd.factorize(pd.concat([pids, parents], ignore_index=True))
+    m = len(process_df)
+    child, parent = codes[:m], codes[m:]
+    rows = np.full(len(ids), -1, dtype=np.int64)
+    has_pid = child >= 0
+    np.maximum.at(rows, child[has_pid], np.arange(m)[has_pid])
+    linked = has_pid & (parent >= 0)
+    node_pids = None
+    if lifetimes is not None:
+        node_pids = [int(node_id.split("@")[0]) if isinstance(node_id, str) else node_id for node_id in ids.tolist()]
+    return ProcessGraph(ids, rows, parent[linked].astype(np.int64), child[linked].astype(np.int64), process_df,
+                        node_pids, lifetimes)
+
+# Graphs built by older code (networkx.DiGraph with row dicts on the nodes) are converted.
+def as_process_graph(graph) -> ProcessGraph:
+    return graph if isinstance(graph, ProcessGraph) else ProcessGraph.from_networkx(graph)
+
+# Report lines for single file, network and registry events.
+def _file_event_line(timestamp, operation, file_path) -> str:
+    return f"  - File Event: {timestamp} | Operation: {operation} | Path: {file_path}"
+
+def _network_event_line(timestamp, src_ip, src_port, dst_ip, dst_port) -> str:
+    return f"  - Network Event: {timestamp} | SrcIP: {ip_text(src_ip)}:{src_port} → DstIP: {ip_text(dst_ip)}:{dst_port}"
+
+def _registry_event_line(timestamp, operation, registry_key, value_name, value_data) -> str:
+    val_str = f" | Value: {value_name} = {value_data}" if pd.notnull(value_name) else ""
+    return f"  - Registry Event: {timestamp} | Operation: {operation} | Key: {registry_key}{val_str}"
+
+# Event sources of the report, in output order: (columns passed to the line formatter, formatter).
+EVENT_LINES = [
+    (["timestamp", "operation", "file_path"], _file_event_line),
+    (["timestamp", "src_ip", "src_port", "dst_ip", "dst_port"], _network_event_line),
+    (["timestamp", "operation", "registry_key", "value_name", "value_data"], _registry_event_line),
+]
 
 # Extracts all file, network, and registry events linked to a given process ID.
 def extract_events_for_pid(pid: int, file_df, net_df, reg_df):
     events = []
-    for _, row in file_df[file_df['process_id'] == pid].iterrows():
-        events.append(f"  - File Event: {row['timestamp']} | Operation: {row['operation']} | Path: {row['file_path']}")
-    for _, row in net_df[net_df['process_id'] == pid].iterrows():
-        events.append(f"  - Network Event: {row['timestamp']} | SrcIP: {row['src_ip']}:{row['src_port']} → DstIP: {row['dst_ip']}:{row['dst_port']}")
-    for _, row in reg_df[reg_df['process_id'] == pid].iterrows():
-        val_str = f" | Value: {row['value_name']} = {row['value_data']}" if pd.notnull(row['value_name']) else ""
-        events.append(f"  - Registry Event: {row['timestamp']} | Operation: {row['operation']} | Key: {row['registry_key']}{val_str}")
+    for df, (columns, line) in zip((file_df, net_df, reg_df), EVENT_LINES):
+        for _, row in df[df['process_id'] == pid].iterrows():
+            events.append(line(*(row[col] for col in columns)))
     return events
 
-# Recursively traverses the process tree from root_pid and writes a markdown report.
-# Includes cycle detection to avoid infinite loops.
-def write_process_tree_markdown_safe(graph: nx.DiGraph, root_pid: int, file_df, net_df, reg_df, output_path):
+def build_event_index(file_df, net_df, reg_df, graph: ProcessGraph = None) -> list:
+    """
+    Groups the file, network and registry events by process_id once per run.
+
+    Each source is stably sorted by pid, keeping only the report columns, and every pid maps
+    to its (start, end) row range, so a pid's events are a slice in input order and a report
+    costs time proportional to its output instead of one scan of every frame per node. With
+    the graph, the events of reused pids are grouped by the graph's process instances instead.
+    """
+    graph = as_process_graph(graph) if graph is not None else None
+    index = []
+    for df, (columns, line) in zip((file_df, net_df, reg_df), EVENT_LINES):
+        ids = df["process_id"]
+        if graph is not None and graph.instances:
+            ids = graph.event_ids(ids, df["timestamp"])
+        codes, pids = pd.factorize(ids)
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(pids))
+        ends = np.cumsum(counts) + int((codes < 0).sum())
+        ranges = dict(zip(pids.tolist(), zip((ends - counts).tolist(), ends.tolist())))
+        index.append((ranges, [df[col].array.take(order) for col in columns], line))
+    return index
+
+# Report lines of the given pids' events, looked up in an index from build_event_index:
+# {pid: [lines]} with file, network and registry events in input order. All requested rows
+# are gathered with one take per column, so the cost is proportional to the lines returned.
+def event_lines(pids, event_index) -> dict:
+    lines = {}
+    for ranges, columns, line in event_index:
+        spans = [(pid, ranges[pid]) for pid in pids if pid in ranges]
+        if not spans:
+            continue
+        starts = np.array([start for _, (start, _) in spans], dtype=np.int64)
+        lengths = np.array([end - start for _, (start, end) in spans], dtype=np.int64)
+        offsets = np.cumsum(lengths) - lengths
+        positions = _range_positions(starts, lengths)
+        values = [col.take(positions).to_numpy(dtype=object) for col in columns]
+        rendered = [line(*row) for row in zip(*values)]
+        for (pid, _), offset, length in zip(spans, offsets.tolist(), lengths.tolist()):
+            lines.setdefault(pid, []).extend(rendered[offset:offset + length])
+    return lines
+
+def events_for_pid(pid: int, event_index) -> list:
+    return event_lines([pid], event_index).get(pid, [])
+
+# Pids with at least one MITRE technique match in an enriched frame, in order of their first match.
+def mitre_hit_pids(enriched_df: pd.DataFrame) -> list:
+    return enriched_df.loc[enriched_df["mitre_id"] != "N/A", "process_id"].drop_duplicates().tolist()
+
+# Root pids from a --tree_roots value: comma-separated pids and/or "mitre", which stands for
+# every pid with a MITRE technique match (see mitre_hit_pids).
+def select_tree_roots(spec: str, mitre_pids=()) -> list:
+    roots = []
+    for token in str(spec).split(","):
+        token = token.strip()
+        if token == "mitre":
+            roots.extend(mitre_pids)
+        elif token:
+            roots.append(int(token))
+    return list(dict.fromkeys(roots))
+
+# "15150" or "15150, 4242, ... and 12 more" for progress messages.
+def describe_roots(root_pids, shown: int = 10) -> str:
+    text = ", ".join(map(str, root_pids[:shown]))
+    return text + (f" and {len(root_pids) - shown} more" if len(root_pids) > shown else "")
+
+# Lines written per write() call by the report writers.
+WRITE_BATCH = 10_000
+
+# Assigns every process reachable from the roots to the first root (in the given order) that
+# reaches it; each process is rendered only in its owner's report.
+def assign_owners(graph: ProcessGraph, root_pids) -> dict:
+    graph = as_process_graph(graph)
+    owned = np.zeros(len(graph), dtype=bool)
+    owners = {}
+    for root_pid in graph.root_ids(root_pids):
+        root = graph.node(root_pid)
+        # A root inside an earlier root's tree has all its descendants owned already,
+        # and an owned node's descendants never need to be expanded again
+        if root < 0 or owned[root]:
+            continue
+        nodes = np.append(root, graph.descendant_nodes(root, blocked=owned))
+        owned[nodes] = True
+        owners.update(dict.fromkeys((graph.ids[node] for node in nodes), root_pid))
+    return owners
+
+# Process columns shown for every process in the report.
+PROCESS_COLUMNS = ["parent_id", "executable_path", "user", "start_time"]
+
+# "process_id: ..., parent_id: ..." report lines of the given pids, read from the graph's rows.
+def _process_lines(graph: ProcessGraph, pids) -> dict:
+    pids = list(pids)
+    rows = graph.rows[graph.node_numbers(pids)] if pids else np.empty(0, dtype=np.int64)
+    known = rows >= 0
+    values = [graph.frame[col].array.take(rows[known]).to_numpy(dtype=object) for col in PROCESS_COLUMNS]
+    return {pid: f"process_id: {pid}, parent_id: {parent_id}, executable_path: {executable_path}, user: {user}, start_time: {start_time}"
+            for pid, parent_id, executable_path, user, start_time
+            in zip((pid for pid, keep in zip(pids, known) if keep), *values)}
+
+def render_process_tree(graph: ProcessGraph, root_pid: int, event_index, owners=None):
+    """
+    Yields the markdown lines of the process tree below root_pid, depth first.
+
+    Traverses with an explicit stack, so deep spawn chains do not hit the recursion limit,
+    and visits processes in the same order as a recursive DFS over graph.successors. A process
+    seen twice is reported as a cycle. With owners from assign_owners, processes owned by
+    another root are written as a reference to that root's tree instead of being rendered again.
+    """
+    graph = as_process_graph(graph)
+    if owners is None:
+        owners = assign_owners(graph, [root_pid])
+    owned = [pid for pid, owner in owners.items() if owner == root_pid]
+    headers = _process_lines(graph, owned)
+    lines = event_lines(owned, event_index)
     visited = set()
+    stack = [(root_pid, 0)]
+    while stack:
+        pid, indent = stack.pop()
+        indent_str = "  " * indent
+        if pid in visited:
+            yield f"{indent_str}- process_id: {pid} (cycle detected, already visited)\n"
+            continue
+        visited.add(pid)
+        owner = owners.get(pid, root_pid)
+        if owner != root_pid:
+            yield f"{indent_str}- process_id: {pid} (see process tree of {owner})\n"
+            continue
+        node = graph.node(pid)
+        if node < 0:
+            yield f"{indent_str}- process_id: {pid} (not found in graph)\n"
+            continue
+        yield f"{indent_str}- {headers[pid]}\n" if pid in headers else f"{indent_str}- process_id: {pid} (no process record)\n"
+        for event in lines.get(pid, []):
+            yield f"{indent_str}{event}\n"
+        stack.extend((graph.ids[child], indent + 1) for child in graph.child_nodes(node)[::-1])
+
+def _write_lines(f, lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == WRITE_BATCH:
+            f.write("".join(batch))
+            batch = []
+    f.write("".join(batch))
+
+# Traverses the process tree from root_pid and writes a markdown report.
+# Includes cycle detection to avoid infinite loops.
+# Pass an event_index from build_event_index to share it between several reports.
+def write_process_tree_markdown_safe(graph: ProcessGraph, root_pid: int, file_df, net_df, reg_df, output_path,
+                                     event_index=None):
+    graph = as_process_graph(graph)
+    if event_index is None:
+        event_index = build_event_index(file_df, net_df, reg_df, graph)
+    write_process_tree_reports(graph, [root_pid], event_index, output_path)
+
+# Worker state for rendering trees in a process pool, set once per worker.
+_worker_state = {}
+
+def _init_render_worker(graph, event_index, owners):
+    _worker_state.update(graph=graph, event_index=event_index, owners=owners)
+
+def _render_in_worker(root_pid: int) -> str:
+    state = _worker_state
+    return "".join(render_process_tree(state["graph"], root_pid, state["event_index"], state["owners"]))
+
+def write_process_tree_reports(graph: ProcessGraph, root_pids, event_index, output_path, workers: int = 1):
+    """
+    Writes the process trees of several roots to one markdown file.
+
+    A single root gives exactly the write_process_tree_markdown_safe report. A reused pid
+    stands for all its process instances (see ProcessGraph.root_ids), each a root of its own.
+    With several roots each tree gets a "## Process tree of PID ..." section, in the given order, and a
+    process reachable from several roots is rendered once, in the first root's section
+    (see assign_owners). With workers > 1 the sections are rendered in a process pool and
+    written in order.
+    """
+    graph = as_process_graph(graph)
+    root_pids = graph.root_ids(root_pids)
+    owners = assign_owners(graph, root_pids)
+    if len(root_pids) == 1:
+        with open(output_path, "w", encoding="utf-8") as f:
+            _write_lines(f, render_process_tree(graph, root_pids[0], event_index, owners))
+        return
+
     with open(output_path, "w", encoding="utf-8") as f:
-        def dfs(pid: int, indent: int = 0):
-            if pid in visited:
-                f.write(f"{'  ' * indent}- process_id: {pid} (cycle detected, already visited)\n")
-                return
-            visited.add(pid)
-            if pid not in graph.nodes:
-                f.write(f"{'  ' * indent}- process_id: {pid} (not found in graph)\n")
-                return
-            node = graph.nodes[pid]
-            indent_str = "  " * indent
-            f.write(f"{indent_str}- process_id: {pid}, parent_id: {node['parent_id']}, executable_path: {node['executable_path']}, user: {node['user']}, start_time: {node['start_time']}\n")
-            for event in extract_events_for_pid(pid, file_df, net_df, reg_df):
-                f.write(f"{indent_str}{event}\n")
-            for child_pid in list(graph.successors(pid)):
-                dfs(child_pid, indent + 1)
-        dfs(root_pid)
+        def write_section(root_pid, body):
+            f.write(f"## Process tree of PID {root_pid}\n\n")
+            _write_lines(f, body)
+            f.write("\n")
+
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                     initargs=(graph, event_index, owners)) as pool:
+                for root_pid, text in zip(root_pids, pool.map(_render_in_worker, root_pids)):
+                    write_section(root_pid, [text])
+        else:
+            for root_pid in root_pids:
+                write_section(root_pid, render_process_tree(graph, root_pid, event_index, owners))
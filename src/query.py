@@ -0,0 +1,275 @@
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from storage import load_frame, save_frame, STORE_SUFFIXES
+from correlation import INSTANCE_COLUMN
+
+# Time-windowed queries over a unified event stream (unified_events.csv or
+# unified_events_enriched.csv, or their Parquet/Arrow forms).
+#
+# The stream is copied once, sorted by timestamp, into time partitions inside a sidecar
+# directory next to it ("unified_events_enriched.query/"), together with an index:
+# - timestamps.npy: the sorted timestamps (int64 ns), so a time range maps to a row range
+#   by binary search
+# - per pid, user, event_type and process instance: the sorted keys plus CSR posting lists
+#   (indptr + row numbers in ascending order), so each filter is a binary search per key and
+#   a slice
+# - meta.json: source size/mtime, partition row offsets and file names
+# The index is rebuilt whenever the source file changes.
+
+INDEX_VERSION = 2
+DEFAULT_PARTITION = "1h"
+
+# Filterable fields, named after their query keywords.
+INDEX_FIELDS = ("pids", "users", "event_types", "instances")
+
+# Every event_details string ends with "| User: <name>" (see integration.py).
+_USER_PATTERN = r"\| User: ([^|]*)$"
+
+# Sidecar directory of a unified stream file.
+def query_index_dir(source: Path) -> Path:
+    source = Path(source)
+    return source.with_name(f"{source.stem}.query")
+
+def _source_stat(source: Path) -> dict:
+    stat = source.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _to_ns(value) -> np.int64:
+    return np.int64(pd.Timestamp(value).as_unit("ns").value)
+
+def _timestamp_ns(timestamps: pd.Series) -> np.ndarray:
+    return pd.to_datetime(timestamps).to_numpy("datetime64[ns]").view(np.int64)
+
+# User names parsed from event_details.
+def event_users(details: pd.Series) -> pd.Series:
+    return details.astype(str).str.extract(_USER_PATTERN, expand=False).str.strip()
+
+# Sorted keys, CSR offsets and row numbers (ascending within each key) of a column.
+# Missing values are not indexed.
+def _posting_lists(values: pd.Series):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Category order is not sorted order: sort the categories and remap the codes
+        category_codes, keys = pd.factorize(values.cat.categories, sort=True)
+        codes = values.cat.codes.to_numpy()
+        codes = np.where(codes >= 0, category_codes[codes], -1)
+    else:
+        codes, keys = pd.factorize(values, sort=True)
+    keys = np.asarray(keys)
+    if keys.dtype == object:
+        keys = keys.astype(str)
+    indexed = codes >= 0
+    rows = np.flatnonzero(indexed)
+    order = np.argsort(codes[indexed], kind="stable")
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes[indexed], minlength=len(keys)), out=indptr[1:])
+    return keys, indptr, rows[order]
+
+def _partition_starts(timestamps: np.ndarray, partition: str) -> np.ndarray:
+    if not len(timestamps):
+        return np.zeros(0, dtype=np.int64)
+    buckets = timestamps // pd.Timedelta(partition).value
+    return np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1]).astype(np.int64)
+
+def build_query_index(source: Path, partition: str = DEFAULT_PARTITION, fmt: str = "arrow"):
+    """
+    Builds the sidecar directory of a unified stream file and returns its QueryIndex.
+
+    - partition: time span of each partition file (pandas offset, e.g. "1h" or "1D")
+    - fmt: partition file format, "arrow" (memory-mapped, default), "parquet" or "csv"
+    """
+    source = Path(source)
+    stat = _source_stat(source)
+    df = load_frame(source)
+    timestamps = _timestamp_ns(df["timestamp"])
+    if len(timestamps) and (np.diff(timestamps) < 0).any():
+        order = np.argsort(timestamps, kind="stable")
+        df = df.take(order).reset_index(drop=True)
+        timestamps = timestamps[order]
+
+    directory = query_index_dir(source)
+    staging = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    starts = _partition_starts(timestamps, partition)
+    ends = np.append(starts[1:], len(df))
+    parts = [f"part-{number:05d}{STORE_SUFFIXES[fmt]}" for number in range(len(starts))]
+    for name, start, end in zip(parts, starts, ends):
+        save_frame(df.iloc[start:end], staging / name)
+
+    np.save(staging / "timestamps.npy", timestamps)
+    np.save(staging / "part_starts.npy", starts)
+    fields = {
+        "pids": df["process_id"],
+        "users": event_users(df["event_details"]),
+        "event_types": df["event_type"],
+        # Streams written before process instances were added have no instance keys
+        "instances": df[INSTANCE_COLUMN] if INSTANCE_COLUMN in df else pd.Series(np.nan, index=df.index, dtype=object),
+    }
+    for field, values in fields.items():
+        for suffix, array in zip(("keys", "indptr", "rows"), _posting_lists(values)):
+            np.save(staging / f"{field}_{suffix}.npy", array)
+    meta = {
+        "version": INDEX_VERSION,
+        "source": source.name,
+        **stat,
+        "rows": len(df),
+        "partition": partition,
+        "format": fmt,
+        "columns": list(df.columns),
+        "parts": parts,
+    }
+    (staging / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    shutil.rmtree(directory, ignore_errors=True)
+    staging.rename(directory)
+    return QueryIndex(directory)
+
+class QueryIndex:
+    """
+    Opened sidecar index of a unified stream. Index arrays are memory-mapped; partition files
+    are read only when a query returns rows from them.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+        self.timestamps = np.load(self.directory / "timestamps.npy", mmap_mode="r")
+        self.part_starts = np.load(self.directory / "part_starts.npy")
+        self.postings = {
+            field: tuple(np.load(self.directory / f"{field}_{suffix}.npy", mmap_mode="r")
+                         for suffix in ("keys", "indptr", "rows"))
+            for field in INDEX_FIELDS
+        }
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    # True when the index was built from the source file as it is now.
+    def is_current(self, source: Path) -> bool:
+        return (self.meta.get("version") == INDEX_VERSION
+                and {k: self.meta.get(k) for k in ("size", "mtime_ns")} == _source_stat(Path(source)))
+
+    # Row range [lo, hi) of events with start <= timestamp < end; None leaves a side open.
+    def time_range(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, _to_ns(start), "left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamps, _to_ns(end), "left"))
+        return lo, max(lo, hi)
+
+    # Sorted rows within [lo, hi) whose field ("pids", "users", "event_types" or "instances") is one of values.
+    def rows_for(self, field: str, values, lo: int = 0, hi: int = None) -> np.ndarray:
+        keys, indptr, rows = self.postings[field]
+        hi = len(self) if hi is None else hi
+        if not len(keys):
+            values = []
+        elif keys.dtype.kind == "U":
+            # Text values are compared at full length: a cast to the keys' fixed width would
+            # truncate e.g. "johndoe2" to the key "johndoe"
+            values = np.unique(np.array([str(value) for value in values], dtype=str))
+        else:
+            values = np.unique(np.asarray(list(values)).astype(keys.dtype))
+        segments = []
+        for value in values:
+            k = np.searchsorted(keys, value)
+            if k == len(keys) or keys[k] != value:
+                continue
+            segment = rows[indptr[k]:indptr[k + 1]]
+            a, b = np.searchsorted(segment, [lo, hi])
+            segments.append(segment[a:b])
+        if not segments:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(segments))
+
+    # Row numbers (in timestamp order) matching all given filters.
+    def select(self, start=None, end=None, pids=None, users=None, event_types=None, instances=None) -> np.ndarray:
+        lo, hi = self.time_range(start, end)
+        selected = None
+        for field, values in (("pids", pids), ("users", users), ("event_types", event_types), ("instances", instances)):
+            if values is None:
+                continue
+            rows = self.rows_for(field, values, lo, hi)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return np.arange(lo, hi, dtype=np.int64) if selected is None else selected
+
+    # Reads the given sorted row numbers from the partition files.
+    def read_rows(self, rows: np.ndarray, columns=None) -> pd.DataFrame:
+        parts = self.meta["parts"]
+        if not parts:
+            return pd.DataFrame(columns=columns or self.meta["columns"])
+        owners = np.searchsorted(self.part_starts, rows, "right") - 1
+        numbers, firsts = np.unique(owners, return_index=True)
+        bounds = np.append(firsts, len(rows))
+        frames = []
+        for number, a, b in zip(numbers, bounds[:-1], bounds[1:]):
+            frame = load_frame(self.directory / parts[number], columns)
+            frames.append(frame.take(rows[a:b] - self.part_starts[number]))
+        if not frames:
+            return load_frame(self.directory / parts[0], columns).iloc[:0]
+        return pd.concat(frames, ignore_index=True)
+
+    def query(self, start=None, end=None, pids=None, users=None, event_types=None, columns=None,
+              instances=None) -> pd.DataFrame:
+        """
+        Events with start <= timestamp < end, optionally restricted to the given process ids,
+        users, event types and process instance keys (each an iterable; a filter left as None is
+        not applied). Returns the matching rows in timestamp order, optionally only the given columns.
+        """
+        rows = self.select(start, end, pids=pids, users=users, event_types=event_types, instances=instances)
+        return self.read_rows(rows, columns)
+
+_opened = {}
+
+# Opens the index of a unified stream file, building it first when it is missing or stale.
+def open_query_index(source: Path, rebuild: bool = False, partition: str = DEFAULT_PARTITION,
+                     fmt: str = "arrow") -> QueryIndex:
+    source = Path(source).resolve()
+    index = _opened.get(source)
+    if index is None and not rebuild and (query_index_dir(source) / "meta.json").exists():
+        index = QueryIndex(query_index_dir(source))
+    if rebuild or index is None or not index.is_current(source):
+        index = build_query_index(source, partition, fmt)
+    _opened[source] = index
+    return index
+
+# One-off query of a unified stream file; see QueryIndex.query.
+def query(source: Path, start=None, end=None, pids=None, users=None, event_types=None, columns=None,
+          instances=None) -> pd.DataFrame:
+    return open_query_index(source).query(start, end, pids=pids, users=users,
+                                          event_types=event_types, columns=columns, instances=instances)
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the unified event stream by time range, pid, user or event type")
+    parser.add_argument("--input", default="./reports/data/unified_events_enriched.csv",
+                        help="Unified stream file (.csv, .parquet or .arrow)")
+    parser.add_argument("--start", help="Earliest timestamp (inclusive), e.g. '2025-03-01 09:00'")
+    parser.add_argument("--end", help="Latest timestamp (exclusive)")
+    parser.add_argument("--pid", type=int, nargs="+", help="Process ids")
+    parser.add_argument("--user", nargs="+", help="Users, e.g. admin SYSTEM")
+    parser.add_argument("--event_type", nargs="+", help="Event types: process_start, network, file, registry")
+    parser.add_argument("--instance", nargs="+", help="Process instance keys, e.g. '15150@2025-03-01 09:00:05'")
+    parser.add_argument("--columns", nargs="+", help="Columns to return (default: all)")
+    parser.add_argument("--output", help="Write the matching rows to this file (.csv, .parquet or .arrow)")
+    parser.add_argument("--limit", type=int, default=20, help="Rows printed when --output is not given")
+    parser.add_argument("--partition", default=DEFAULT_PARTITION, help="Partition span when the index is built")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if it is up to date")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = open_query_index(Path(args.input), rebuild=args.rebuild, partition=args.partition)
+    opened = time.perf_counter()
+    result = index.query(args.start, args.end, pids=args.pid, users=args.user,
+                         event_types=args.event_type, columns=args.columns, instances=args.instance)
+    finished = time.perf_counter()
+    print(f"{len(result)} of {len(index)} events ({len(index.meta['parts'])} partitions in {index.directory}; "
+          f"index {opened - started:.3f}s, query {finished - opened:.3f}s)")
+    if args.output:
+        save_frame(result, Path(args.output))
+        print(f"Wrote {args.output}")
+    else:
+        print(result.head(args.limit).to_string(index=False))
@@ -0,0 +1,87 @@
+import pandas as pd
+from pathlib import Path
+
+# Intermediate file formats: CSV (default, analyst friendly) or columnar Parquet / Arrow IPC,
+# which keep dtypes (datetime64, integer pids, categoricals) and allow reading a column subset.
+STORE_SUFFIXES = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+# Datetime columns re-parsed when an intermediate is read back from CSV.
+DATE_COLUMNS = ["timestamp", "start_time", "end_time"]
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow intermediates require pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+# Path of an intermediate such as "cleaned_process_events" in the given store format.
+def stored_path(data_dir: Path, name: str, fmt: str = "csv") -> Path:
+    return data_dir / f"{name}{STORE_SUFFIXES[fmt]}"
+
+def _format_of(path: Path) -> str:
+    for fmt, suffix in STORE_SUFFIXES.items():
+        if path.suffix == suffix:
+            return fmt
+    raise ValueError(f"Unsupported intermediate file type: {path}")
+
+# Object columns holding non-string values (e.g. dict LLM responses) are stored as their
+# text form, which is what the CSV output contains as well.
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    mixed = [col for col in df.columns
+             if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty")]
+    if not mixed:
+        return df
+    return df.assign(**{col: df[col].map(str, na_action="ignore") for col in mixed})
+
+# Writes a frame in the format implied by the path suffix.
+def save_frame(df: pd.DataFrame, path: Path):
+    fmt = _format_of(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+    if fmt == "parquet":
+        pa.parquet.write_table(table, path)
+    else:
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+# Reads a frame written by save_frame, optionally only the given columns.
+# Columnar files are memory-mapped; CSV timestamps are parsed back to datetime64.
+def load_frame(path: Path, columns=None) -> pd.DataFrame:
+    path = Path(path)
+    fmt = _format_of(path)
+    if fmt == "csv":
+        header = pd.read_csv(path, nrows=0).columns
+        wanted = header if columns is None else [col for col in header if col in columns]
+        return pd.read_csv(path, usecols=columns, parse_dates=[col for col in DATE_COLUMNS if col in wanted])
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.read_table(path, columns=columns, memory_map=True).to_pandas()
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+# Serializes a frame to an Arrow IPC stream buffer, e.g. to hand results between processes
+# without pickling the DataFrame itself.
+def frame_to_ipc(df: pd.DataFrame) -> bytes:
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def frame_from_ipc(buffer: bytes) -> pd.DataFrame:
+    pa = _pyarrow()
+    return pa.ipc.open_stream(pa.py_buffer(buffer)).read_all().to_pandas()
@@ -0,0 +1,279 @@
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from cleaning import CLEANING_SPECS, new_cleaning_state, clean_events, restore_integers
+from integration import EVENT_BUILDERS, UNIFIED_COLUMNS
+from process_tree import (
+    build_process_tree,
+    build_event_index,
+    assign_owners,
+    mitre_hit_pids,
+    select_tree_roots,
+    describe_roots,
+    write_process_tree_reports
+)
+from errors import write_error_report
+from visualizations import new_chart_counts, add_chart_counts, render_charts
+from detectors import AnomalyDetector
+from correlation import add_process_instances, instances_from_csv
+from triage import summarize_events, new_triage_state
+from mitre_lookup import load_attack_techniques, enrich_with_mitre, find_attack_bundle
+from metrics import stage, stage_iter
+
+# source name -> (raw file, cleaned file)
+SOURCES = {
+    "process": ("process_events.csv", "cleaned_process_events.csv"),
+    "network": ("network_events.csv", "cleaned_network_events.csv"),
+    "file": ("file_events.csv", "cleaned_file_events.csv"),
+    "registry": ("registry_events.csv", "cleaned_registry_events.csv"),
+}
+
+# Maximum number of sorted run files merged at once; more runs are merged in several passes.
+MERGE_FAN_IN = 64
+
+def _read_chunks(path: Path, chunk_size: int):
+    return pd.read_csv(path, dtype=str, chunksize=chunk_size)
+
+# First pass over a source: the earliest valid timestamp, i.e. the origin the batch
+# cleaners use for the time drift filter. Only chunk-local state is kept.
+def scan_drift_origin(path: Path, spec: dict, chunk_size: int):
+    state = {"observed_min": None}
+    for chunk in _read_chunks(path, chunk_size):
+        clean_events(chunk, spec, state)
+    return state["observed_min"]
+
+# Cleans one source chunk by chunk, appending to the cleaned CSV and yielding each cleaned chunk.
+def stream_clean_source(input_file: Path, output_file: Path, spec: dict, chunk_size: int,
+                        min_time=None, stats=None):
+    state = new_cleaning_state(min_time)
+    header = True
+    for chunk in _read_chunks(input_file, chunk_size):
+        cleaned = restore_integers(clean_events(chunk, spec, state, stats))
+        cleaned.to_csv(output_file, mode="w" if header else "a", header=header, index=False)
+        header = False
+        yield cleaned
+    if header:
+        pd.read_csv(input_file, nrows=0).to_csv(output_file, index=False)
+
+# Blocks of a sorted run. Runs are written block by block, and a block whose timestamps all fall
+# on midnight is written as bare dates, so one run can hold both forms; ISO8601 parses either.
+def _read_run(path: Path, block_size: int):
+    with pd.read_csv(path, chunksize=block_size) as reader:
+        for chunk in reader:
+            chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], format="ISO8601")
+            yield chunk
+
+def _stable_by_timestamp(df: pd.DataFrame) -> pd.DataFrame:
+    return df.take(np.argsort(df["timestamp"].to_numpy(), kind="stable"))
+
+# K-way merge of CSV runs that are each sorted by timestamp, yielding sorted frames.
+# Only rows strictly older than the smallest buffered tail are emitted, so equal
+# timestamps keep run order (and row order within a run) across block boundaries.
+# With tag_column, the rows of run i get tags[i] in that (first) column, e.g. the host of
+# each run in fleet mode.
+def merge_sorted_runs(run_paths, block_size: int, tag_column: str = None, tags=None):
+    readers = [_read_run(path, block_size) for path in run_paths]
+    buffers = [pd.DataFrame(columns=UNIFIED_COLUMNS) for _ in readers]
+    live = [True] * len(readers)
+
+    def refill(i):
+        chunk = next(readers[i], None)
+        if chunk is None:
+            live[i] = False
+        else:
+            if tag_column is not None:
+                chunk.insert(0, tag_column, tags[i])
+            buffers[i] = pd.concat([buffers[i], chunk], ignore_index=True) if len(buffers[i]) else chunk
+
+    try:
+        for i in range(len(readers)):
+            refill(i)
+        while True:
+            tails = [buffers[i]["timestamp"].iloc[-1] for i in range(len(readers)) if live[i]]
+            bound = min(tails) if tails else None
+            parts = []
+            for i, buf in enumerate(buffers):
+                if bound is None:
+                    taken = buf
+                else:
+                    older = (buf["timestamp"] < bound).to_numpy()
+                    taken = buf[older]
+                    buffers[i] = buf[~older]
+                if len(taken):
+                    parts.append(taken)
+            if parts:
+                yield _stable_by_timestamp(pd.concat(parts, ignore_index=True))
+            if bound is None:
+                return
+            for i in range(len(readers)):
+                if live[i] and buffers[i]["timestamp"].iloc[-1] == bound:
+                    refill(i)
+    finally:
+        for reader in readers:
+            reader.close()
+
+# Reduces the number of runs to at most MERGE_FAN_IN by merging consecutive groups.
+# Merged runs replace their inputs; the original runs are kept when remove_inputs is False.
+# Tags (see merge_sorted_runs) are added in the first pass, so reduced runs already hold the
+# tag column; they are returned with the runs, None once applied.
+def _reduce_runs(run_paths, run_dir: Path, block_size: int, remove_inputs: bool = True,
+                 tag_column: str = None, tags=None):
+    generation = 0
+    while len(run_paths) > MERGE_FAN_IN:
+        merged_paths = []
+        for start in range(0, len(run_paths), MERGE_FAN_IN):
+            out = run_dir / f"merge_{generation}_{start}.csv"
+            header = True
+            group_tags = tags[start:start + MERGE_FAN_IN] if tags is not None else None
+            for block in merge_sorted_runs(run_paths[start:start + MERGE_FAN_IN], block_size,
+                                           tag_column, group_tags):
+                block.to_csv(out, mode="w" if header else "a", header=header, index=False)
+                header = False
+            if remove_inputs or generation > 0:
+                for path in run_paths[start:start + MERGE_FAN_IN]:
+                    path.unlink()
+            if not header:
+                merged_paths.append(out)
+        run_paths, tag_column, tags = merged_paths, None, None
+        generation += 1
+    return run_paths, tags
+
+# Unified events frame without rows, with the column dtypes of built events.
+def _empty_events() -> pd.DataFrame:
+    return pd.DataFrame({
+        "timestamp": pd.Series(dtype="datetime64[ns]"),
+        "process_id": pd.Series(dtype="int64"),
+        "event_type": pd.Series(dtype="str"),
+        "event_details": pd.Series(dtype="str"),
+    })[UNIFIED_COLUMNS]
+
+def _append_csv(df: pd.DataFrame, path: Path, first: bool):
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+# Collects the cleaned events of the given pids from a cleaned CSV, chunk by chunk.
+def _events_for_pids(path: Path, pids, chunk_size: int) -> pd.DataFrame:
+    parts = [chunk[chunk["process_id"].isin(pids)]
+             for chunk in pd.read_csv(path, parse_dates=["timestamp"], chunksize=chunk_size)]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["process_id", "timestamp"])
+
+# Writes process_tree.md from the cleaned CSVs, loading only the events of processes in the trees.
+# Returns the pids shown in the trees.
+def write_tree_report_from_csv(data_path: Path, reports_path: Path, root_pids, chunk_size: int) -> set:
+    process_df = pd.read_csv(data_path / "cleaned_process_events.csv", parse_dates=["start_time", "end_time"])
+    graph = build_process_tree(process_df)
+    pids = graph.pids_of(assign_owners(graph, root_pids))
+    file_df = _events_for_pids(data_path / "cleaned_file_events.csv", pids, chunk_size)
+    network_df = _events_for_pids(data_path / "cleaned_network_events.csv", pids, chunk_size)
+    registry_df = _events_for_pids(data_path / "cleaned_registry_events.csv", pids, chunk_size)
+    event_index = build_event_index(file_df, network_df, registry_df, graph)
+    write_process_tree_reports(graph, root_pids, event_index, reports_path / "process_tree.md")
+    return pids
+
+def run_streaming_pipeline(input_path: Path, data_path: Path, reports_path: Path,
+                           test_mode: bool = False, chunk_size: int = 500_000, tree_roots: str = "15150",
+                           llm_options: dict = None, cache=None, summary_stats=None,
+                           triage: dict = None):
+    """
+    Bounded-memory variant of main.run_pipeline.
+
+    Every source is read in chunks of chunk_size rows. Each chunk is cleaned (with the
+    duplicate set and drift origin carried across chunks), appended to its cleaned CSV and
+    turned into unified events, which are sorted and spilled to a run file. The runs are then
+    k-way merged by timestamp and each merged block is scored by the anomaly detectors (with
+    the last window carried across blocks), summarized, enriched and appended to
+    unified_events.csv / unified_events_enriched.csv. Chart inputs are accumulated as counts.
+
+    Cleaned outputs match batch mode row for row. The unified stream holds the same rows in
+    timestamp order; events sharing a timestamp are ordered by source, then input order.
+    Memory grows only with the de-duplication hashes (8 bytes per distinct row) and the
+    process table used for the process tree.
+    """
+    print("Streaming mode: cleaning all input datasets in chunks...")
+    techniques = load_attack_techniques(find_attack_bundle(input_path))
+    block_rows = max(chunk_size // MERGE_FAN_IN, 1_000)
+
+    with tempfile.TemporaryDirectory(dir=data_path) as tmp:
+        run_dir = Path(tmp)
+        run_paths = []
+        drop_counts = {}
+        for source, (raw_name, cleaned_name) in SOURCES.items():
+            spec = CLEANING_SPECS[source]
+            min_time = None
+            if spec.get("drift_column"):
+                with stage("clean"):
+                    min_time = scan_drift_origin(input_path / raw_name, spec, chunk_size)
+            chunks = stream_clean_source(input_path / raw_name, data_path / cleaned_name, spec,
+                                         chunk_size, min_time, drop_counts.setdefault(source, {}))
+            for n, cleaned in enumerate(stage_iter("clean", chunks)):
+                with stage("unify") as record:
+                    events = _stable_by_timestamp(EVENT_BUILDERS[source](cleaned))
+                    if len(events):
+                        run_path = run_dir / f"{source}_{n:06d}.csv"
+                        events.to_csv(run_path, index=False)
+                        run_paths.append(run_path)
+                    record.rows(len(cleaned), len(events))
+
+        with stage("correlate"):
+            instances = instances_from_csv(data_path / SOURCES["process"][1], chunk_size)
+
+        print("Merging unified event stream")
+        with stage("merge"):
+            run_paths, _ = _reduce_runs(run_paths, run_dir, block_rows)
+
+        counts = new_chart_counts()
+        detector = AnomalyDetector()
+        triage_state = new_triage_state()
+        hit_pids = {}
+        remaining = 5 if test_mode else None
+        if test_mode:
+            print("Test mode enabled: limiting rows to 5 for LLM + MITRE enrichment")
+
+        print("Summarizing and enriching merged blocks")
+        first = True
+        # Without any events a single empty block still writes the header-only outputs of batch mode
+        blocks = merge_sorted_runs(run_paths, block_rows) if run_paths else iter([_empty_events()])
+        for block in stage_iter("merge", blocks):
+            with stage("correlate") as record:
+                block = add_process_instances(block, instances)
+                record.rows(len(block), len(block))
+            with stage("detect") as record:
+                block = detector.detect(block)
+                record.rows(len(block), len(block))
+            if remaining is not None:
+                block = block.head(remaining).copy()
+                remaining -= len(block)
+            with stage("save") as record:
+                _append_csv(block, data_path / "unified_events.csv", first)
+                record.rows(rows_in=len(block))
+
+            with stage("summarize") as record:
+                block = summarize_events(block, cache, summary_stats, llm_options, triage, triage_state)
+                record.rows(len(block), len(block))
+            with stage("mitre") as record:
+                block = enrich_with_mitre(block, techniques)
+                record.rows(len(block), len(block))
+            with stage("save") as record:
+                _append_csv(block, data_path / "unified_events_enriched.csv", first)
+                record.rows(rows_in=len(block))
+            first = False
+            hit_pids.update(dict.fromkeys(mitre_hit_pids(block)))
+
+            with stage("charts"):
+                add_chart_counts(counts, block)
+            if remaining == 0:
+                break
+
+    print("Generating visualizations")
+    with stage("charts"):
+        render_charts(counts, reports_path)
+
+    root_pids = select_tree_roots(tree_roots, list(hit_pids))
+    print(f"Building process tree for PID {describe_roots(root_pids)}")
+    with stage("process_tree"):
+        write_tree_report_from_csv(data_path, reports_path, root_pids, chunk_size)
+
+    print("Writing error documentation")
+    with stage("errors"):
+        write_error_report(reports_path / "errors.md", drop_counts)
@@ -0,0 +1,89 @@
+import re
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+
+# Queries use at most this many keys per IN (...) clause.
+_QUERY_BATCH = 500
+
+# Seconds a write waits for a lock held by another process sharing the cache file.
+LOCK_TIMEOUT = 60
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Event text as used for cache keys: trimmed, with runs of whitespace collapsed.
+def normalize_event(text: str) -> str:
+    return _WHITESPACE.sub(" ", str(text)).strip()
+
+class SummaryCache:
+    """
+    Disk-backed (SQLite) cache of LLM summaries keyed by content.
+
+    Keys are SHA-256 hashes of the namespace (model and prompt version) plus the normalized
+    event text, so a new model or prompt never reuses old answers. Values are stored as JSON.
+    At most max_entries summaries are kept; the least recently used ones are evicted first.
+
+    Several processes may share one cache file (e.g. the shards of a fleet run): the database
+    is opened in WAL mode, so readers do not block the writer, and a writer waits up to
+    LOCK_TIMEOUT seconds for another one to commit.
+    """
+
+    def __init__(self, path, namespace: str = "", max_entries: int = 1_000_000):
+        self.path = Path(path)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=LOCK_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self.clock = self.conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM summaries").fetchone()[0]
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{normalize_event(text)}".encode("utf-8")).hexdigest()
+
+    def _tick(self) -> int:
+        self.clock += 1
+        return self.clock
+
+    # Returns {text: cached value} for the texts present in the cache and marks them as used.
+    def get_many(self, texts) -> dict:
+        keys = {}
+        for text in texts:
+            keys.setdefault(self.key(text), []).append(text)
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), _QUERY_BATCH):
+            batch = key_list[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(f"SELECT key, value FROM summaries WHERE key IN ({placeholders})", batch)
+            for key, value in rows:
+                found[key] = json.loads(value)
+        if found:
+            now = self._tick()
+            self.conn.executemany("UPDATE summaries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+            self.conn.commit()
+        return {text: value for key, value in found.items() for text in keys[key]}
+
+    # Stores {text: value} and evicts the least recently used entries beyond max_entries.
+    def put_many(self, items: dict):
+        if not items:
+            return
+        now = self._tick()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO summaries (key, value, last_used) VALUES (?, ?, ?)",
+            [(self.key(text), json.dumps(value, default=str), now) for text, value in items.items()],
+        )
+        excess = self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,248 @@
+import re
+import asyncio
+import numpy as np
+import pandas as pd
+
+from mitre_lookup_first import MITRE_TECHNIQUES
+from detectors import regex_contains, regex_extract
+from llm_async import summarize_frame, summarize_frame_async
+
+# Cheap rules scoring each unified event before summarization; only the best scored events within
+# TRIAGE_BUDGET are sent to the LLM, the others get a template summary (template_summaries).
+# Text rules are evaluated once per distinct event_details string.
+TRIAGE_RULES = {
+    # Per technique of mitre_lookup_first.MITRE_TECHNIQUES with a keyword in the event text
+    "mitre_keywords": {"weight": 2.0},
+    # Executables, scripts and autostart keys in places malware favours
+    "suspicious_path": {
+        "weight": 2.0,
+        "pattern": r"[\\/](?:temp|tmp|users[\\/]public|programdata|downloads|\$recycle\.bin)[\\/]"
+                   r"|\.(?:ps1|bat|vbs|hta|scr|js)\b|CurrentVersion[\\/]Run",
+    },
+    # Connections to a destination port outside the usual services
+    "nonstandard_port": {
+        "weight": 1.0,
+        "standard_ports": [20, 21, 22, 25, 53, 80, 110, 123, 143, 443, 445, 465, 587, 993, 995, 3389, 8080, 8443],
+    },
+    # Events of users behind less than this share of the frame's events
+    "rare_user": {"weight": 1.0, "max_share": 0.01},
+    # Times the detectors' anomaly_score, when the frame has one (see detectors.py)
+    "anomaly": {"weight": 1.0},
+}
+
+# Which events reach the LLM: events scoring at least min_score, best first, keeping at most
+# per_pid per process, then per_window per time window, then the top_k overall (None: no limit).
+TRIAGE_BUDGET = {
+    "min_score": 1.0,
+    "top_k": None,
+    "per_pid": 20,
+    "window": "5min",
+    "per_window": 100,
+}
+
+# Selection state carried across the blocks of a run (--stream, --incremental and --live), so
+# that the budget and the rare_user shares cover every event of the run, not each block: rows
+# and per-user events scored so far, events kept per pid and per window, and events selected.
+def new_triage_state() -> dict:
+    return {"rows": 0, "users": {}, "pids": {}, "windows": {}, "selected": 0}
+
+# Forgets the events kept per window for the windows that ended before watermark, so the state
+# of a long-running run stays bounded by its recent windows. An event of a forgotten window that
+# arrives later gets the window's full per_window room again.
+def expire_windows(state: dict, watermark, budget: dict = None):
+    budget = {**TRIAGE_BUDGET, **{k: v for k, v in (budget or {}).items() if v is not None}}
+    first = pd.Timestamp(watermark).value // pd.Timedelta(budget["window"]).value
+    state["windows"] = {bucket: n for bucket, n in state["windows"].items() if bucket >= first}
+
+_DST_PORT = r"DstIP: [^\s|:]+:(?P<value>\d+)"
+_USER = r"\| User: (?P<value>[^|]*)$"
+
+TEMPLATE_LABELS = {
+    "process_start": "Process start",
+    "network": "Network connection",
+    "file": "File activity",
+    "registry": "Registry activity",
+}
+
+def _keyword_pattern(keywords) -> str:
+    return "|".join(re.escape(keyword) for keyword in keywords)
+
+# Rule scores of each distinct event text, as {rule: array aligned with texts}.
+def _text_scores(texts: pd.Series, rules: dict) -> dict:
+    scores = {}
+    if "mitre_keywords" in rules:
+        techniques = np.zeros(len(texts))
+        for entry in MITRE_TECHNIQUES:
+            techniques += regex_contains(texts, _keyword_pattern(entry["keywords"]))
+        scores["mitre_keywords"] = techniques
+    if "suspicious_path" in rules:
+        scores["suspicious_path"] = regex_contains(texts, rules["suspicious_path"]["pattern"]).astype(np.float64)
+    if "nonstandard_port" in rules:
+        ports = pd.to_numeric(pd.Series(regex_extract(texts, _DST_PORT)), errors="coerce")
+        standard = ports.isin(rules["nonstandard_port"]["standard_ports"])
+        scores["nonstandard_port"] = (ports.notna() & ~standard).to_numpy(dtype=np.float64)
+    return scores
+
+# Events per user of the run so far, including this frame's, and the run's rows; the frame's
+# events are added to the state.
+def _user_counts(names: pd.Series, row_users: np.ndarray, rows: int, state: dict = None):
+    counts = np.bincount(row_users[row_users >= 0], minlength=len(names))
+    if state is None:
+        return counts, rows
+    for name, n in zip(names.tolist(), counts.tolist()):
+        state["users"][name] = state["users"].get(name, 0) + n
+    state["rows"] += rows
+    return np.array([state["users"][name] for name in names.tolist()], dtype=np.int64), state["rows"]
+
+def triage_scores(df: pd.DataFrame, rules: dict = None, state: dict = None) -> pd.DataFrame:
+    """
+    Scores the events of a unified frame with TRIAGE_RULES. Returns a frame aligned with df with
+    one column per rule (its weighted contribution) and their sum as "triage_score". With a
+    state from new_triage_state, rare_user shares are taken over the run so far.
+    """
+    rules = TRIAGE_RULES if rules is None else rules
+    codes, texts = pd.factorize(df["event_details"], use_na_sentinel=False)
+    texts = pd.Series(np.asarray(texts, dtype=object)).astype(str)
+    columns = {rule: values[codes] * rules[rule]["weight"] for rule, values in _text_scores(texts, rules).items()}
+    if "rare_user" in rules and len(df):
+        user_codes, names = pd.factorize(regex_extract(texts, _USER))
+        row_users = user_codes[codes]
+        counts, rows = _user_counts(pd.Series(names), row_users, len(df), state)
+        rare = (row_users >= 0) & (counts[row_users] < rules["rare_user"]["max_share"] * rows)
+        columns["rare_user"] = rare * rules["rare_user"]["weight"]
+    if "anomaly" in rules and "anomaly_score" in df:
+        columns["anomaly"] = df["anomaly_score"].to_numpy(dtype=np.float64) * rules["anomaly"]["weight"]
+    scores = pd.DataFrame(columns, index=df.index)
+    scores["triage_score"] = scores.sum(axis=1).round(2)
+    return scores
+
+# Room left in each group (codes index uniques) under limit, after the events the triage
+# state already counted for it; None limits leave unlimited room.
+def _room(uniques, limit, counts: dict = None) -> list:
+    if limit is None:
+        return [np.inf] * len(uniques)
+    counts = counts or {}
+    return [limit - counts.get(group, 0) for group in uniques.tolist()]
+
+def _add_counts(counts: dict, uniques, codes: np.ndarray):
+    for code, n in zip(*np.unique(codes, return_counts=True)):
+        group = uniques[code]
+        counts[group] = counts.get(group, 0) + int(n)
+
+def select_for_llm(df: pd.DataFrame, scores: pd.Series, budget: dict = None, state: dict = None) -> np.ndarray:
+    """
+    Boolean mask of the events sent to the LLM under TRIAGE_BUDGET (missing keys use its
+    defaults).
+
+    One greedy pass over the candidates, best score first: an event is taken when its process,
+    its time window and top_k all have room left, and only taken events use up room. Ties are
+    broken by position, so the selection is deterministic. With a state from new_triage_state,
+    the events taken from earlier frames of the run count against the limits and this frame's
+    are added to it; top_k then goes to the first frames that fill it, not the run's best.
+    """
+    budget = {**TRIAGE_BUDGET, **{k: v for k, v in (budget or {}).items() if v is not None}}
+    values = scores.to_numpy(dtype=np.float64)
+    candidates = np.flatnonzero(values >= budget["min_score"])
+    order = candidates[np.argsort(-values[candidates], kind="stable")]
+    pid_codes, pids = pd.factorize(df["process_id"].to_numpy()[order], use_na_sentinel=False)
+    window = pd.Timedelta(budget["window"]).value
+    times = pd.to_datetime(df["timestamp"]).to_numpy("datetime64[ns]").view(np.int64)[order]
+    window_codes, windows = pd.factorize(times // window)
+    pid_room = _room(pids, budget["per_pid"], None if state is None else state["pids"])
+    window_room = _room(windows, budget["per_window"], None if state is None else state["windows"])
+    left = np.inf if budget["top_k"] is None else budget["top_k"] - (0 if state is None else state["selected"])
+    taken = []
+    for position, pid, bucket in zip(range(len(order)), pid_codes.tolist(), window_codes.tolist()):
+        if left <= 0:
+            break
+        if pid_room[pid] > 0 and window_room[bucket] > 0:
+            pid_room[pid] -= 1
+            window_room[bucket] -= 1
+            left -= 1
+            taken.append(position)
+    taken = np.asarray(taken, dtype=np.int64)
+    if state is not None:
+        _add_counts(state["pids"], pids, pid_codes[taken])
+        _add_counts(state["windows"], windows, window_codes[taken])
+        state["selected"] += len(taken)
+    selected = np.zeros(len(df), dtype=bool)
+    selected[order[taken]] = True
+    return selected
+
+# Deterministic summaries for events not sent to the LLM, e.g.
+# "Network connection (triage score 1.0, not summarized by the LLM)". They are built once per
+# distinct (event type, score) pair.
+def template_summaries(df: pd.DataFrame, scores: pd.Series) -> pd.Series:
+    type_codes, event_types = pd.factorize(df["event_type"].astype(str))
+    score_codes, values = pd.factorize(scores.to_numpy())
+    codes, pairs = pd.factorize(type_codes.astype(np.int64) * len(values) + score_codes)
+    labels = [TEMPLATE_LABELS.get(event_type, f"{event_type} event") for event_type in event_types]
+    texts = np.array([f"{labels[pair // len(values)]} (triage score {values[pair % len(values)]:.1f}, "
+                      f"not summarized by the LLM)" for pair in pairs], dtype=object)
+    return pd.Series(texts[codes], index=df.index, dtype=object)
+
+def _count(stats, key: str, n: int):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + int(n)
+
+# Scores, LLM selection and template summaries of a unified frame (the part of triage_frame
+# before the LLM is called).
+def triage_plan(df: pd.DataFrame, budget: dict = None, rules: dict = None, state: dict = None):
+    scores = triage_scores(df, rules, state)
+    selected = select_for_llm(df, scores["triage_score"], budget, state)
+    return scores, selected, template_summaries(df, scores["triage_score"])
+
+def _finish_triage(df: pd.DataFrame, scores: pd.DataFrame, selected: np.ndarray, summaries: pd.Series,
+                   stats: dict = None) -> pd.DataFrame:
+    _count(stats, "triage_rows", len(df))
+    _count(stats, "triage_selected", selected.sum())
+    for rule in scores.columns.drop("triage_score"):
+        _count(stats, f"triage_rule_{rule}", (scores[rule] > 0).sum())
+    return df.assign(triage_score=scores["triage_score"], llm_summary=summaries)
+
+def triage_frame(df: pd.DataFrame, summarize, stats: dict = None, budget: dict = None,
+                 rules: dict = None, state: dict = None) -> pd.DataFrame:
+    """
+    Adds triage_score and llm_summary to a unified frame. summarize(frame) -> Series summarizes
+    the selected events (e.g. llm_async.summarize_frame); the rest get template summaries.
+    Selected and per-rule counts are added to the optional stats dict. Pass the same state
+    (new_triage_state) for every block of a run to apply the budget to the whole run.
+    """
+    scores, selected, summaries = triage_plan(df, budget, rules, state)
+    if selected.any():
+        summaries[selected] = summarize(df[selected])
+    return _finish_triage(df, scores, selected, summaries, stats)
+
+# One-line report of what triage_frame selected over a run.
+def format_triage_stats(stats: dict) -> str:
+    rows = stats.get("triage_rows", 0)
+    selected = stats.get("triage_selected", 0)
+    share = f"{selected / rows:.2%}" if rows else "n/a"
+    rules = ", ".join(f"{key[len('triage_rule_'):]} {value}" for key, value in stats.items()
+                      if key.startswith("triage_rule_"))
+    return (f"Triage: {selected} of {rows} rows sent to the LLM ({share}), "
+            f"{rows - selected} template summaries; rule hits: {rules or 'none'}")
+
+# Adds llm_summary to a unified frame with llm_async.summarize_frame. With a triage budget dict
+# (keys of TRIAGE_BUDGET) only the events it selects are summarized and triage_score is added;
+# triage_state (new_triage_state) carries the budget across the blocks of a run.
+def summarize_events(df: pd.DataFrame, cache=None, stats: dict = None, llm_options: dict = None,
+                     triage: dict = None, triage_state: dict = None) -> pd.DataFrame:
+    def summarize(frame):
+        return summarize_frame(frame, cache=cache, stats=stats, **(llm_options or {}))
+    if triage is None:
+        return df.assign(llm_summary=summarize(df))
+    return triage_frame(df, summarize, stats, budget=triage, state=triage_state)
+
+# summarize_events as a coroutine: the LLM calls run on the caller's event loop, the triage
+# scoring in a worker thread.
+async def summarize_events_async(df: pd.DataFrame, cache=None, stats: dict = None, llm_options: dict = None,
+                                 triage: dict = None, triage_state: dict = None) -> pd.DataFrame:
+    async def summarize(frame):
+        return await summarize_frame_async(frame, cache=cache, stats=stats, **(llm_options or {}))
+    if triage is None:
+        return df.assign(llm_summary=await summarize(df))
+    scores, selected, summaries = await asyncio.to_thread(triage_plan, df, triage, None, triage_state)
+    if selected.any():
+        summaries[selected] = await summarize(df[selected])
+    return _finish_triage(df, scores, selected, summaries, stats)
@@ -1,58 +1,174 @@
-
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-def plot_event_type_distribution(df: pd.DataFrame, output_path: Path):
-    event_counts = df["event_type"].value_counts()
-    plt.figure(figsize=(8, 5))
-    event_counts.plot(kind="bar", color="#4A90E2", edgecolor="black")
-    plt.title("Event Type Distribution")
-    plt.xlabel("Event Type")
-    plt.ylabel("Count")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+# Charts are drawn from pre-aggregated counts: event type counts, per-pid counts and per-minute
+# counts, computed in a single pass over the events (chart_counts) and mergeable block by block
+# (add_chart_counts), so streaming and incremental runs render the same charts as batch runs.
+
+# The timeline uses the finest of these bucket sizes that keeps it at most this many points.
+TIMELINE_RESOLUTIONS = ["1Min", "5Min", "15Min", "1h", "6h", "1D", "7D"]
+MAX_TIMELINE_POINTS = 2000
+TOP_TALKERS = 10
+
+_MINUTE_NS = 60 * 10**9
+
+# Empty chart inputs: event type, per-pid and per-minute event counts.
+def new_chart_counts() -> dict:
+    return {name: pd.Series(dtype="int64") for name in ("types", "pids", "minutes")}
+
+# Occurrences of each distinct integer, as (values, counts). Dense ranges are counted with
+# bincount, sorted input by run lengths, anything else by hashing.
+def _integer_counts(values: np.ndarray):
+    if not len(values):
+        return values[:0], np.zeros(0, dtype=np.int64)
+    lo, hi = values.min(), values.max()
+    if hi - lo <= max(2 * len(values), 1 << 16):
+        counts = np.bincount(values - lo)
+        present = np.flatnonzero(counts)
+        return present + lo, counts[present]
+    starts = np.flatnonzero(np.diff(values)) + 1
+    if len(values) < 2 or (values[starts] > values[starts - 1]).all():
+        bounds = np.concatenate([[0], starts, [len(values)]])
+        return values[bounds[:-1]], np.diff(bounds)
+    counts = pd.Series(values, copy=False).value_counts(sort=False)
+    return counts.index.to_numpy(), counts.to_numpy()
+
+def _value_counts(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+        keys, counts = _integer_counts(values.to_numpy())
+        return pd.Series(counts, index=keys, dtype="int64")
+    counts = values.value_counts()
+    return counts[counts > 0]
+
+# Per-minute event counts of a timestamp column, indexed by bucket start; NaT is skipped.
+def minute_counts(timestamps: pd.Series) -> pd.Series:
+    ns = pd.to_datetime(timestamps, errors="coerce").to_numpy("datetime64[ns]").view(np.int64)
+    buckets, counts = _integer_counts(ns[ns != np.iinfo(np.int64).min] // _MINUTE_NS)
+    return pd.Series(counts, index=pd.to_datetime(buckets * _MINUTE_NS), dtype="int64")
+
+# Adds one block of events (timestamp, process_id, event_type) to the chart inputs.
+def add_chart_counts(counts: dict, block: pd.DataFrame):
+    counts["types"] = counts["types"].add(_value_counts(block["event_type"]), fill_value=0)
+    counts["pids"] = counts["pids"].add(_value_counts(block["process_id"]), fill_value=0)
+    counts["minutes"] = counts["minutes"].add(minute_counts(block["timestamp"]), fill_value=0)
+
+# Chart inputs of a whole frame.
+def chart_counts(df: pd.DataFrame) -> dict:
+    counts = new_chart_counts()
+    add_chart_counts(counts, df)
+    return counts
+
+# Event counts per timeline bucket, with empty buckets filled in. The bucket size is the finest
+# of TIMELINE_RESOLUTIONS giving at most max_points buckets, so a long time span is downsampled.
+def timeline_counts(minutes: pd.Series, max_points: int = MAX_TIMELINE_POINTS) -> pd.Series:
+    if not len(minutes):
+        return minutes.astype("int64")
+    minutes = minutes.sort_index()
+    span = minutes.index[-1] - minutes.index[0]
+    for resolution in TIMELINE_RESOLUTIONS:
+        if span // pd.Timedelta(resolution) < max_points:
+            break
+    buckets = minutes.groupby(minutes.index.floor(resolution)).sum()
+    full_range = pd.date_range(buckets.index[0], buckets.index[-1], freq=resolution)
+    return buckets.reindex(full_range, fill_value=0).astype("int64")
+
+# Figures are drawn with the Agg canvas directly, without pyplot, so nothing is registered with an
+# interactive backend; one figure per chart is kept and cleared between renders.
+_figures = {}
+
+def _figure(name: str, figsize):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = _figures.get(name)
+    if fig is None:
+        fig = _figures[name] = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    else:
+        fig.clear()
+    return fig, fig.add_subplot()
+
+def _save(fig, output_path: Path):
+    fig.tight_layout()
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(output_path)
+    fig.savefig(output_path)
     print(f"Saved: {output_path}")
 
+def _bar_chart(name: str, counts: pd.Series, output_path: Path, color: str, title: str, xlabel: str, ylabel: str):
+    fig, ax = _figure(name, (8, 5))
+    positions = np.arange(len(counts))
+    ax.bar(positions, counts.to_numpy(), color=color, edgecolor="black")
+    ax.set_xticks(positions, [str(label) for label in counts.index], rotation=45)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    _save(fig, output_path)
+
+def plot_event_type_distribution(df: pd.DataFrame, output_path: Path):
+    plot_event_type_counts(df["event_type"].value_counts(), output_path)
+
+# Renders pre-computed event type counts (e.g. accumulated over chunks).
+def plot_event_type_counts(event_counts: pd.Series, output_path: Path):
+    event_counts = event_counts.astype("int64").sort_values(ascending=False, kind="stable")
+    _bar_chart("event_type_distribution", event_counts, output_path, "#4A90E2",
+               "Event Type Distribution", "Event Type", "Count")
+
 def plot_event_timeline(df: pd.DataFrame, output_path: Path):
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df = df.dropna(subset=['timestamp'])
-    df.set_index('timestamp', inplace=True)
-    timeline = df.resample('1Min').size()
-
-    plt.figure(figsize=(10, 4))
-    timeline.plot()
-    plt.title("Event Volume Over Time")
-    plt.xlabel("Time")
-    plt.ylabel("Event Count")
-    plt.tight_layout()
-    plt.savefig(output_path)
-    print(f"Saved: {output_path}")
+    plot_event_timeline_counts(minute_counts(df["timestamp"]), output_path)
+
+# Renders pre-computed per-minute event counts indexed by bucket start, downsampled by
+# timeline_counts when they span more than MAX_TIMELINE_POINTS minutes.
+def plot_event_timeline_counts(minutes: pd.Series, output_path: Path):
+    timeline = timeline_counts(minutes)
+    fig, ax = _figure("event_timeline", (10, 4))
+    ax.plot(timeline.index, timeline.to_numpy())
+    ax.set_title("Event Volume Over Time")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Event Count")
+    fig.autofmt_xdate()
+    _save(fig, output_path)
 
 def plot_top_talkers(df: pd.DataFrame, output_path: Path):
-    top_processes = df["process_id"].value_counts().head(10)
-    plt.figure(figsize=(8, 5))
-    top_processes.plot(kind="bar", color="#7B68EE", edgecolor="black")
-    plt.title("Top 10 Processes by Event Count")
-    plt.xlabel("Process ID")
-    plt.ylabel("Event Count")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_path)
-    print(f"Saved: {output_path}")
+    plot_top_talker_counts(df["process_id"].value_counts(), output_path)
+
+# Renders the TOP_TALKERS largest entries of pre-computed per-process event counts.
+def plot_top_talker_counts(process_counts: pd.Series, output_path: Path):
+    top_processes = process_counts.astype("int64").sort_values(ascending=False, kind="stable").head(TOP_TALKERS)
+    _bar_chart("top_talkers", top_processes, output_path, "#7B68EE",
+               f"Top {TOP_TALKERS} Processes by Event Count", "Process ID", "Event Count")
+
+# Chart file name -> (renderer, chart input it draws)
+CHARTS = {
+    "event_type_distribution.png": (plot_event_type_counts, "types"),
+    "event_timeline.png": (plot_event_timeline_counts, "minutes"),
+    "top_talkers.png": (plot_top_talker_counts, "pids"),
+}
+
+def _render_chart(file_name: str, counts: pd.Series, output_dir: Path):
+    CHARTS[file_name][0](counts, output_dir / file_name)
+
+# Renders all charts from chart inputs; with workers > 1 the charts are drawn in separate processes.
+def render_charts(counts: dict, output_dir: Path, workers: int = 1):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(file_name, counts[key], output_dir) for file_name, (_, key) in CHARTS.items()]
+    if workers <= 1:
+        for job in jobs:
+            _render_chart(*job)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        for future in [pool.submit(_render_chart, *job) for job in jobs]:
+            future.result()
 
 if __name__ == "__main__":
     import argparse
+    from storage import load_frame
     parser = argparse.ArgumentParser(description="Visualize unified event data")
-    parser.add_argument("--input_csv", required=True, help="Path to unified_events.csv")
+    parser.add_argument("--input", "--input_csv", dest="input", required=True,
+                        help="Path to unified_events (.csv, .parquet or .arrow)")
     parser.add_argument("--output_dir", required=True, help="Directory to save all charts")
+    parser.add_argument("--workers", type=int, default=1, help="Render the charts in this many processes")
     args = parser.parse_args()
 
-    df = pd.read_csv(args.input_csv)
-
-    output_dir = Path(args.output_dir)
-    plot_event_type_distribution(df, output_dir / "event_type_distribution.png")
-    plot_event_timeline(df, output_dir / "event_timeline.png")
-    plot_top_talkers(df, output_dir / "top_talkers.png")
+    df = load_frame(Path(args.input), columns=["timestamp", "process_id", "event_type"])
+    render_charts(chart_counts(df), Path(args.output_dir), args.workers)
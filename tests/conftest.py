@@ -0,0 +1,42 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+START = pd.Timestamp("2025-03-01 09:00:00")
+
+# event_details of the unified event types; {i} is the row number, {user} the user.
+DETAILS = {
+    "process_start": "Executable: C:/Temp/a{i}.exe | User: {user}",
+    "network": "SrcIP: 10.0.0.1:1 → DstIP: 10.0.0.{i}:443 | User: {user}",
+    "file": "Operation: write | File: C:/f{i} | User: {user}",
+    "registry": "Operation: modify | Key: HKLM/Software/k{i} | User: {user}",
+}
+
+def _unified_events(seconds, process_ids=100, event_types="network", users="a", spread: int = 40) -> pd.DataFrame:
+    """
+    Unified events at START + seconds. process_ids, event_types and users are one value or one
+    per event; event_details follow DETAILS with i cycling over `spread` values.
+    """
+    seconds = np.asarray(seconds)
+    n = len(seconds)
+    event_types = np.broadcast_to(np.asarray(event_types, dtype=object), n)
+    users = np.broadcast_to(np.asarray(users, dtype=object), n)
+    return pd.DataFrame({
+        "timestamp": START + pd.to_timedelta(seconds, unit="s"),
+        "process_id": np.broadcast_to(np.asarray(process_ids), n),
+        "event_type": event_types,
+        "event_details": [DETAILS[kind].format(i=i % spread, user=user)
+                          for i, (kind, user) in enumerate(zip(event_types, users))],
+    })
+
+@pytest.fixture
+def unified_events():
+    return _unified_events
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
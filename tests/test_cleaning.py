@@ -0,0 +1,110 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleaning import CLEANING_SPECS, DROP_RULES, clean_events, new_cleaning_state
+from errors import format_drop_counts
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+
+# The per-source cleaners clean_events replaced, as they were, with the rows each step drops
+# counted under the rule clean_events counts them under.
+def _baseline(df: pd.DataFrame, source: str):
+    counts = {rule: 0 for rule in DROP_RULES}
+
+    def step(rule, frame):
+        counts[rule] += len(df) - len(frame)
+        return frame
+
+    spec = CLEANING_SPECS[source]
+    df = step("duplicate", df.drop_duplicates())
+    df = df.replace("###CORRUPT###", np.nan if source == "process" else pd.NA)
+    for col in spec["timestamps"]:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    df = step("missing_required", df.dropna(subset=spec["required"]))
+    if source == "process":
+        df = step("inverted_time", df[df['end_time'] >= df['start_time']])
+    if source != "registry":
+        column = spec["drift_column"]
+        df = step("time_drift", df[(df[column] - df[column].min() <= pd.Timedelta(days=366))])
+    for col in spec["strip"]:
+        df[col] = df[col].astype(str).str.strip()
+    if source == "process":
+        df = step("self_parent", df[df['process_id'] != df['parent_id']])
+    return df, counts
+
+# Every drop rule fires: a duplicate, corrupt and unparseable required values, an inverted
+# process, drift past a year, self-parents (one with both pids corrupt, which is kept), and
+# padded text.
+FIXTURES = {
+    "process": """process_id,parent_id,start_time,end_time,executable_path,user,command_line
+1,0,2025-03-01 09:00:00,2025-03-01 10:00:00, a.exe ,SYSTEM,a
+1,0,2025-03-01 09:00:00,2025-03-01 10:00:00, a.exe ,SYSTEM,a
+2,1,###CORRUPT###,2025-03-01 10:00:00,b.exe,user1,b
+3,1,2025-03-01 09:10:00,not a time,c.exe,user1,c
+4,1,2025-03-01 11:00:00,2025-03-01 10:00:00,d.exe,user1,d
+5,1,2026-06-01 09:00:00,2026-06-01 10:00:00,e.exe,user1,e
+6,6,2025-03-01 09:20:00,2025-03-01 10:00:00,f.exe, user2 ,f
+###CORRUPT###,###CORRUPT###,2025-03-01 09:30:00,2025-03-01 10:00:00,g.exe,user2,###CORRUPT###
+""",
+    "network": """process_id,src_ip,dst_ip,src_port,dst_port,timestamp,user
+1,10.0.0.1, 10.0.0.2 ,1,443,2025-03-01 09:00:00,a
+1,10.0.0.1, 10.0.0.2 ,1,443,2025-03-01 09:00:00,a
+2,###CORRUPT###,10.0.0.3,1,443,2025-03-01 09:01:00,a
+3,10.0.0.1,###CORRUPT###,1,443,2025-03-01 09:02:00,a
+4,10.0.0.1,10.0.0.4,1,443,2025-03-01 09:03:00,
+5,10.0.0.1,10.0.0.5,1,443,2027-03-01 09:03:00,a
+""",
+    "file": """process_id,file_path,operation,timestamp,user
+1, C:/a.txt ,read,2025-03-01 09:00:00,a
+1, C:/a.txt ,read,2025-03-01 09:00:00,a
+2,C:/b.txt,,2025-03-01 09:01:00,a
+3,###CORRUPT###,write,2025-03-01 09:02:00,a
+4,C:/c.txt,write,###CORRUPT###,a
+5,C:/d.txt,write,2026-03-03 09:00:00,a
+""",
+    "registry": """process_id,registry_key,operation,timestamp,value_name,value_data,user
+1,HKLM/a ,modify,2025-03-01 09:00:00,,,a
+1,HKLM/a ,modify,2025-03-01 09:00:00,,,a
+2,HKLM/b,###CORRUPT###,2025-03-01 09:01:00,v,d,a
+3,HKLM/c,delete,2025-03-01 09:02:00,###CORRUPT###,,a
+4,HKLM/d,modify,2031-03-01 09:02:00,,, b
+""",
+}
+
+def _text(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype(object).fillna("").astype(str)
+
+# clean_events and the drop table give the rows and counts of the baseline cleaners, on the
+# fixtures and on the sample data.
+@pytest.mark.parametrize("source", list(FIXTURES))
+@pytest.mark.parametrize("sample", ["fixture", "data"])
+def test_cleaning_matches_baseline_cleaners(source, sample):
+    def _read():
+        if sample == "fixture":
+            return pd.read_csv(io.StringIO(FIXTURES[source]))
+        return pd.read_csv(os.path.join(DATA, f"{source}_events.csv"))
+
+    expected, expected_counts = _baseline(_read(), source)
+    stats = {}
+    cleaned = clean_events(_read(), CLEANING_SPECS[source], stats=stats)
+    pd.testing.assert_frame_equal(_text(cleaned), _text(expected))
+    assert {rule: stats.get(rule, 0) for rule in DROP_RULES} == expected_counts
+    assert stats["rows_out"] == len(expected) and stats["rows_in"] == len(_read())
+    if sample == "fixture":
+        assert all(expected_counts[rule] for rule in ["duplicate", "missing_required"])
+        assert f"| {source} | " + " | ".join(str(stats.get(key, 0)) for key in ["rows_in", *DROP_RULES, "rows_out"]) \
+            in format_drop_counts({source: stats})
+
+    # A state (as the chunked modes pass) changes nothing for a single piece
+    stateful = clean_events(_read(), CLEANING_SPECS[source], state=new_cleaning_state())
+    pd.testing.assert_frame_equal(_text(stateful), _text(expected))
+
+# The fixtures together hit every drop rule.
+def test_fixtures_hit_every_rule():
+    hit = set()
+    for source, text in FIXTURES.items():
+        hit |= {rule for rule, n in _baseline(pd.read_csv(io.StringIO(text)), source)[1].items() if n}
+    assert hit == set(DROP_RULES)
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import pandas as pd
+
+from cleaning import load_events
+from compact import COMPACT_SPECS, compact_frame, ip_text, ipv4_text, pack_ipv4
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "data")
+
+# Addresses survive packing and rendering, including the ends of the range; anything that would
+# not render back to the same text is left unpacked.
+def test_ipv4_round_trip():
+    addresses = pd.Series(["0.0.0.0", "255.255.255.255", "10.0.0.1", "192.168.1.20", "10.0.0.1"])
+    packed = pack_ipv4(addresses)
+    assert packed.dtype == np.uint32
+    assert packed[1] == 0xFFFFFFFF and packed[2] == packed[4] == (10 << 24) + 1
+    assert ipv4_text(packed).tolist() == addresses.tolist()
+    assert ip_text(packed[3]) == "192.168.1.20" and ip_text("::1") == "::1"
+    for values in (["10.0.0.1", "010.0.0.1"], ["10.0.0.256"], ["10.0.0"], ["10.0.0.1.5"], ["::1"],
+                   ["10.0.0.1", None], ["10.0.0.-1"]):
+        assert pack_ipv4(pd.Series(values, dtype=object)) is None, values
+
+# Every source of the sample data writes the same CSV from its compact frame, once packed
+# addresses are rendered back.
+def test_compact_frames_write_the_same_csv():
+    for source, spec in COMPACT_SPECS.items():
+        df = load_events(os.path.join(DATA, f"{source}_events.csv"), source)
+        compact = compact_frame(df, source)
+        rendered = compact.assign(**{col: ipv4_text(compact[col].to_numpy())
+                                     for col in spec.get("ipv4", []) if compact[col].dtype == np.uint32})
+        assert rendered.to_csv(index=False) == df.to_csv(index=False), source
+        assert compact["process_id"].dtype == np.int32
+    network = compact_frame(load_events(os.path.join(DATA, "network_events.csv"), "network"), "network")
+    assert network["dst_ip"].dtype == np.uint32 and network["dst_port"].dtype == np.uint16
+
+    # Out of range, missing or non-address values keep their dtype, and so do columns with too
+    # many distinct values to be worth a categorical
+    df = pd.DataFrame({"process_id": [1, 2**40], "src_port": [1.0, np.nan], "dst_port": [80, 70000],
+                       "src_ip": ["::1", "::1"], "dst_ip": ["10.0.0.1", "10.0.0.2"], "user": ["a", "b"]})
+    compact = compact_frame(df, "network")
+    assert compact.dtypes.to_dict() == {**df.dtypes.to_dict(), "src_ip": "category", "dst_ip": np.uint32}
+    assert compact.drop(columns="dst_ip").astype(str).equals(df.drop(columns="dst_ip").astype(str))
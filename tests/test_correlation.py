@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from correlation import INSTANCE_COLUMN, ProcessInstances, add_process_instances
+
+# Missing pids (a float column after cleaning) are skipped in process rows and events.
+def test_missing_pids_get_no_instance():
+    processes = pd.DataFrame({
+        "process_id": [1.0, np.nan, 2.0],
+        "start_time": pd.to_datetime(["2025-03-01 09:00", "2025-03-01 09:00", "2025-03-01 10:00"]),
+        "end_time": pd.to_datetime(["2025-03-01 11:00", None, None]),
+    })
+    events = pd.DataFrame({
+        "timestamp": pd.to_datetime(["2025-03-01 09:30", "2025-03-01 09:30", "2025-03-01 10:30"]),
+        "process_id": [1.0, np.nan, 2.0],
+        "event_type": "file",
+        "event_details": "Operation: read",
+    })
+    instances = ProcessInstances(processes)
+    assert len(instances) == 2
+    keys = add_process_instances(events, instances)[INSTANCE_COLUMN]
+    assert keys.tolist()[0] == "1@2025-03-01 09:00:00"
+    assert pd.isna(keys.iloc[1])
+    assert keys.tolist()[2] == "2@2025-03-01 10:00:00"
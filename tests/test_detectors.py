@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from detectors import AnomalyDetector, detect_anomalies, sliding_counts, sliding_distinct
+
+# Events and distinct values per event of the same key with time in (t - window, t].
+def _brute_force(keys, times, values, window):
+    counts, distinct = [], []
+    for key, time in zip(keys, times):
+        inside = (keys == key) & (times > time - window) & (times <= time)
+        counts.append(inside.sum())
+        distinct.append(len(set(values[inside])))
+    return np.array(counts), np.array(distinct)
+
+# Bursts of repeated and new values, some straddling multiples of the window and half window,
+# where tumbling windows would split them.
+def test_sliding_measures_match_brute_force(rng):
+    window = 1000
+    starts = np.repeat([0, 450, 980, 1490, 2500, 2990, 5000], 60)
+    times = np.sort(starts + rng.integers(0, 60, len(starts)))
+    keys = rng.choice([7, 8, 9], len(times))
+    values = rng.integers(0, 40, len(times)).astype(np.uint64)
+    counts, distinct = _brute_force(keys, times, values, window)
+    assert (sliding_counts(keys, times, window) == counts).all()
+    assert (sliding_distinct(keys, times, values, window) == distinct).all()
+
+    # One burst of 25 distinct values across a window boundary is counted whole
+    burst = np.arange(975, 1000)
+    assert sliding_distinct(np.zeros(25), burst, burst.astype(np.uint64), window)[-1] == 25
+
+# Blocks cut at any timestamp get the same columns as one pass.
+def test_blocks_match_one_pass(unified_events, rng):
+    seconds = np.sort(rng.integers(0, 1200, 3000))
+    events = unified_events(seconds, rng.choice([100, 200], len(seconds)),
+                            rng.choice(["network", "file"], len(seconds)), spread=30)
+    events = events.assign(event_details=events["event_details"].str.replace("Operation: write", "Operation: delete"))
+    whole = detect_anomalies(events)
+    assert (whole["anomaly_score"] > 0).any()
+    detector = AnomalyDetector()
+    cuts = np.r_[0, np.searchsorted(seconds, np.sort(rng.choice(seconds, 12, replace=False))), len(events)]
+    blocks = pd.concat([detector.detect(events.iloc[start:end]) for start, end in zip(cuts[:-1], cuts[1:])])
+    pd.testing.assert_frame_equal(blocks, whole)
+    # Each detector keeps only its own events of its last window
+    last = seconds[-1]
+    network = events["event_type"].eq("network").to_numpy()
+    assert len(detector.tails["network_burst"][1]) == (network & (seconds > last - 60)).sum()
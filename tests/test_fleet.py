@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streaming
+from fleet import HOST_COLUMN, merge_host_outputs, plan_shards, shard_of
+
+# Every host lands in exactly one shard, the same one in every run, and no shard is empty.
+def test_shards_partition_hosts():
+    hosts = [f"host{i:02d}" for i in range(40)]
+    assert plan_shards(hosts) == [[host] for host in hosts]
+    plan = plan_shards(hosts, 6)
+    assert sorted(host for group in plan for host in group) == hosts
+    assert all(group and len({shard_of(host, 6) for host in group}) == 1 for group in plan)
+    assert plan == plan_shards(hosts, 6)
+    assert len(plan_shards(hosts[:2], 50)) == 2
+
+# Host outputs of 1 to 40 events over two days, many sharing timestamps across hosts, and one
+# without events.
+def _host_outputs(output_path, unified_events, rng, count: int) -> dict:
+    frames = {}
+    for i in range(count):
+        host = f"host{i:03d}"
+        size = rng.integers(1, 40) if i else 0
+        events = unified_events(np.sort(rng.integers(0, 2 * 86_400, size) // 3_600 * 3_600),
+                                rng.integers(1, 50), spread=7)
+        data = output_path / "hosts" / host / "data"
+        data.mkdir(parents=True)
+        events.to_csv(data / "unified_events.csv", index=False)
+        frames[host] = events
+    return frames
+
+# More hosts than one merge takes (at the real fan-in, and at a fan-in of 3, where a second
+# pass merges and deletes the runs of the first) give the rows of every host, each day's
+# partition holding its events in timestamp order, ties by host and then host order. The
+# hosts' own outputs are kept.
+@pytest.mark.parametrize("fan_in", [None, 3])
+def test_more_hosts_than_fan_in_are_merged(tmp_path, unified_events, rng, monkeypatch, fan_in):
+    if fan_in is not None:
+        monkeypatch.setattr(streaming, "MERGE_FAN_IN", fan_in)
+    # At a fan-in of 3, the 10 hosts with events leave 4 runs after the first pass
+    count = streaming.MERGE_FAN_IN + 6 if fan_in is None else 11
+    frames = _host_outputs(tmp_path, unified_events, rng, count)
+    rows = merge_host_outputs(tmp_path, list(frames), "unified_events", block_rows=7)
+
+    assert rows == {host: len(events) for host, events in frames.items() if len(events)}
+    expected = pd.concat([events.assign(**{HOST_COLUMN: host})[[HOST_COLUMN, *events.columns]]
+                          for host, events in frames.items()], ignore_index=True)
+    expected = expected.take(np.argsort(expected["timestamp"].to_numpy(), kind="stable"))
+    out_dir = tmp_path / "data" / "unified_events"
+    partitions = sorted(out_dir.iterdir())
+    assert [path.name for path in partitions] == ["2025-03-01.csv", "2025-03-02.csv", "2025-03-03.csv"]
+    merged = []
+    for path in partitions:
+        part = pd.read_csv(path)
+        part["timestamp"] = pd.to_datetime(part["timestamp"], format="ISO8601")
+        assert (part["timestamp"].dt.strftime("%Y-%m-%d") == path.stem).all()
+        merged.append(part)
+    pd.testing.assert_frame_equal(pd.concat(merged, ignore_index=True),
+                                  expected.reset_index(drop=True), check_dtype=False)
+    assert all((tmp_path / "hosts" / host / "data" / "unified_events.csv").exists() for host in frames)
+    assert sorted(path.name for path in (tmp_path / "data").iterdir()) == ["unified_events"]
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from conftest import START
+from correlation import INSTANCE_COLUMN, ProcessInstances, add_process_instances
+from detectors import detect_anomalies
+import incremental
+from incremental import (_apply_rewrite, _empty_times, _merge_into, _rescore_merge, _tail_offset, rescore_tail,
+                         rewrite_tail_into, track_stale_instances)
+from streaming import _stable_by_timestamp
+
+# New events older than stored ones get the scores of a run over all events, and so do the
+# stored events whose windows they fall into.
+def test_merged_events_are_scored_with_stored_context(tmp_path, unified_events):
+    def _burst(seconds):
+        # Destinations follow the second, so stored and new events keep their details
+        events = unified_events(seconds)
+        return events.assign(event_details=[f"SrcIP: 10.0.0.1:1 → DstIP: 10.0.0.{s % 30}:443 | User: a"
+                                             for s in seconds])
+
+    everything = detect_anomalies(_burst(np.arange(60)))
+    stored_path = tmp_path / "unified_events.csv"
+    _merge_into(stored_path, detect_anomalies(_burst(np.arange(1, 60, 2))), append=True, first=True)
+
+    new_events, rescored, detector = _rescore_merge(stored_path, _burst(np.arange(0, 60, 2)))
+    tmp, offset, rows = _merge_into(stored_path, new_events, append=False, first=False, rescored=rescored)
+    _apply_rewrite(stored_path, tmp, offset)
+    assert (everything["anomaly_score"] > 0).any()
+    assert stored_path.read_text(encoding="utf-8") == everything.to_csv(index=False)
+    assert len(detector.tails["network_burst"][0]) == 60
+
+# Late rows appended after newer ones, as live mode writes them, are sorted and rescored from the
+# first of them on like a run over all events; the rows before it are left as they are.
+def test_late_rows_are_sorted_and_rescored(tmp_path, unified_events):
+    events = unified_events(np.arange(80), spread=30)
+    everything = detect_anomalies(events)
+    path = tmp_path / "unified_events.csv"
+    written = [everything.iloc[:20], detect_anomalies(events.iloc[30:60]),
+               detect_anomalies(events.iloc[20:30]), detect_anomalies(events.iloc[60:])]
+    path.write_text(pd.concat(written).to_csv(index=False), encoding="utf-8")
+
+    since = START + pd.Timedelta(20, unit="s")
+    rescored, detector = rescore_tail(path, since)
+    tmp, offset, rows = rewrite_tail_into(path, since, ProcessInstances(), _empty_times(), rescored)
+    _apply_rewrite(path, tmp, offset)
+    assert (everything["anomaly_score"] > 0).any()
+    assert rows == 60
+    assert path.read_text(encoding="utf-8") == everything.to_csv(index=False)
+    assert len(detector.tails["network_burst"][0]) == 60
+
+# Process rows arriving after stored events of their pid, whether the events had no instance
+# or an older one, reassign them as a run over all rows would.
+def test_later_process_rows_reassign_stored_events(tmp_path, unified_events):
+    def _processes(pids, seconds):
+        return pd.DataFrame({"process_id": pids, "start_time": START + pd.to_timedelta(seconds, unit="s"),
+                             "end_time": pd.NaT})
+
+    def _batch(processes, instances, seconds, pids):
+        starts = unified_events(processes["start_time"].sub(START).dt.total_seconds().to_numpy(),
+                                processes["process_id"].to_numpy(), "process_start")
+        events = pd.concat([starts, unified_events(seconds, pids)], ignore_index=True)
+        return add_process_instances(_stable_by_timestamp(events), instances)
+
+    first, later = _processes([100], [0]), _processes([100, 200, 300], [15, 5, 40])
+    instances = ProcessInstances(first)
+    state = {"event_times": _empty_times(), "stale": _empty_times()}
+    stored = _batch(first, instances, [10, 20, 25, 30], [100, 100, 200, 100])
+    track_stale_instances(state, stored)
+    path = tmp_path / "unified_events.csv"
+    _merge_into(path, stored, append=True, first=True)
+
+    instances.add(later)
+    new_events = _batch(later, instances, [35], [300])
+    track_stale_instances(state, new_events)
+    # Pid 300 starts after its stored events (none), so only 100 and 200 are stale
+    assert state["stale"].to_dict() == {100: START + pd.Timedelta(15, unit="s"), 200: START + pd.Timedelta(5, unit="s")}
+    tmp, offset, rows = _merge_into(path, new_events, append=False, first=False, instances=instances,
+                                    stale=state["stale"])
+    # Rows before the earliest stale start (pid 200 at 5s) are kept as they are
+    assert rows == len(stored) - 1
+    _apply_rewrite(path, tmp, offset)
+    merged = pd.read_csv(path, keep_default_na=False)
+
+    everything = pd.concat([stored, new_events], ignore_index=True)
+    expected = add_process_instances(everything, ProcessInstances(pd.concat([first, later])))
+    columns = ["timestamp", "process_id", INSTANCE_COLUMN]
+    expected = _stable_by_timestamp(expected)[columns].astype(object).fillna("").astype(str)
+    assert merged[columns].astype(str).values.tolist() == expected.values.tolist()
+    assert merged[INSTANCE_COLUMN].tolist().count("100@2025-03-01 09:00:15") == 3
+
+# The first row at or after a timestamp is found scanning back over blocks, also past quoted
+# fields that span lines and start with a timestamp themselves.
+def test_tail_offset_skips_quoted_newlines(tmp_path, monkeypatch, unified_events):
+    events = unified_events(np.repeat(np.arange(40), 2))
+    events["llm_summary"] = ["line\n2025-03-01 09:00:59,x\n\"quoted\"" if i % 3 else "plain" for i in range(len(events))]
+    path = tmp_path / "unified_events_enriched.csv"
+    offsets = []
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(events.iloc[:0].to_csv(index=False))
+        for i in range(len(events)):
+            offsets.append(f.tell())
+            f.write(events.iloc[i:i + 1].to_csv(index=False, header=False))
+        offsets.append(f.tell())
+    monkeypatch.setattr(incremental, "TAIL_BLOCK", 100)
+    for second in [-1, 0, 7, 7.5, 39, 40]:
+        first = int(np.searchsorted(np.repeat(np.arange(40), 2), second))
+        assert _tail_offset(path, START + pd.Timedelta(second, unit="s")) == offsets[first]
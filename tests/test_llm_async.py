@@ -0,0 +1,99 @@
+import time
+import asyncio
+import pandas as pd
+
+from llm_async import TokenBucket, format_batch, summarize_async, summarize_frame
+from llm_summarizer import get_backend
+
+class _FlakyChain:
+    """
+    The stub backend's chain, answering later events sooner and failing the first `failures`
+    calls for each event (every call when failures is None).
+    """
+
+    def __init__(self, failures: dict):
+        self.stub = get_backend("stub")["chain"]
+        self.failures = failures
+        self.calls = {}
+
+    async def ainvoke(self, inputs):
+        event = inputs["event"]
+        self.calls[event] = self.calls.get(event, 0) + 1
+        await asyncio.sleep(0.002 * (10 - int(event.split()[-1]) % 10))
+        failures = self.failures.get(event, 0)
+        if failures is None or self.calls[event] <= failures:
+            raise RuntimeError(f"failed {event}")
+        return await self.stub.ainvoke(inputs)
+
+# Results come back in input order whatever order the workers finish in; failed calls are
+# retried, and events failing every attempt get an error instead of a summary.
+def test_results_keep_input_order_and_retry_failures():
+    events = [f"event {i}" for i in range(20)]
+    chain = _FlakyChain({"event 3": 2, "event 7": 1, "event 11": None})
+    results = asyncio.run(summarize_async(events, chain, concurrency=4, retries=2, backoff=0))
+    for event, result in zip(events, results):
+        if event == "event 11":
+            assert result == "[LLM ERROR] failed event 11"
+        else:
+            assert result == {"event": event, "text": f"[stub summary] {event}"}
+    assert chain.calls["event 3"] == 3 and chain.calls["event 7"] == 2 and chain.calls["event 11"] == 3
+    assert chain.calls["event 0"] == 1
+
+class _BatchChain:
+    def __init__(self, garble: bool = False):
+        self.requests = []
+        self.garble = garble
+
+    async def ainvoke(self, inputs):
+        self.requests.append(inputs["events"])
+        lines = inputs["events"].splitlines()
+        # Numbered answers in reverse order; a garbled answer drops the last one
+        answers = [line.replace("] ", "] summary of ", 1) for line in reversed(lines)]
+        return {"text": "\n".join(answers[1:] if self.garble else answers)}
+
+# Batched answers are split per event by number; an answer that cannot be split is retried one
+# event per request.
+def test_batches_are_split_or_fall_back_to_single_events():
+    events = [f"event {i}" for i in range(5)]
+    chain = _FlakyChain({})
+    batch_chain = _BatchChain()
+    results = asyncio.run(summarize_async(events, chain, batch_chain, concurrency=2, batch_size=2))
+    assert [result["text"] for result in results] == [f"summary of event {i}" for i in range(4)] + \
+        ["[stub summary] event 4"]
+    assert sorted(batch_chain.requests) == [format_batch(events[0:2]), format_batch(events[2:4])]
+
+    garbled = _BatchChain(garble=True)
+    results = asyncio.run(summarize_async(events, chain, garbled, batch_size=5))
+    assert [result["text"] for result in results] == [f"[stub summary] {event}" for event in events]
+
+# A bucket lets `capacity` acquisitions through at once, then `rate` per second.
+def test_token_bucket_limits_rate():
+    async def acquire(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=3), 3)) < 0.04
+    assert asyncio.run(acquire(TokenBucket(rate=20, capacity=3), 9)) >= 6 / 20 * 0.95
+
+    # Across workers, requests after the first second's burst start at the rate
+    starts = []
+
+    class _Timed:
+        async def ainvoke(self, inputs):
+            starts.append(time.monotonic())
+            return {"event": inputs["event"], "text": ""}
+
+    asyncio.run(summarize_async([str(i) for i in range(16)], _Timed(), concurrency=4, rate=10))
+    assert starts[9] - starts[0] < 0.04
+    assert starts[15] - starts[9] >= 6 / 10 * 0.95
+
+# Each distinct text is summarized once and broadcast to every row with it.
+def test_frame_summaries_are_broadcast_per_distinct_text():
+    df = pd.DataFrame({"event_details": ["a", "b", "a", "c", "b"]}, index=[5, 6, 7, 8, 9])
+    stats = {}
+    summaries = summarize_frame(df, backend="stub", stats=stats, concurrency=3)
+    assert summaries.index.tolist() == df.index.tolist()
+    assert [summary["text"] for summary in summaries] == [f"[stub summary] {text}" for text in df["event_details"]]
+    assert stats == {"rows": 5, "unique": 3, "cache_hits": 0, "llm_requests": 3, "errors": 0}
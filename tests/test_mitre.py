@@ -0,0 +1,102 @@
+import json
+import pandas as pd
+
+import mitre_lookup
+from mitre_lookup import (compile_matcher, enrich_with_mitre, load_attack_index, match_all, match_mitre_dynamic,
+                          match_summaries, technique_by_id, technique_patterns)
+
+def _technique(attack_id, name, description="", keywords=(), deprecated=False):
+    return {"id": attack_id, "name": name, "description": description, "keywords": list(keywords),
+            "deprecated": deprecated, "tactics": ["Execution"]}
+
+# Names sharing prefixes, a pattern inside another, an empty description, a deprecated technique
+# and keyword-only matches.
+TECHNIQUES = [
+    _technique("T1", "Process", "process injection into a remote process", ["process"]),
+    _technique("T2", "Process Injection", "adversaries may inject code", ["process", "injection"]),
+    _technique("T3", "Scheduled Task", "", ["scheduled", "task"]),
+    _technique("T4", "Task", "run a task at startup", ["task"]),
+    _technique("T5", "Process Hollowing", "hollow", ["process", "hollowing", "injection"], deprecated=True),
+    _technique("T6", "Registry Run Keys", "run keys in the registry", ["registry", "run", "keys"]),
+    _technique(None, "No id", "process"),
+]
+
+SUMMARIES = [
+    "process injection into a remote process was seen",
+    "a scheduled process; the task keys of the registry run",
+    "keys, run, registry: process hollowing",
+    "nothing suspicious",
+    "",
+]
+
+# Techniques matched by plain substring checks, as match_all returns them.
+def _naive(summary):
+    exact, by_keywords = {}, {}
+    for index, tech in enumerate(TECHNIQUES):
+        if tech["id"] is None or tech["deprecated"]:
+            continue
+        patterns = technique_patterns(tech)
+        if any(pattern in summary for pattern in patterns):
+            exact[index] = sum(len(pattern) for pattern in patterns if pattern in summary)
+        elif all(keyword in summary for keyword in tech["keywords"]):
+            by_keywords[index] = sum(map(len, tech["keywords"]))
+    return exact, by_keywords
+
+def test_compiled_matcher_matches_substring_checks():
+    matcher = compile_matcher(TECHNIQUES)
+    for summary in SUMMARIES:
+        assert match_all(summary, matcher) == _naive(summary)
+
+    columns = match_summaries(pd.Series(SUMMARIES), matcher)
+    current = [tech for tech in TECHNIQUES if not tech["deprecated"]]
+    legacy = pd.Series(SUMMARIES).apply(lambda summary: match_mitre_dynamic(summary, current))
+    assert columns["mitre_id"].tolist() == legacy["mitre_id"].tolist()
+    # The deprecated T5 is never matched, T6 only by its keywords, and T3 (no description) always
+    assert columns["mitre_matches"].iloc[2] == "T6:15;T1:7;T3:0"
+
+def _attack_pattern(attack_id, name, description, phases, **extra):
+    return {"type": "attack-pattern", "name": name, "description": description,
+            "external_references": [{"source_name": "mitre-attack", "external_id": attack_id}],
+            "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": phase} for phase in phases],
+            **extra}
+
+# An index compiled from a STIX bundle resolves tactic names and sub-technique keywords, is
+# reloaded from its pickle, and enrichment through its stored trie matches plain substring checks.
+def test_index_matches_summaries_like_substring_checks(tmp_path):
+    bundle = tmp_path / "enterprise-attack.json"
+    bundle.write_text(json.dumps({"type": "bundle", "objects": [
+        {"type": "x-mitre-tactic", "x_mitre_shortname": "execution", "name": "Execution"},
+        {"type": "x-mitre-tactic", "x_mitre_shortname": "defense-evasion", "name": "Defense Evasion"},
+        _attack_pattern("T1059", "Command and Scripting Interpreter", "Adversaries may abuse interpreters.",
+                        ["execution"]),
+        _attack_pattern("T1059.001", "PowerShell", "Adversaries may abuse PowerShell.", ["execution"]),
+        _attack_pattern("T1055", "Process Injection", "Adversaries may inject code.",
+                        ["defense-evasion", "privilege-escalation"]),
+        _attack_pattern("T1064", "Scripting", "Old scripting technique.", ["execution"], revoked=True),
+    ]}), encoding="utf-8")
+    index = load_attack_index(bundle)
+    assert technique_by_id(index, "T1055")["tactics"] == ["Defense Evasion", "Privilege Escalation"]
+    assert technique_by_id(index, "T1059.001")["keywords"] == ["powershell", "command", "scripting", "interpreter"]
+    mitre_lookup._loaded.clear()
+    index = load_attack_index(bundle)
+    assert index["matcher"]["regex"] is None
+
+    summaries = ["Process injection by PowerShell", "a powershell command for the scripting interpreter",
+                 "adversaries may abuse interpreters. scripting", "scripting only", "nothing"]
+    enriched = enrich_with_mitre(pd.DataFrame({"llm_summary": summaries}), index["techniques"])
+    techniques = index["techniques"]
+    for summary, matches in zip(summaries, enriched["mitre_matches"]):
+        text = summary.lower()
+        expected = {}
+        for tech in techniques:
+            patterns = [pattern for pattern in technique_patterns(tech) if pattern in text]
+            if tech["deprecated"]:
+                continue
+            if patterns:
+                expected[tech["id"]] = sum(map(len, patterns))
+            elif all(keyword in text for keyword in tech["keywords"]):
+                expected[tech["id"]] = sum(map(len, tech["keywords"]))
+        found = dict(match.split(":") for match in matches.split(";")) if matches else {}
+        assert {attack_id: int(score) for attack_id, score in found.items()} == expected
+    assert enriched["mitre_id"].tolist() == ["T1059.001", "T1059.001", "T1059", "N/A", "N/A"]
+    assert enriched["mitre_tactic"].iloc[0] == "Execution"
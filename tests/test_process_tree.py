@@ -0,0 +1,37 @@
+import pandas as pd
+
+from process_tree import build_process_tree, build_event_index, write_process_tree_reports
+
+# Pid 3 is reused: its second instance is spawned by pid 4, a child of the first one. The
+# tree splits pid 3 into two instances instead of reporting a cycle, and each instance gets
+# the events of its own lifetime.
+def test_reused_pid_is_split_into_instances(tmp_path):
+    processes = pd.DataFrame({
+        "process_id": [1, 3, 4, 3],
+        "parent_id": [0, 1, 3, 4],
+        "start_time": pd.to_datetime(["2025-03-01 09:00", "2025-03-01 09:10", "2025-03-01 09:20", "2025-03-01 09:30"]),
+        "end_time": pd.to_datetime([None, "2025-03-01 09:25", None, None]),
+        "executable_path": "a.exe",
+        "user": "admin",
+    })
+    file_df = pd.DataFrame({
+        "timestamp": pd.to_datetime(["2025-03-01 09:15", "2025-03-01 09:35"]),
+        "process_id": [3, 3],
+        "operation": ["read", "write"],
+        "file_path": ["first.txt", "second.txt"],
+    })
+    net_df = pd.DataFrame(columns=["timestamp", "process_id", "src_ip", "src_port", "dst_ip", "dst_port"])
+    reg_df = pd.DataFrame(columns=["timestamp", "process_id", "operation", "registry_key", "value_name", "value_data"])
+    graph = build_process_tree(processes)
+    assert graph.pids_of(graph.subtree(1)) == {1, 3, 4}
+    event_index = build_event_index(file_df, net_df, reg_df, graph)
+    write_process_tree_reports(graph, [1], event_index, tmp_path / "tree.md")
+    lines = (tmp_path / "tree.md").read_text(encoding="utf-8").splitlines()
+    assert [line.split(",")[0] for line in lines] == [
+        "- process_id: 1",
+        "  - process_id: 3@2025-03-01 09:10:00",
+        "    - File Event: 2025-03-01 09:15:00 | Operation: read | Path: first.txt",
+        "    - process_id: 4",
+        "      - process_id: 3@2025-03-01 09:30:00",
+        "        - File Event: 2025-03-01 09:35:00 | Operation: write | Path: second.txt",
+    ]
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from query import query
+
+def _write_stream(path):
+    pd.DataFrame({
+        "timestamp": pd.to_datetime(["2025-03-01 09:00:00", "2025-03-01 09:00:01", "2025-03-01 09:00:02"]),
+        "process_id": [100, 100, 200],
+        "process_instance": ["100@2025-03-01 08:00:00", "100@2025-03-01 08:00:00", "200@2025-03-01 08:30:00"],
+        "event_type": ["process_start", "file", "network"],
+        "event_details": ["Executable: a.exe | User: johndoe", "Operation: read | File: b | User: johndoe",
+                          "SrcIP: 10.0.0.1:1 → DstIP: 10.0.0.2:2 | User: janedoe"],
+    }).to_csv(path, index=False)
+
+# A filter value that extends an existing key must not match that key.
+def test_value_extending_a_key_matches_nothing(tmp_path):
+    source = tmp_path / "unified_events_enriched.csv"
+    _write_stream(source)
+    assert len(query(source, users=["johndoe"])) == 2
+    assert len(query(source, users=["johndoe2"])) == 0
+    assert len(query(source, users=["janedoe_evil"])) == 0
+    assert len(query(source, event_types=["process_start_x"])) == 0
+    assert len(query(source, instances=["100@2025-03-01 08:00:00"])) == 2
+    assert len(query(source, instances=["100@2025-03-01 08:00:00.5"])) == 0
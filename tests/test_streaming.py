@@ -0,0 +1,48 @@
+import os
+import sys
+import subprocess
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+SOURCES = ["process", "network", "file", "registry"]
+
+def _run(input_dir, output_dir, *flags):
+    subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--input_dir", str(input_dir),
+                    "--output_dir", str(output_dir), "--no_llm_cache", "--summarizer", "noop", *flags],
+                   check=True, capture_output=True)
+
+def _text(path) -> pd.DataFrame:
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+# The first 500 rows of each sample source, then copies of rows from the start, so that
+# duplicates fall in later chunks than the rows they repeat.
+@pytest.fixture(scope="module")
+def sample_inputs(tmp_path_factory):
+    input_dir = tmp_path_factory.mktemp("inputs")
+    for source in SOURCES:
+        df = pd.read_csv(os.path.join(ROOT, "data", f"{source}_events.csv"), dtype=str, keep_default_na=False)
+        df = df.iloc[:500]
+        pd.concat([df, df.iloc[:400:20]]).to_csv(input_dir / f"{source}_events.csv", index=False)
+    (input_dir / "enterprise-attack.json").write_text('{"type": "bundle", "objects": []}', encoding="utf-8")
+    batch = tmp_path_factory.mktemp("batch")
+    _run(input_dir, batch)
+    return input_dir, batch / "data"
+
+# Streaming at chunk sizes above, between and below the duplicates' distance gives the cleaned
+# files of batch mode byte for byte, and the same unified rows in timestamp order.
+@pytest.mark.parametrize("chunk_size", [60, 230, 10_000])
+def test_stream_matches_batch(sample_inputs, tmp_path, chunk_size):
+    input_dir, batch = sample_inputs
+    _run(input_dir, tmp_path, "--stream", "--chunk_size", str(chunk_size))
+    streamed = tmp_path / "data"
+    for source in SOURCES:
+        name = f"cleaned_{source}_events.csv"
+        assert (streamed / name).read_bytes() == (batch / name).read_bytes()
+    for name in ["unified_events.csv", "unified_events_enriched.csv"]:
+        expected, actual = _text(batch / name), _text(streamed / name)
+        assert pd.to_datetime(actual["timestamp"]).is_monotonic_increasing
+        # Events sharing a timestamp may be in another order
+        columns = list(expected.columns)
+        pd.testing.assert_frame_equal(actual.sort_values(columns, ignore_index=True),
+                                      expected.sort_values(columns, ignore_index=True))
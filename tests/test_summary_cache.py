@@ -0,0 +1,46 @@
+import pandas as pd
+
+from llm_async import summarize_frame
+from llm_summarizer import backend_namespace
+from summary_cache import SummaryCache
+
+# Keys cover the namespace and the normalized text: whitespace differences share an entry,
+# other backends or prompt versions do not, and entries outlive the connection.
+def test_keys_are_namespaced_and_normalized(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    stub = SummaryCache(path, backend_namespace("stub"))
+    stub.put_many({"Operation:  write | File: a": "stub answer"})
+    assert stub.get_many(["Operation: write | File: a ", "Operation: read | File: a"]) == \
+        {"Operation: write | File: a ": "stub answer"}
+    assert SummaryCache(path, backend_namespace("rules")).get_many(["Operation: write | File: a"]) == {}
+    stub.close()
+    assert SummaryCache(path, backend_namespace("stub")).get_many(["Operation: write | File: a"]) == \
+        {"Operation: write | File: a": "stub answer"}
+
+# Beyond max_entries the least recently used entries go first, a read counting as a use, and
+# the order carries over to a reopened cache.
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = SummaryCache(path, "ns", max_entries=3)
+    cache.put_many({"a": 1, "b": 2})
+    cache.put_many({"c": 3})
+    assert cache.get_many(["a"]) == {"a": 1}
+    cache.put_many({"d": 4})
+    cache.close()
+
+    # b was used least recently; then a, once c is read again
+    cache = SummaryCache(path, "ns", max_entries=3)
+    assert cache.get_many(["b"]) == {}
+    cache.get_many(["c"])
+    cache.put_many({"e": 5})
+    assert cache.get_many(["a", "b", "c", "d", "e"]) == {"c": 3, "d": 4, "e": 5}
+
+# A second run over the same texts is answered from the cache, without calling the backend.
+def test_frames_reuse_cached_summaries(tmp_path):
+    df = pd.DataFrame({"event_details": ["a", "b", "a"]})
+    cache = SummaryCache(tmp_path / "cache.sqlite", backend_namespace("stub"))
+    first, second = {}, {}
+    summaries = summarize_frame(df, cache=cache, stats=first, backend="stub")
+    assert summarize_frame(df, cache=cache, stats=second, backend="stub").tolist() == summaries.tolist()
+    assert (first["cache_hits"], first["llm_requests"]) == (0, 2)
+    assert (second["cache_hits"], second["llm_requests"]) == (2, 0)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from conftest import START
+from triage import expire_windows, new_triage_state, triage_plan
+
+BUDGET = {"min_score": 1.0, "top_k": 30, "per_pid": 1000, "window": "5min", "per_window": 20}
+
+# Suspicious file writes over 15 minutes; every 200th event is by a rare user.
+def _events(unified_events, rng, rows: int) -> pd.DataFrame:
+    events = unified_events(np.sort(rng.integers(0, 900, rows)), rng.choice([100, 200, 300], rows), "file",
+                            np.where(np.arange(rows) % 200 == 0, "rare", "a"), spread=7)
+    return events.assign(event_details=events["event_details"].str.replace("C:/f", "C:/Temp/f"))
+
+# Blocks triaged with one state stay within the run's top_k, per_pid and per_window limits,
+# and the rare_user share is taken over the whole run rather than each block.
+def test_budget_carries_across_blocks(unified_events, rng):
+    events = _events(unified_events, rng, 400)
+    blocks = [events.iloc[start:start + 50] for start in range(0, len(events), 50)]
+    state = new_triage_state()
+    plans = [triage_plan(block, BUDGET, state=state) for block in blocks]
+    selected = events[np.concatenate([plan[1] for plan in plans])]
+    assert len(selected) == BUDGET["top_k"] == state["selected"]
+    assert selected["timestamp"].dt.floor("5min").value_counts().max() <= BUDGET["per_window"]
+    # The second "rare" event (row 200) is 2% of its block but 0.8% of the run so far
+    rare_user = pd.concat([plan[0]["rare_user"] for plan in plans])
+    assert rare_user.iloc[200] == 1
+    assert triage_plan(blocks[4], BUDGET)[0]["rare_user"].iloc[0] == 0
+    assert state["rows"] == len(events)
+
+    # Without a state each block gets the full budget again
+    unshared = sum(triage_plan(block, BUDGET)[1].sum() for block in blocks)
+    assert unshared > BUDGET["top_k"]
+
+    per_pid = {**BUDGET, "top_k": None, "per_window": None, "per_pid": 12}
+    state = new_triage_state()
+    selected = events[np.concatenate([triage_plan(block, per_pid, state=state)[1] for block in blocks])]
+    assert selected["process_id"].value_counts().tolist() == [12, 12, 12]
+
+# per_pid and per_window apply together: events a window rejects do not use up their process's
+# room, so one process with hits in two windows gets per_window events in each, also when the
+# windows arrive in separate blocks.
+def test_rejected_events_do_not_use_up_other_limits(unified_events):
+    events = unified_events(np.r_[np.arange(20), 400 + np.arange(20)], 100, "file")
+    events = events.assign(event_details=events["event_details"].str.replace("C:/f", "C:/Temp/f"))
+    budget = {"min_score": 1.0, "top_k": None, "per_pid": 20, "window": "5min", "per_window": 5}
+    assert triage_plan(events, budget)[1].sum() == 10
+
+    state = new_triage_state()
+    selected = [triage_plan(events.iloc[start:start + 20], budget, state=state)[1].sum() for start in (0, 20)]
+    assert selected == [5, 5]
+    assert state["pids"] == {100: 10} and state["selected"] == 10
+
+    capped = {**budget, "top_k": 7}
+    state = new_triage_state()
+    selected = [triage_plan(events.iloc[start:start + 20], capped, state=state)[1].sum() for start in (0, 20)]
+    assert selected == [5, 2]
+
+# Windows that ended before the watermark are forgotten, so a late event of one gets the window's
+# full per_window room again, while later windows keep their counts.
+def test_expired_windows_are_forgotten(unified_events):
+    events = unified_events(np.r_[np.arange(20), 400 + np.arange(20)], 100, "file")
+    events = events.assign(event_details=events["event_details"].str.replace("C:/f", "C:/Temp/f"))
+    budget = {"min_score": 1.0, "top_k": None, "per_pid": 40, "window": "5min", "per_window": 5}
+    state = new_triage_state()
+    triage_plan(events, budget, state=state)
+    assert len(state["windows"]) == 2
+    expire_windows(state, START + pd.Timedelta(400, unit="s"), budget)
+    assert list(state["windows"].values()) == [5]
+    assert triage_plan(events.iloc[:20], budget, state=state)[1].sum() == 5
+    assert triage_plan(events.iloc[20:], budget, state=state)[1].sum() == 0